@@ -1,26 +1,88 @@
 import os
 
-from kivy.lang import Builder
 from kivymd.app import MDApp
 from kivy.uix.screenmanager import Screen
 from kivy.core.window import Window
+from kivy.clock import mainthread
+from kivy.properties import StringProperty
+
+# Импорт регистрирует OverlayScreen в Factory до загрузки main.kv
+from src.screens.base_screen import OverlayScreen  # noqa: F401
+from src.services.log import get_logger, lazy
+from src.services.overlays import OverlayController, registry as overlay_registry
+
+nav_log = get_logger("navigation")
+overlay_log = get_logger("overlays")
+
+
+# Сопоставление коротких имён из меню к реальным файлам экранов
+SCREEN_ALIASES = {
+    'profile': 'profile',
+    'history': 'purchase_history',
+    'loyalty': 'loyalty_program',
+    'news': 'news',
+    'our_menu': 'our_menu',
+    'promo': 'promo_input',
+    'referral': 'referral',
+    'addresses': 'our_addresses',
+    'faq': 'faq',
+    'about': 'about_company',
+    'work': 'work_on_us',
+    'write_us': 'write_us',
+    'contacts': 'contacts',
+    'privacy_policy': 'agreement',
+}
+
+# Локальный источник писем (JSON); синхронизируются только письма новее сохранённой отметки
+MAIL_SOURCE_FILE = os.path.join("assets", "mail", "messages.json")
+MAIL_PAGE_SIZE = 50
+
+# Экраны, которые прогреваются после старта, если статистики переходов ещё нет
+PREWARM_SCREENS = ['profile', 'history', 'addresses']
+
+# Сколько экранов держим построенными (включая main); остальные выгружаются по LRU
+MAX_RESIDENT_SCREENS = 6
+# Необязательный лимит памяти текстур резидентных экранов в байтах (None — без лимита)
+SCREEN_TEXTURE_BUDGET = None
+
+
+def loyalty_code_from_phone(phone):
+    """Код программы лояльности из телефона: первые 5 цифр или дефолтный код"""
+    user_code = (phone or "").replace("+", "").replace("(", "").replace(")", "").replace("-", "").replace(" ", "")
+    if not user_code:
+        user_code = "13037"  # Дефолтный код
+    return user_code[:5] if len(user_code) >= 5 else user_code.zfill(5)
 
 
 class RootApp(MDApp):
+    # Код лояльности; label'ы оверлеев привязаны к нему в KV
+    loyalty_code = StringProperty("13037")
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._previous_screen = None  # Запоминаем предыдущий экран
+        self._prewarmer = None
+        self._shown_screen = 'main'
+        from src.services.screen_cache import ScreenLRU
+        self._screen_lru = ScreenLRU(MAX_RESIDENT_SCREENS, SCREEN_TEXTURE_BUDGET)
+        self._mail_source = None
+        # Все оверлеи открываются/закрываются одним контроллером по таблице OVERLAY_SPECS
+        self.overlays = OverlayController(overlay_registry, lambda: self.root.current if self.root else None)
     
     def build(self):
         # Init DB (idempotent)
         try:
-            from src.services.db import init_db
-            init_db()
+            from src.services import db as db_layer
+            db_layer.init_db()
+            profile = db_layer.get_profile()
+            profile.bind(self._on_profile_changed)
+            self.loyalty_code = loyalty_code_from_phone(profile.phone)
         except Exception:
             pass
         main_kv = os.path.join(os.path.dirname(__file__), "main.kv")
         if os.path.exists(main_kv):
-            root = Builder.load_file(main_kv)
+            from src.services.kv_loader import load_kv
+            root = load_kv(main_kv)
             # Закрытие активных оверлеев по Esc/Back
             try:
                 Window.bind(on_key_down=self._on_key_down)
@@ -32,45 +94,109 @@ class RootApp(MDApp):
             except Exception:
                 pass
             return root
+
+    def on_start(self):
+        # Главный экран уже показан: в простое строим самые вероятные следующие экраны
+        try:
+            from src.services import db as db_layer
+            from src.services.prewarm import ScreenPrewarmer
+            visits = db_layer.get_screen_visits()
+            self._prewarmer = ScreenPrewarmer(self, PREWARM_SCREENS, visits=visits)
+            self._prewarmer.start()
+        except Exception:
+            pass
+
+    @mainthread
+    def _on_profile_changed(self, profile):
+        self.loyalty_code = loyalty_code_from_phone(profile.phone)
+
+    def on_pause(self):
+        # Сбрасываем отложенные начисления на диск: после паузы ОС может убить процесс
+        try:
+            from src.services.db import flush as flush_db
+            flush_db()
+        except Exception:
+            pass
+        return True
+
+    def on_stop(self):
+        if self._prewarmer:
+            self._prewarmer.cancel()
+        # Сбрасываем отложенные начисления и закрываем пул соединений с БД
+        try:
+            from src.services.db import close as close_db
+            close_db()
+        except Exception:
+            pass
     
     def _on_screen_changed(self, screen_manager, current_screen_name):
         """Запоминаем предыдущий экран при переключении"""
         # Не обновляем _previous_screen здесь, так как он уже установлен в open_screen_by_name
-        pass
+        outgoing, self._shown_screen = self._shown_screen, current_screen_name
+        self._screen_lru.touch(current_screen_name)
+        self._evict_screens(outgoing)
+
+    def _evict_screens(self, outgoing=None):
+        """Выгружаем давно не использованные экраны.
+
+        Текущий, уходящий (ещё анимируется переходом) и экран для «Назад» не трогаем.
+        """
+        sm = self.root
+        protected = [sm.current, outgoing, self._previous_screen]
+        victims = self._screen_lru.victims(sm, protected)
+        if not victims:
+            return
+        for name in victims:
+            screen = sm.get_screen(name)
+            sm.remove_widget(screen)
+            self._screen_lru.discard(name)
+            self.overlays.forget_screen(name)
+            nav_log.debug("Evicted screen: %s", name)
+        # Кэши kv.image/kv.texture не чистим: общие картинки нужны остальным экранам,
+        # а записи выгруженного экрана истекут по таймауту кэша
+
+    def ensure_screen(self, screen_name):
+        """Построить экран заново, если он был выгружен. Возвращает True, если экран есть"""
+        sm = self.root
+        if sm.has_screen(screen_name):
+            return True
+        if screen_name not in SCREEN_ALIASES:
+            return False
+        for _ in self.screen_build_steps(screen_name):
+            pass
+        return sm.has_screen(screen_name)
     
     def go_back(self):
         """Возврат на предыдущий экран"""
-        print(f"[go_back] Called! _previous_screen={self._previous_screen}")
+        nav_log.debug("go_back: previous=%s", self._previous_screen)
         sm = self.root
         
         if not sm:
-            print("[go_back] ERROR: No screen manager!")
+            nav_log.error("go_back: no screen manager")
             return
         
-        print(f"[go_back] Current screen: {sm.current}")
-        print(f"[go_back] Available screens: {list(sm.screen_names)}")
+        nav_log.debug("go_back: current=%s, available=%s", sm.current, lazy(list, sm.screen_names))
         
         # Если есть предыдущий экран и он отличается от текущего
         if self._previous_screen:
-            if self._previous_screen != sm.current and sm.has_screen(self._previous_screen):
-                print(f"[go_back] Switching to previous screen: {self._previous_screen}")
+            # Выгруженный по LRU экран строится заново
+            if self._previous_screen != sm.current and self.ensure_screen(self._previous_screen):
+                nav_log.debug("go_back: switching to %s", self._previous_screen)
                 try:
                     sm.current = self._previous_screen
-                    print(f"[go_back] Successfully switched! New current: {sm.current}")
                     return
                 except Exception as e:
-                    print(f"[go_back] Error switching to {self._previous_screen}: {e}")
+                    nav_log.error("go_back: error switching to %s: %s", self._previous_screen, e)
         
         # Фолбэк на главный экран
-        print(f"[go_back] Falling back to 'main'")
+        nav_log.debug("go_back: falling back to main")
         if sm.has_screen('main'):
             try:
                 sm.current = 'main'
-                print(f"[go_back] Successfully switched to main! Current: {sm.current}")
             except Exception as e:
-                print(f"[go_back] ERROR switching to main: {e}")
+                nav_log.error("go_back: error switching to main: %s", e)
         else:
-            print(f"[go_back] ERROR: 'main' screen not found!")
+            nav_log.error("go_back: 'main' screen not found")
     
     def profile_logout(self):
         """Кнопка выхода в профиле - пока просто выводит в лог"""
@@ -82,32 +208,37 @@ class RootApp(MDApp):
         # Но только если мы не переключаемся на тот же экран
         if sm.current and sm.current != screen_name:
             self._previous_screen = sm.current
-            print(f"[open_screen_by_name] Saved previous screen: {self._previous_screen}")
-        # Проверяем: уже есть такой экран? Тогда просто переключим
+            nav_log.debug("open_screen_by_name: previous=%s", self._previous_screen)
+        # Проверяем: уже есть такой экран (в т.ч. прогретый заранее)? Тогда просто переключим
         if sm.has_screen(screen_name):
             sm.current = screen_name
-            print(f"[open_screen_by_name] Switched to existing screen: {screen_name}")
+            nav_log.debug("open_screen_by_name: switched to existing %s", screen_name)
+            self._record_screen_visit(screen_name)
+            return
+        # Строим экран синхронно, пройдя все шаги подряд
+        for _ in self.screen_build_steps(screen_name):
+            pass
+        # Убеждаемся, что предыдущий экран сохранен перед переключением
+        if sm.current and sm.current != screen_name:
+            self._previous_screen = sm.current
+            nav_log.debug("open_screen_by_name: previous=%s", self._previous_screen)
+        sm.current = screen_name
+        nav_log.debug("open_screen_by_name: created and switched to %s", screen_name)
+        self._record_screen_visit(screen_name)
+
+    def screen_build_steps(self, screen_name):
+        """Построение экрана по шагам: импорт модуля, загрузка KV, создание виджетов.
+
+        Генератор отдаёт управление между шагами, чтобы прогрев мог
+        растянуть построение на несколько кадров. Создание виджетов — один
+        неделимый шаг: правило KV применяется целиком за один кадр.
+        """
+        sm = self.root
+        if sm.has_screen(screen_name):
             return
         # Динамически импортируем py и kv классы
         import importlib
-        # Сопоставление коротких имён из меню к реальным файлам экранов
-        alias_map = {
-            'profile': 'profile',
-            'history': 'purchase_history',
-            'loyalty': 'loyalty_program',
-            'news': 'news',
-            'our_menu': 'our_menu',
-            'promo': 'promo_input',
-            'referral': 'referral',
-            'addresses': 'our_addresses',
-            'faq': 'faq',
-            'about': 'about_company',
-            'work': 'work_on_us',
-            'write_us': 'write_us',
-            'contacts': 'contacts',
-            'privacy_policy': 'agreement',
-        }
-        base_name = alias_map.get(screen_name, screen_name)
+        base_name = SCREEN_ALIASES.get(screen_name, screen_name)
         screen_py = f"src.screens.{base_name}_screen"
         screen_kv = os.path.join("src", "widgets", f"{base_name}_screen.kv")
         module = importlib.import_module(screen_py)
@@ -120,39 +251,32 @@ class RootApp(MDApp):
             # Фолбэк на базовый Screen на случай отсутствия пользовательского класса
             from kivy.uix.screenmanager import Screen as _KivyScreen
             ScreenClass = _KivyScreen
-        Builder.load_file(os.path.join("src", "widgets", "base_screen.kv"))
-        Builder.load_file(screen_kv)
+        yield
+        # Каждый KV-файл парсится один раз за процесс: base_screen.kv уже подключён
+        # через #:include из main.kv, повторная загрузка дублировала бы правила
+        from src.services.kv_loader import load_kv
+        load_kv(os.path.join("src", "widgets", "base_screen.kv"))
+        load_kv(screen_kv)
+        yield
+        # Экран мог появиться, пока генератор ждал следующего кадра
+        if sm.has_screen(screen_name):
+            return
         # Экземпляр дочернего экрана
         new_screen = ScreenClass(name=screen_name)
+        # В LRU экран попадает только при реальном переходе (_on_screen_changed):
+        # прогретые, но не открытые экраны остаются в холодном конце
         sm.add_widget(new_screen)
-        # Убеждаемся, что предыдущий экран сохранен перед переключением
-        if sm.current and sm.current != screen_name:
-            self._previous_screen = sm.current
-            print(f"[open_screen_by_name] Saved previous screen before creating new: {self._previous_screen}")
-        sm.current = screen_name
-        print(f"[open_screen_by_name] Created and switched to new screen: {screen_name}")
 
-    def open_overlay(self):
-        overlay, panel = self._overlay_refs()
-        if not overlay or not panel:
-            return
-        # Close mail overlay if open to avoid conflicts
-        mail_overlay, _, _ = self._mail_refs()
-        if mail_overlay and mail_overlay.opacity > 0 and not mail_overlay.disabled:
-            self.close_mail_overlay()
-        overlay.size_hint = (1, 1)
-        overlay.size = overlay.parent.size if overlay.parent else overlay.size
-        overlay.opacity = 1
+    def _record_screen_visit(self, screen_name):
+        """Статистика переходов для приоритетов прогрева (пишется в фоне)"""
         try:
-            panel.x = -panel.width
+            from src.services import db as db_layer
+            db_layer.submit(db_layer.record_screen_visit, screen_name)
         except Exception:
             pass
-        def _enable_and_animate(*_):
-            overlay.disabled = False
-            from kivy.animation import Animation
-            Animation(x=0, d=0.22, t='out_cubic').start(panel)
-        from kivy.clock import Clock
-        Clock.schedule_once(_enable_and_animate, 0)
+
+    def open_overlay(self):
+        self.overlays.open('menu')
 
     def overlay_nav(self, screen_name):
         self.close_overlay()
@@ -161,453 +285,49 @@ class RootApp(MDApp):
 
     def logout(self):
         # Простая заглушка выхода — возвращаемся на главный экран
-        try:
-            self.close_mail_overlay()
-        except Exception:
-            pass
-        try:
-            self.close_overlay()
-        except Exception:
-            pass
+        self.overlays.close_all()
         try:
             self.root.current = 'main'
         except Exception:
             pass
 
     def close_overlay(self):
-        overlay, panel = self._overlay_refs()
-        if not overlay or overlay.opacity == 0 or overlay.size == (0, 0):
-            return
-        try:
-            if not panel or getattr(panel, 'parent', None) is None:
-                raise Exception("Открытие overlay невозможно — panel не валиден!")
-            from kivy.animation import Animation
-            def _hide(*_):
-                if overlay:
-                    overlay.opacity = 0
-                    overlay.disabled = True
-                    overlay.size_hint = (None, None)
-                    overlay.size = (0, 0)
-                if panel:
-                    panel.x = -panel.width
-            Animation(x=-panel.width, d=0.18, t='in_cubic').start(panel)
-            Animation(d=0.18).bind(on_complete=_hide).start(panel)
-        except Exception as e:
-            print(f'[overlay] Animation fail: {e}')
-            overlay.opacity = 0
-            overlay.disabled = True
-            overlay.size_hint = (None, None)
-            overlay.size = (0, 0)
-
-    def _overlay_refs(self):
-        sm = self.root
-        if hasattr(sm, 'current_screen') and sm.current_screen:
-            root = getattr(sm.current_screen, 'children', [])[0]  # MainRoot внутри MainScreen
-            try:
-                return root.ids['overlay_root'], root.ids['overlay_panel']
-            except Exception:
-                return None, None
-        return None, None
+        self.overlays.close('menu')
 
     # ----------------------- MAIL OVERLAY -----------------------
-    def _mail_refs(self):
-        sm = self.root
-        if not sm or not hasattr(sm, 'current'):
-            return None, None, None
-        
-        # Получаем текущий экран более надежным способом
-        try:
-            current_screen = sm.get_screen(sm.current) if hasattr(sm, 'get_screen') else (sm.current_screen if hasattr(sm, 'current_screen') else None)
-        except Exception as e:
-            print(f'[mail_refs] Error getting current screen: {e}')
-            current_screen = None
-        
-        if not current_screen:
-            print(f'[mail_refs] No current screen found')
-            return None, None, None
-        
-        # Получаем корневой виджет экрана (обычно первый дочерний элемент)
-        root = None
-        if hasattr(current_screen, 'children') and len(current_screen.children) > 0:
-            root = current_screen.children[0]
-        
-        if not root:
-            print(f'[mail_refs] No root widget found in current screen')
-            return None, None, None
-        
-        print(f'[mail_refs] Root widget type: {type(root).__name__}')
-        print(f'[mail_refs] Root has ids: {hasattr(root, "ids")}')
-        
-        # Ищем overlay по id - пробуем разные способы
-        overlay = None
-        panel = None
-        mail_list = None
-        
-        # Способ 1: прямой доступ через ids словарь корневого виджета
-        if hasattr(root, 'ids'):
-            try:
-                print(f'[mail_refs] Available ids in root: {list(root.ids.keys())}')
-                # Пробуем прямой доступ
-                if 'mail_overlay_root' in root.ids:
-                    overlay = root.ids['mail_overlay_root']
-                if 'mail_panel' in root.ids:
-                    panel = root.ids['mail_panel']
-                if 'mail_list' in root.ids:
-                    mail_list = root.ids['mail_list']
-            except Exception as e:
-                print(f'[mail_refs] Error accessing ids directly: {e}')
-        
-        # Способ 1.5: проверяем ids самого экрана (может быть ids там)
-        if not overlay or not panel or not mail_list:
-            try:
-                if hasattr(current_screen, 'ids'):
-                    print(f'[mail_refs] Available ids in screen: {list(current_screen.ids.keys())}')
-                    if 'mail_overlay_root' in current_screen.ids and not overlay:
-                        overlay = current_screen.ids['mail_overlay_root']
-                    if 'mail_panel' in current_screen.ids and not panel:
-                        panel = current_screen.ids['mail_panel']
-                    if 'mail_list' in current_screen.ids and not mail_list:
-                        mail_list = current_screen.ids['mail_list']
-            except Exception as e:
-                print(f'[mail_refs] Error accessing screen ids: {e}')
-        
-        # Способ 2: рекурсивный поиск по всему дереву виджетов
-        if not overlay or not panel or not mail_list:
-            def find_widget_by_id(widget, widget_id, depth=0, visited=None):
-                """Рекурсивный поиск виджета по id"""
-                if visited is None:
-                    visited = set()
-                
-                if depth > 20 or id(widget) in visited:  # Защита от бесконечной рекурсии
-                    return None
-                
-                visited.add(id(widget))
-                
-                # Проверяем ids текущего виджета
-                if hasattr(widget, 'ids'):
-                    try:
-                        ids_dict = widget.ids
-                        if isinstance(ids_dict, dict) and widget_id in ids_dict:
-                            found = ids_dict[widget_id]
-                            if found is not None:
-                                return found
-                    except Exception as e:
-                        pass
-                
-                # Также проверяем, может быть id хранится как атрибут
-                if hasattr(widget, 'ids'):
-                    try:
-                        # Пробуем получить через getattr
-                        if hasattr(widget.ids, 'get'):
-                            result = widget.ids.get(widget_id)
-                            if result is not None:
-                                return result
-                    except:
-                        pass
-                
-                # Проверяем дочерние виджеты
-                if hasattr(widget, 'children'):
-                    for child in widget.children:
-                        result = find_widget_by_id(child, widget_id, depth + 1, visited)
-                        if result:
-                            return result
-                
-                return None
-            
-            if not overlay:
-                overlay = find_widget_by_id(root, 'mail_overlay_root')
-                print(f'[mail_refs] Recursive search for overlay: {overlay is not None}')
-            if not panel:
-                panel = find_widget_by_id(root, 'mail_panel')
-                print(f'[mail_refs] Recursive search for panel: {panel is not None}')
-            if not mail_list:
-                mail_list = find_widget_by_id(root, 'mail_list')
-                print(f'[mail_refs] Recursive search for mail_list: {mail_list is not None}')
-            
-            # Способ 3: поиск по типу и характеристикам - ищем все FloatLayout и проверяем их ids
-            if not overlay or not panel or not mail_list:
-                from kivy.uix.floatlayout import FloatLayout
-                from kivy.uix.boxlayout import BoxLayout
-                from kivymd.uix.boxlayout import MDBoxLayout
-                
-                def find_all_widgets_by_type(widget, widget_type, depth=0, visited=None):
-                    """Найти все виджеты определенного типа"""
-                    if visited is None:
-                        visited = set()
-                    if depth > 30 or id(widget) in visited:
-                        return []
-                    visited.add(id(widget))
-                    
-                    results = []
-                    if isinstance(widget, widget_type):
-                        results.append(widget)
-                    
-                    if hasattr(widget, 'children'):
-                        for child in widget.children:
-                            results.extend(find_all_widgets_by_type(child, widget_type, depth + 1, visited))
-                    
-                    return results
-                
-                # Ищем все FloatLayout и проверяем их ids
-                all_float_layouts = find_all_widgets_by_type(root, FloatLayout)
-                print(f'[mail_refs] Found {len(all_float_layouts)} FloatLayout widgets')
-                
-                for fl in all_float_layouts:
-                    # Проверяем ids
-                    if hasattr(fl, 'ids'):
-                        try:
-                            if 'mail_overlay_root' in fl.ids and not overlay:
-                                overlay = fl.ids['mail_overlay_root']
-                                print(f'[mail_refs] Found overlay by FloatLayout ids search!')
-                        except:
-                            pass
-                    
-                    # Также проверяем по характеристикам: FloatLayout с opacity=0, disabled=True, size=(0,0)
-                    if not overlay:
-                        try:
-                            if (hasattr(fl, 'opacity') and hasattr(fl, 'disabled') and 
-                                hasattr(fl, 'size') and hasattr(fl, 'size_hint')):
-                                if (fl.opacity == 0 and fl.disabled == True and 
-                                    fl.size == [0, 0] and fl.size_hint == [None, None]):
-                                    # Проверяем, есть ли внутри BoxLayout с id='mail_panel'
-                                    if hasattr(fl, 'children'):
-                                        for child in fl.children:
-                                            if isinstance(child, BoxLayout):
-                                                # Проверяем, есть ли внутри MDBoxLayout с id='mail_list'
-                                                if hasattr(child, 'children'):
-                                                    for grandchild in child.children:
-                                                        if isinstance(grandchild, MDBoxLayout):
-                                                            # Это похоже на наш overlay!
-                                                            overlay = fl
-                                                            print(f'[mail_refs] Found overlay by characteristics!')
-                                                            break
-                                                if overlay:
-                                                    break
-                                    if overlay:
-                                        break
-                        except Exception as e:
-                            pass
-                
-                # Если нашли overlay, ищем panel и mail_list внутри него
-                if overlay and (not panel or not mail_list):
-                    if hasattr(overlay, 'children'):
-                        for child in overlay.children:
-                            if isinstance(child, BoxLayout):
-                                # Проверяем ids
-                                if hasattr(child, 'ids') and 'mail_panel' in child.ids and not panel:
-                                    panel = child.ids['mail_panel']
-                                # Если не нашли по ids, используем сам виджет
-                                if not panel:
-                                    # Проверяем характеристики: BoxLayout с orientation='vertical'
-                                    if hasattr(child, 'orientation') and child.orientation == 'vertical':
-                                        panel = child
-                                        print(f'[mail_refs] Found panel by characteristics!')
-                                
-                                # Ищем mail_list внутри panel - он находится внутри ScrollView
-                                if panel and hasattr(panel, 'children'):
-                                    from kivy.uix.scrollview import ScrollView
-                                    for grandchild in panel.children:
-                                        # Ищем ScrollView
-                                        if isinstance(grandchild, ScrollView):
-                                            # Внутри ScrollView должен быть MDBoxLayout с id='mail_list'
-                                            if hasattr(grandchild, 'children'):
-                                                for great_grandchild in grandchild.children:
-                                                    if isinstance(great_grandchild, MDBoxLayout):
-                                                        # Проверяем ids
-                                                        if hasattr(great_grandchild, 'ids') and 'mail_list' in great_grandchild.ids and not mail_list:
-                                                            mail_list = great_grandchild.ids['mail_list']
-                                                        # Если не нашли по ids, используем сам виджет
-                                                        if not mail_list:
-                                                            mail_list = great_grandchild
-                                                            print(f'[mail_refs] Found mail_list by characteristics!')
-                                                        break
-                                        # Также проверяем напрямую MDBoxLayout (на случай другой структуры)
-                                        elif isinstance(grandchild, MDBoxLayout):
-                                            # Проверяем ids
-                                            if hasattr(grandchild, 'ids') and 'mail_list' in grandchild.ids and not mail_list:
-                                                mail_list = grandchild.ids['mail_list']
-                                            # Если не нашли по ids, используем сам виджет
-                                            if not mail_list:
-                                                mail_list = grandchild
-                                                print(f'[mail_refs] Found mail_list by characteristics (direct)!')
-                                break
-        
-        if overlay and panel and mail_list:
-            print(f'[mail_refs] Successfully found all components!')
-            return overlay, panel, mail_list
-        else:
-            print(f'[mail_refs] Not all components found: overlay={overlay is not None}, panel={panel is not None}, mail_list={mail_list is not None}')
-            # Попробуем найти через поиск по всем виджетам экрана
-            def find_all_widgets(widget, widget_type=None):
-                """Найти все виджеты определенного типа"""
-                results = []
-                if widget_type is None or isinstance(widget, widget_type):
-                    results.append(widget)
-                if hasattr(widget, 'children'):
-                    for child in widget.children:
-                        results.extend(find_all_widgets(child, widget_type))
-                return results
-            
-            all_float_layouts = find_all_widgets(root)
-            print(f'[mail_refs] Total widgets in tree: {len(all_float_layouts)}')
-        return None, None, None
-
     def open_mail_overlay(self):
-        # Пробуем найти overlay с небольшой задержкой, чтобы убедиться, что виджеты построены
-        from kivy.clock import Clock
-        def _try_open(*args):
-            overlay, panel, mail_list = self._mail_refs()
-            if not overlay or not panel or not mail_list:
-                print(f'[open_mail_overlay] Failed to find overlay components. overlay={overlay}, panel={panel}, mail_list={mail_list}')
-                print(f'[open_mail_overlay] Current screen: {self.root.current if self.root else "None"}')
-                return
-            
-            # Close left menu overlay if open to avoid conflicts
-            menu_overlay, _ = self._overlay_refs()
-            if menu_overlay and menu_overlay.opacity > 0 and not menu_overlay.disabled:
-                self.close_overlay()
-            # Show overlay and slide panel from right
-            overlay.size_hint = (1, 1)
-            overlay.size = overlay.parent.size if overlay.parent else overlay.size
-            overlay.opacity = 1
-            overlay.disabled = False
-            try:
-                root = overlay.parent
-                if root:
-                    panel.x = root.width
-            except Exception:
-                pass
-            from kivy.animation import Animation
-            Animation(x=(overlay.parent.width - panel.width) if overlay.parent else 0, d=0.22, t='out_cubic').start(panel)
-            # Populate with random messages every time it's opened
-            self._populate_random_mail(mail_list)
-        
-        # Пробуем сразу, если не получится - с задержкой
-        overlay, panel, mail_list = self._mail_refs()
-        if not overlay or not panel or not mail_list:
-            Clock.schedule_once(_try_open, 0.01)
-        else:
-            _try_open()
-
-    def close_mail_overlay(self):
-        overlay, panel, _ = self._mail_refs()
-        if not overlay:
-            return
-        if not panel:
-            # Фолбэк: просто скрываем затемнение
-            overlay.opacity = 0
-            overlay.disabled = True
-            overlay.size_hint = (None, None)
-            overlay.size = (0, 0)
+        self.overlays.open('mail', on_open=self._show_mail)
+
+    def _show_mail(self, refs):
+        if refs.content is not None:
+            import asynckivy as ak
+            ak.start(self._load_mail(refs.content))
+
+    async def _load_mail(self, mail_list):
+        """Сразу показываем письма из локальной базы, затем докачиваем только новые"""
+        import sqlite3
+        from src.services import db as db_layer
+        from src.services.mail import MailMessage
+        if self._mail_source is None:
+            from src.services.mail import JsonFileSource
+            self._mail_source = JsonFileSource(MAIL_SOURCE_FILE)
+        try:
+            rows = await db_layer.run_async(db_layer.get_messages, None, MAIL_PAGE_SIZE)
+            # MailList сам сравнивает письма с уже показанными и обновляет только изменившиеся строки
+            mail_list.messages = [MailMessage.from_row(row) for row in rows]
+            if await db_layer.run_async(db_layer.sync_messages, self._mail_source):
+                rows = await db_layer.run_async(db_layer.get_messages, None, MAIL_PAGE_SIZE)
+                mail_list.messages = [MailMessage.from_row(row) for row in rows]
+        except (sqlite3.Error, OSError, ValueError) as e:
+            overlay_log.warning("Mail sync failed: %s", e)
             return
-        from kivy.animation import Animation
-        def _hide(*_):
-            overlay.opacity = 0
-            overlay.disabled = True
-            overlay.size_hint = (None, None)
-            overlay.size = (0, 0)
-        target_x = overlay.parent.width if overlay.parent else (panel.x + panel.width)
-        anim = Animation(x=target_x, d=0.18, t='in_cubic')
-        anim.bind(on_complete=lambda *_: _hide())
-        anim.start(panel)
-
-    def _populate_random_mail(self, mail_list):
-        from datetime import datetime, timedelta
-        import random
-        from kivymd.uix.card import MDCard
-        from kivy.uix.boxlayout import BoxLayout
-        from kivy.uix.anchorlayout import AnchorLayout
-        from kivy.uix.label import Label
-
-        # Clear existing
-        mail_list.clear_widgets()
-
-        # Russian months gen
-        months = [
-            'января','февраля','марта','апреля','мая','июня',
-            'июля','августа','сентября','октября','ноября','декабря'
-        ]
-
-        sample_sentences = [
-            'Предварительные выводы неутешительны: рост активности впечатляет.',
-            'Задача организации в особенности актуальна в современных условиях.',
-            'Повседневная практика показывает необходимость глубоких размышлений.',
-            'Намеченные планы требуют уточнения деталей и сроков.',
-            'Синергия усилий команды приносит ощутимый результат.',
-            'Новые горизонты открываются при поддержке наших гостей.',
-            'Мы ценим обратную связь и учитываем все предложения.',
-            'Напоминаем о сезонном меню — загляните на витрину.',
-            'Ваши бонусы ждут: оплачивайте кофе быстрее и выгоднее.',
-            'Спасибо, что вы с нами!'
-        ]
-
-        now = datetime.now()
-        num_messages = random.randint(5, 9)
-        dates = [now - timedelta(days=i) for i in range(num_messages)]
-
-        for dt in dates:
-            # Date header
-            date_text = f"{dt.day} {months[dt.month-1]} {dt.year} г."
-            date_lbl = Label(
-                text=date_text,
-                color=(0, 0, 0, 1),
-                size_hint_y=None,
-                height=28,
-                halign='center',
-                valign='middle'
-            )
-            date_lbl.bind(size=lambda inst, *_: setattr(inst, 'text_size', inst.size))
-            mail_list.add_widget(date_lbl)
-
-            # Message card
-            text = ' '.join(random.sample(sample_sentences, random.randint(2, 4)))
-            time_text = dt.strftime('%H:%M')
-
-            card = MDCard(
-                size_hint=(1, None),
-                radius=[12, 12, 12, 12],
-                padding=(12, 10),
-                md_bg_color=(0.92, 0.92, 0.92, 1)
-            )
-            # Vertical content
-            content = BoxLayout(orientation='vertical', size_hint_y=None, spacing=4)
-
-            msg_lbl = Label(
-                text=text,
-                color=(0, 0, 0, 1),
-                size_hint_y=None,
-                halign='left',
-                valign='top'
-            )
-            msg_lbl.bind(
-                texture_size=lambda inst, *_: (
-                    setattr(inst, 'size', (card.width - 24, inst.texture_size[1]))
-                )
-            )
-            msg_lbl.bind(size=lambda inst, *_: setattr(inst, 'text_size', inst.size))
+        # Показанные письма становятся прочитанными к следующему открытию
+        unread = [message.id for message in mail_list.messages if not message.read]
+        if unread:
+            db_layer.submit(db_layer.mark_messages_read, unread)
 
-            time_row = AnchorLayout(anchor_x='right', anchor_y='center', size_hint_y=None, height=18)
-            time_lbl = Label(
-                text=time_text,
-                color=(0.2, 0.2, 0.2, 1),
-                font_size='11sp',
-                size_hint=(None, None),
-                size=(60, 18)
-            )
-            time_row.add_widget(time_lbl)
-
-            # compute dynamic height after text updates via Clock
-            content.add_widget(msg_lbl)
-            content.add_widget(time_row)
-            card.add_widget(content)
-            mail_list.add_widget(card)
-
-            # Adjust heights on next frame
-            from kivy.clock import Clock
-            def _fix_heights(*_):
-                content.height = msg_lbl.height + time_row.height + 4
-                card.height = content.height + 20
-            Clock.schedule_once(_fix_heights, 0)
+    def close_mail_overlay(self):
+        self.overlays.close('mail')
 
     def footer_addresses_click(self):
         """Обработчик нажатия на кнопку 'Наши кофейни'"""
@@ -618,906 +338,65 @@ class RootApp(MDApp):
         self.open_screen_by_name('referral')
 
     # ----------------------- LOYALTY OVERLAY -----------------------
-    def _loyalty_refs(self):
-        """Получить ссылки на элементы оверлея программы лояльности"""
-        sm = self.root
-        if not sm or not hasattr(sm, 'current'):
-            return None, None, None
-        
-        try:
-            current_screen = sm.get_screen(sm.current) if hasattr(sm, 'get_screen') else (sm.current_screen if hasattr(sm, 'current_screen') else None)
-        except Exception:
-            current_screen = None
-        
-        if not current_screen:
-            return None, None, None
-        
-        root = None
-        if hasattr(current_screen, 'children') and len(current_screen.children) > 0:
-            root = current_screen.children[0]
-        
-        if not root:
-            return None, None, None
-        
-        overlay = None
-        panel = None
-        
-        if hasattr(root, 'ids') and 'loyalty_overlay_root' in root.ids:
-            overlay = root.ids['loyalty_overlay_root']
-            if 'loyalty_panel' in root.ids:
-                panel = root.ids['loyalty_panel']
-        if overlay and not panel and hasattr(overlay, 'ids'):
-            panel = overlay.ids.get('loyalty_panel')
-        
-        return overlay, panel, None
-    
     def open_loyalty_overlay(self):
         """Открыть оверлей программы лояльности"""
-        overlay, panel, _ = self._loyalty_refs()
-        if not overlay:
-            return
-        
-        # Закрываем другие оверлеи
-        mail_overlay, _, _ = self._mail_refs()
-        if mail_overlay and mail_overlay.opacity > 0 and not mail_overlay.disabled:
-            self.close_mail_overlay()
-        menu_overlay, _ = self._overlay_refs()
-        if menu_overlay and menu_overlay.opacity > 0 and not menu_overlay.disabled:
-            self.close_overlay()
-        
-        # Получаем код пользователя и обновляем label
-        try:
-            from src.services import db as db_layer
-            user = db_layer.get_user()
-            user_code = user.get("phone", "").replace("+", "").replace("(", "").replace(")", "").replace("-", "").replace(" ", "")
-            if not user_code:
-                user_code = "13037"  # Дефолтный код
-            
-            # Ищем label с кодом и обновляем оба
-            code_text = user_code[:5] if len(user_code) >= 5 else user_code.zfill(5)
-            if hasattr(overlay, 'ids'):
-                if 'loyalty_code_label' in overlay.ids:
-                    code_label = overlay.ids['loyalty_code_label']
-                    code_label.text = code_text
-                if 'loyalty_code_label_small' in overlay.ids:
-                    code_label_small = overlay.ids['loyalty_code_label_small']
-                    code_label_small.text = code_text
-        except Exception:
-            pass
-        
-        # Показываем overlay
-        overlay.size_hint = (1, 1)
-        overlay.size = overlay.parent.size if overlay.parent else overlay.size
-        overlay.opacity = 1
-        overlay.disabled = False
-        
-        # Подготовка панели: старт снизу и анимация вверх
-        try:
-            if panel and overlay:
-                panel.height = overlay.height * 0.8
-                panel.y = -panel.height
-                from kivy.animation import Animation
-                Animation(y=0, d=0.22, t='out_cubic').start(panel)
-        except Exception:
-            pass
-    
+        self.overlays.open('loyalty')
+
     def close_loyalty_overlay(self):
         """Закрыть оверлей программы лояльности"""
-        overlay, panel, _ = self._loyalty_refs()
-        if not overlay:
-            return
-        
-        try:
-            if panel:
-                from kivy.animation import Animation
-                def _hide(*_):
-                    overlay.opacity = 0
-                    overlay.disabled = True
-                    overlay.size_hint = (None, None)
-                    overlay.size = (0, 0)
-                Animation(y=-panel.height, d=0.18, t='in_cubic').bind(on_complete=lambda *_: _hide()).start(panel)
-                return
-        except Exception:
-            pass
-        overlay.opacity = 0
-        overlay.disabled = True
-        overlay.size_hint = (None, None)
-        overlay.size = (0, 0)
-    
+        self.overlays.close('loyalty')
+
     # ----------------------- LOYALTY PROGRAM INFO OVERLAY -----------------------
-    def _loyalty_program_refs(self):
-        """Получить ссылки на элементы оверлея информации о программе лояльности"""
-        sm = self.root
-        if not sm or not hasattr(sm, 'current'):
-            return None, None
-        
-        try:
-            current_screen = sm.get_screen(sm.current) if hasattr(sm, 'get_screen') else (sm.current_screen if hasattr(sm, 'current_screen') else None)
-        except Exception:
-            current_screen = None
-        
-        if not current_screen:
-            return None, None
-        
-        root = None
-        if hasattr(current_screen, 'children') and len(current_screen.children) > 0:
-            root = current_screen.children[0]
-        
-        if not root:
-            return None, None
-        
-        overlay = None
-        panel = None
-        
-        if hasattr(root, 'ids') and 'loyalty_program_overlay_root' in root.ids:
-            overlay = root.ids['loyalty_program_overlay_root']
-            if 'loyalty_program_panel' in root.ids:
-                panel = root.ids['loyalty_program_panel']
-        
-        return overlay, panel
-    
     def open_loyalty_program_overlay(self):
         """Открыть оверлей информации о программе лояльности"""
-        overlay, panel = self._loyalty_program_refs()
-        if not overlay:
-            return
-        
-        # Закрываем другие оверлеи
-        loyalty_overlay, _, _ = self._loyalty_refs()
-        if loyalty_overlay and loyalty_overlay.opacity > 0 and not loyalty_overlay.disabled:
-            self.close_loyalty_overlay()
-        referral_overlay, _ = self._referral_refs()
-        if referral_overlay and referral_overlay.opacity > 0 and not referral_overlay.disabled:
-            self.close_referral_overlay()
-        mail_overlay, _, _ = self._mail_refs()
-        if mail_overlay and mail_overlay.opacity > 0 and not mail_overlay.disabled:
-            self.close_mail_overlay()
-        menu_overlay, _ = self._overlay_refs()
-        if menu_overlay and menu_overlay.opacity > 0 and not menu_overlay.disabled:
-            self.close_overlay()
-        
-        # Показываем overlay
-        overlay.size_hint = (1, 1)
-        overlay.size = overlay.parent.size if overlay.parent else overlay.size
-        overlay.opacity = 1
-        overlay.disabled = False
-        
-        # Подготовка панели: старт снизу и анимация вверх
-        try:
-            if panel and overlay:
-                panel.height = overlay.height * 0.8
-                panel.y = -panel.height
-                from kivy.animation import Animation
-                Animation(y=0, d=0.22, t='out_cubic').start(panel)
-        except Exception:
-            pass
-    
+        self.overlays.open('loyalty_program')
+
     def close_loyalty_program_overlay(self):
         """Закрыть оверлей информации о программе лояльности"""
-        overlay, panel = self._loyalty_program_refs()
-        if not overlay:
-            return
-        
-        try:
-            if panel:
-                from kivy.animation import Animation
-                def _hide(*_):
-                    overlay.opacity = 0
-                    overlay.disabled = True
-                    overlay.size_hint = (None, None)
-                    overlay.size = (0, 0)
-                Animation(y=-panel.height, d=0.18, t='in_cubic').bind(on_complete=lambda *_: _hide()).start(panel)
-                return
-        except Exception:
-            pass
-        overlay.opacity = 0
-        overlay.disabled = True
-        overlay.size_hint = (None, None)
-        overlay.size = (0, 0)
+        self.overlays.close('loyalty_program')
 
     # ----------------------- REFERRAL OVERLAY -----------------------
-    def _referral_refs(self):
-        """Получить ссылки на элементы оверлея приглашения друга"""
-        sm = self.root
-        if not sm or not hasattr(sm, 'current'):
-            return None, None
-        
-        try:
-            current_screen = sm.get_screen(sm.current) if hasattr(sm, 'get_screen') else (sm.current_screen if hasattr(sm, 'current_screen') else None)
-        except Exception:
-            current_screen = None
-        
-        if not current_screen:
-            return None, None
-        
-        root = None
-        if hasattr(current_screen, 'children') and len(current_screen.children) > 0:
-            root = current_screen.children[0]
-        
-        if not root:
-            return None, None
-        
-        overlay = None
-        panel = None
-        
-        if hasattr(root, 'ids') and 'referral_overlay_root' in root.ids:
-            overlay = root.ids['referral_overlay_root']
-            if 'referral_panel' in root.ids:
-                panel = root.ids['referral_panel']
-        
-        return overlay, panel
-    
     def open_referral_overlay(self):
         """Открыть оверлей приглашения друга"""
-        overlay, panel = self._referral_refs()
-        if not overlay:
-            return
-        
-        # Закрываем другие оверлеи
-        loyalty_overlay, _, _ = self._loyalty_refs()
-        if loyalty_overlay and loyalty_overlay.opacity > 0 and not loyalty_overlay.disabled:
-            self.close_loyalty_overlay()
-        loyalty_program_overlay, _ = self._loyalty_program_refs()
-        if loyalty_program_overlay and loyalty_program_overlay.opacity > 0 and not loyalty_program_overlay.disabled:
-            self.close_loyalty_program_overlay()
-        mail_overlay, _, _ = self._mail_refs()
-        if mail_overlay and mail_overlay.opacity > 0 and not mail_overlay.disabled:
-            self.close_mail_overlay()
-        menu_overlay, _ = self._overlay_refs()
-        if menu_overlay and menu_overlay.opacity > 0 and not menu_overlay.disabled:
-            self.close_overlay()
-        
-        # Показываем overlay
-        overlay.size_hint = (1, 1)
-        overlay.size = overlay.parent.size if overlay.parent else overlay.size
-        overlay.opacity = 1
-        overlay.disabled = False
-        
-        # Подготовка панели: старт снизу и анимация вверх
-        try:
-            if panel and overlay:
-                panel.height = overlay.height * 0.8
-                panel.y = -panel.height
-                from kivy.animation import Animation
-                Animation(y=0, d=0.22, t='out_cubic').start(panel)
-        except Exception:
-            pass
-    
+        self.overlays.open('referral')
+
     def close_referral_overlay(self):
         """Закрыть оверлей приглашения друга"""
-        overlay, panel = self._referral_refs()
-        if not overlay:
-            return
-        
-        try:
-            if panel:
-                from kivy.animation import Animation
-                def _hide(*_):
-                    overlay.opacity = 0
-                    overlay.disabled = True
-                    overlay.size_hint = (None, None)
-                    overlay.size = (0, 0)
-                Animation(y=-panel.height, d=0.18, t='in_cubic').bind(on_complete=lambda *_: _hide()).start(panel)
-                return
-        except Exception:
-            pass
-        overlay.opacity = 0
-        overlay.disabled = True
-        overlay.size_hint = (None, None)
-        overlay.size = (0, 0)
+        self.overlays.close('referral')
 
     # ----------------------- DRINKS MENU OVERLAY -----------------------
-    def _drinks_menu_refs(self):
-        """Получить ссылки на элементы оверлея меню напитков"""
-        sm = self.root
-        if not sm or not hasattr(sm, 'current'):
-            return None, None
-        
-        try:
-            current_screen = sm.get_screen(sm.current) if hasattr(sm, 'get_screen') else (sm.current_screen if hasattr(sm, 'current_screen') else None)
-        except Exception:
-            current_screen = None
-        
-        if not current_screen:
-            return None, None
-        
-        root = None
-        if hasattr(current_screen, 'children') and len(current_screen.children) > 0:
-            root = current_screen.children[0]
-        
-        if not root:
-            return None, None
-        
-        overlay = None
-        panel = None
-        
-        if hasattr(root, 'ids') and 'drinks_menu_overlay_root' in root.ids:
-            overlay = root.ids['drinks_menu_overlay_root']
-            if 'drinks_menu_panel' in root.ids:
-                panel = root.ids['drinks_menu_panel']
-        
-        return overlay, panel
-    
     def open_drinks_menu_overlay(self):
         """Открыть оверлей меню напитков"""
-        overlay, panel = self._drinks_menu_refs()
-        if not overlay:
-            return
-        
-        # Закрываем другие оверлеи
-        referral_overlay, _ = self._referral_refs()
-        if referral_overlay and referral_overlay.opacity > 0 and not referral_overlay.disabled:
-            self.close_referral_overlay()
-        loyalty_program_overlay, _ = self._loyalty_program_refs()
-        if loyalty_program_overlay and loyalty_program_overlay.opacity > 0 and not loyalty_program_overlay.disabled:
-            self.close_loyalty_program_overlay()
-        loyalty_overlay, _, _ = self._loyalty_refs()
-        if loyalty_overlay and loyalty_overlay.opacity > 0 and not loyalty_overlay.disabled:
-            self.close_loyalty_overlay()
-        mail_overlay, _, _ = self._mail_refs()
-        if mail_overlay and mail_overlay.opacity > 0 and not mail_overlay.disabled:
-            self.close_mail_overlay()
-        menu_overlay, _ = self._overlay_refs()
-        if menu_overlay and menu_overlay.opacity > 0 and not menu_overlay.disabled:
-            self.close_overlay()
-        
-        # Показываем overlay
-        overlay.size_hint = (1, 1)
-        overlay.size = overlay.parent.size if overlay.parent else overlay.size
-        overlay.opacity = 1
-        overlay.disabled = False
-        
-        # Подготовка панели: старт снизу и анимация вверх
-        try:
-            if panel and overlay:
-                panel.height = overlay.height * 0.8
-                panel.y = -panel.height
-                from kivy.animation import Animation
-                Animation(y=0, d=0.22, t='out_cubic').start(panel)
-        except Exception:
-            pass
-    
+        self.overlays.open('drinks_menu')
+
     def close_drinks_menu_overlay(self):
         """Закрыть оверлей меню напитков"""
-        overlay, panel = self._drinks_menu_refs()
-        if not overlay:
-            return
-        
-        try:
-            if panel:
-                from kivy.animation import Animation
-                def _hide(*_):
-                    overlay.opacity = 0
-                    overlay.disabled = True
-                    overlay.size_hint = (None, None)
-                    overlay.size = (0, 0)
-                Animation(y=-panel.height, d=0.18, t='in_cubic').bind(on_complete=lambda *_: _hide()).start(panel)
-                return
-        except Exception:
-            pass
-        overlay.opacity = 0
-        overlay.disabled = True
-        overlay.size_hint = (None, None)
-        overlay.size = (0, 0)
+        self.overlays.close('drinks_menu')
 
     # ----------------------- GIFT OVERLAY (10-й напиток) -----------------------
-    def _gift_refs(self):
-        """Получить ссылки на элементы оверлея подарочного напитка"""
-        sm = self.root
-        if not sm or not hasattr(sm, 'current'):
-            return None, None
-
-        try:
-            current_screen = sm.get_screen(sm.current) if hasattr(sm, 'get_screen') else (
-                sm.current_screen if hasattr(sm, 'current_screen') else None
-            )
-        except Exception:
-            current_screen = None
-
-        if not current_screen:
-            return None, None
-
-        root = None
-        if hasattr(current_screen, 'children') and len(current_screen.children) > 0:
-            root = current_screen.children[0]
-
-        if not root:
-            return None, None
-
-        overlay = None
-        panel = None
-
-        if hasattr(root, 'ids'):
-            try:
-                if 'gift_overlay_root' in root.ids:
-                    overlay = root.ids['gift_overlay_root']
-                if 'gift_panel' in root.ids:
-                    panel = root.ids['gift_panel']
-            except Exception:
-                pass
-
-        if (not overlay or not panel) and hasattr(current_screen, 'ids'):
-            try:
-                if 'gift_overlay_root' in current_screen.ids and not overlay:
-                    overlay = current_screen.ids['gift_overlay_root']
-                if 'gift_panel' in current_screen.ids and not panel:
-                    panel = current_screen.ids['gift_panel']
-            except Exception:
-                pass
-
-        def find_widget_by_id(widget, widget_id, depth=0, visited=None):
-            if visited is None:
-                visited = set()
-
-            if depth > 40 or id(widget) in visited:
-                return None
-
-            visited.add(id(widget))
-
-            if hasattr(widget, 'ids'):
-                try:
-                    ids_dict = widget.ids
-                    if isinstance(ids_dict, dict) and widget_id in ids_dict:
-                        found = ids_dict[widget_id]
-                        if found is not None:
-                            return found
-                except Exception:
-                    pass
-
-            if hasattr(widget, 'children'):
-                for child in widget.children:
-                    result = find_widget_by_id(child, widget_id, depth + 1, visited)
-                    if result:
-                        return result
-
-            return None
-
-        if not overlay:
-            overlay = find_widget_by_id(root, 'gift_overlay_root')
-        if not panel:
-            panel = find_widget_by_id(root, 'gift_panel')
-
-        if not overlay or not panel:
-            from kivy.uix.floatlayout import FloatLayout
-            from kivy.uix.boxlayout import BoxLayout
-
-            def find_all_widgets_by_type(widget, widget_type, depth=0, visited=None):
-                if visited is None:
-                    visited = set()
-                if depth > 40 or id(widget) in visited:
-                    return []
-                visited.add(id(widget))
-
-                results = []
-                if isinstance(widget, widget_type):
-                    results.append(widget)
-
-                if hasattr(widget, 'children'):
-                    for child in widget.children:
-                        results.extend(find_all_widgets_by_type(child, widget_type, depth + 1, visited))
-
-                return results
-
-            all_float_layouts = find_all_widgets_by_type(root, FloatLayout)
-            for fl in all_float_layouts:
-                if overlay and panel:
-                    break
-
-                if hasattr(fl, 'ids'):
-                    try:
-                        if 'gift_overlay_root' in fl.ids and not overlay:
-                            overlay = fl.ids['gift_overlay_root']
-                        if 'gift_panel' in fl.ids and not panel:
-                            panel = fl.ids['gift_panel']
-                    except Exception:
-                        pass
-
-                size_val = getattr(fl, 'size', None)
-                size_match = False
-                if size_val is not None:
-                    try:
-                        size_match = tuple(size_val) == (0, 0)
-                    except Exception:
-                        size_match = False
-
-                if (not overlay and hasattr(fl, 'opacity') and hasattr(fl, 'disabled') and size_match and
-                        getattr(fl, 'disabled', True) and getattr(fl, 'opacity', 0) == 0):
-                    if hasattr(fl, 'children'):
-                        for child in fl.children:
-                            if isinstance(child, BoxLayout):
-                                if hasattr(child, 'ids') and 'gift_panel' in child.ids:
-                                    overlay = fl
-                                    panel = child.ids['gift_panel']
-                                    break
-                                if not panel and getattr(child, 'orientation', '') == 'vertical':
-                                    panel = child
-                                    overlay = fl
-                                    break
-
-        return overlay, panel
-
     def open_gift_overlay(self):
         """Открыть оверлей акции "10-й напиток в подарок" (50% высоты)"""
-        from kivy.clock import Clock
-
-        def _try_open(*_):
-            overlay, panel = self._gift_refs()
-            if not overlay or not panel:
-                return
-
-            try:
-                drinks_overlay, _ = self._drinks_menu_refs()
-                if drinks_overlay and drinks_overlay.opacity > 0 and not drinks_overlay.disabled:
-                    self.close_drinks_menu_overlay()
-                referral_overlay, _ = self._referral_refs()
-                if referral_overlay and referral_overlay.opacity > 0 and not referral_overlay.disabled:
-                    self.close_referral_overlay()
-                loyalty_program_overlay, _ = self._loyalty_program_refs()
-                if loyalty_program_overlay and loyalty_program_overlay.opacity > 0 and not loyalty_program_overlay.disabled:
-                    self.close_loyalty_program_overlay()
-                loyalty_overlay, _, _ = self._loyalty_refs()
-                if loyalty_overlay and loyalty_overlay.opacity > 0 and not loyalty_overlay.disabled:
-                    self.close_loyalty_overlay()
-                mail_overlay, _, _ = self._mail_refs()
-                if mail_overlay and mail_overlay.opacity > 0 and not mail_overlay.disabled:
-                    self.close_mail_overlay()
-                menu_overlay, _ = self._overlay_refs()
-                if menu_overlay and menu_overlay.opacity > 0 and not menu_overlay.disabled:
-                    self.close_overlay()
-                status_overlay, _ = self._status_refs()
-                if status_overlay and status_overlay.opacity > 0 and not status_overlay.disabled:
-                    self.close_status_overlay()
-            except Exception:
-                pass
-
-            overlay.size_hint = (1, 1)
-            overlay.size = overlay.parent.size if overlay.parent else overlay.size
-            overlay.opacity = 1
-            overlay.disabled = False
-
-            try:
-                if panel and overlay:
-                    panel.height = overlay.height * 0.8
-                    panel.y = -panel.height
-                    from kivy.animation import Animation
-                    Animation(y=0, d=0.22, t='out_cubic').start(panel)
-            except Exception:
-                pass
-
-        overlay, panel = self._gift_refs()
-        if not overlay or not panel:
-            Clock.schedule_once(_try_open, 0.01)
-        else:
-            _try_open()
+        self.overlays.open('gift')
 
     def close_gift_overlay(self):
         """Закрыть оверлей акции "10-й напиток в подарок"""
-        overlay, panel = self._gift_refs()
-        if not overlay:
-            return
-
-        try:
-            if panel:
-                from kivy.animation import Animation
-
-                def _hide(*_):
-                    overlay.opacity = 0
-                    overlay.disabled = True
-                    overlay.size_hint = (None, None)
-                    overlay.size = (0, 0)
-
-                Animation(y=-panel.height, d=0.18, t='in_cubic').bind(on_complete=lambda *_: _hide()).start(panel)
-                return
-        except Exception:
-            pass
-
-        overlay.opacity = 0
-        overlay.disabled = True
-        overlay.size_hint = (None, None)
-        overlay.size = (0, 0)
+        self.overlays.close('gift')
 
     # ----------------------- STATUS OVERLAY -----------------------
-    def _status_refs(self):
-        """Получить ссылки на элементы оверлея статусов"""
-        sm = self.root
-        if not sm or not hasattr(sm, 'current'):
-            return None, None
-        
-        try:
-            current_screen = sm.get_screen(sm.current) if hasattr(sm, 'get_screen') else (sm.current_screen if hasattr(sm, 'current_screen') else None)
-        except Exception as e:
-            print(f'[_status_refs] Error getting current screen: {e}')
-            current_screen = None
-        
-        if not current_screen:
-            print(f'[_status_refs] No current screen found')
-            return None, None
-        
-        root = None
-        if hasattr(current_screen, 'children') and len(current_screen.children) > 0:
-            root = current_screen.children[0]
-        
-        if not root:
-            print(f'[_status_refs] No root widget found in current screen')
-            return None, None
-        
-        overlay = None
-        panel = None
-        
-        # Способ 1: прямой доступ через ids словарь корневого виджета
-        if hasattr(root, 'ids'):
-            try:
-                print(f'[_status_refs] Available ids in root: {list(root.ids.keys())}')
-                if 'status_overlay_root' in root.ids:
-                    overlay = root.ids['status_overlay_root']
-                    print(f'[_status_refs] Found overlay by direct ids access')
-                if 'status_panel' in root.ids:
-                    panel = root.ids['status_panel']
-                    print(f'[_status_refs] Found panel by direct ids access')
-            except Exception as e:
-                print(f'[_status_refs] Error accessing ids directly: {e}')
-        
-        # Способ 1.5: проверяем ids самого экрана (может быть ids там)
-        if not overlay or not panel:
-            try:
-                if hasattr(current_screen, 'ids'):
-                    print(f'[_status_refs] Available ids in screen: {list(current_screen.ids.keys())}')
-                    if 'status_overlay_root' in current_screen.ids and not overlay:
-                        overlay = current_screen.ids['status_overlay_root']
-                        print(f'[_status_refs] Found overlay by screen ids access')
-                    if 'status_panel' in current_screen.ids and not panel:
-                        panel = current_screen.ids['status_panel']
-                        print(f'[_status_refs] Found panel by screen ids access')
-            except Exception as e:
-                print(f'[_status_refs] Error accessing screen ids: {e}')
-        
-        # Способ 2: рекурсивный поиск по всему дереву виджетов
-        if not overlay or not panel:
-            def find_widget_by_id(widget, widget_id, depth=0, visited=None):
-                """Рекурсивный поиск виджета по id"""
-                if visited is None:
-                    visited = set()
-                
-                if depth > 30 or id(widget) in visited:
-                    return None
-                
-                visited.add(id(widget))
-                
-                # Проверяем ids текущего виджета
-                if hasattr(widget, 'ids'):
-                    try:
-                        ids_dict = widget.ids
-                        if isinstance(ids_dict, dict) and widget_id in ids_dict:
-                            found = ids_dict[widget_id]
-                            if found is not None:
-                                return found
-                    except Exception:
-                        pass
-                
-                # Проверяем дочерние виджеты
-                if hasattr(widget, 'children'):
-                    for child in widget.children:
-                        result = find_widget_by_id(child, widget_id, depth + 1, visited)
-                        if result:
-                            return result
-                
-                return None
-            
-            if not overlay:
-                overlay = find_widget_by_id(root, 'status_overlay_root')
-                print(f'[_status_refs] Recursive search for overlay: {overlay is not None}')
-            if not panel:
-                panel = find_widget_by_id(root, 'status_panel')
-                print(f'[_status_refs] Recursive search for panel: {panel is not None}')
-        
-        # Способ 3: поиск по типу виджета (как в _mail_refs)
-        if not overlay or not panel:
-            from kivy.uix.floatlayout import FloatLayout
-            from kivy.uix.boxlayout import BoxLayout
-            
-            def find_all_widgets_by_type(widget, widget_type, depth=0, visited=None):
-                """Найти все виджеты определенного типа"""
-                if visited is None:
-                    visited = set()
-                if depth > 30 or id(widget) in visited:
-                    return []
-                visited.add(id(widget))
-                
-                results = []
-                if isinstance(widget, widget_type):
-                    results.append(widget)
-                
-                if hasattr(widget, 'children'):
-                    for child in widget.children:
-                        results.extend(find_all_widgets_by_type(child, widget_type, depth + 1, visited))
-                
-                return results
-            
-            # Ищем все FloatLayout и проверяем их ids
-            all_float_layouts = find_all_widgets_by_type(root, FloatLayout)
-            print(f'[_status_refs] Found {len(all_float_layouts)} FloatLayout widgets')
-            
-            for fl in all_float_layouts:
-                # Проверяем ids
-                if hasattr(fl, 'ids'):
-                    try:
-                        if 'status_overlay_root' in fl.ids and not overlay:
-                            overlay = fl.ids['status_overlay_root']
-                            print(f'[_status_refs] Found overlay by FloatLayout ids search!')
-                    except:
-                        pass
-                
-                # Также проверяем по характеристикам: FloatLayout с opacity=0, disabled=True, size=(0,0)
-                if not overlay:
-                    try:
-                        if (hasattr(fl, 'opacity') and hasattr(fl, 'disabled') and 
-                            hasattr(fl, 'size') and hasattr(fl, 'size_hint')):
-                            # Проверяем size как кортеж или список
-                            size_match = (fl.size == (0, 0) or fl.size == [0, 0] or 
-                                         (hasattr(fl.size, '__len__') and len(fl.size) == 2 and fl.size[0] == 0 and fl.size[1] == 0))
-                            size_hint_match = (fl.size_hint == (None, None) or fl.size_hint == [None, None] or
-                                               (hasattr(fl.size_hint, '__len__') and len(fl.size_hint) == 2 and 
-                                                fl.size_hint[0] is None and fl.size_hint[1] is None))
-                            if (fl.opacity == 0 and fl.disabled == True and size_match and size_hint_match):
-                                # Проверяем, есть ли внутри BoxLayout с id='status_panel'
-                                if hasattr(fl, 'children'):
-                                    for child in fl.children:
-                                        if isinstance(child, BoxLayout):
-                                            # Проверяем ids
-                                            if hasattr(child, 'ids') and 'status_panel' in child.ids:
-                                                overlay = fl
-                                                panel = child.ids['status_panel']
-                                                print(f'[_status_refs] Found overlay and panel by characteristics!')
-                                                break
-                                    if overlay:
-                                        break
-                    except Exception as e:
-                        print(f'[_status_refs] Error in characteristics check: {e}')
-                        pass
-            
-            # Если нашли overlay, ищем panel внутри него
-            if overlay and not panel:
-                if hasattr(overlay, 'children'):
-                    for child in overlay.children:
-                        if isinstance(child, BoxLayout):
-                            # Проверяем ids
-                            if hasattr(child, 'ids') and 'status_panel' in child.ids:
-                                panel = child.ids['status_panel']
-                            # Если не нашли по ids, используем сам виджет
-                            if not panel:
-                                # Проверяем характеристики: BoxLayout с orientation='vertical'
-                                if hasattr(child, 'orientation') and child.orientation == 'vertical':
-                                    panel = child
-                                    print(f'[_status_refs] Found panel by characteristics!')
-                            break
-        
-        if overlay and panel:
-            print(f'[_status_refs] Successfully found all components!')
-        else:
-            print(f'[_status_refs] Not all components found: overlay={overlay is not None}, panel={panel is not None}')
-        
-        return overlay, panel
-    
     def open_status_overlay(self):
         """Открыть оверлей информации о статусах"""
-        # Пробуем найти overlay с небольшой задержкой, чтобы убедиться, что виджеты построены
-        from kivy.clock import Clock
-        def _try_open(*args):
-            overlay, panel = self._status_refs()
-            if not overlay or not panel:
-                print(f'[open_status_overlay] Failed to find overlay components. overlay={overlay}, panel={panel}')
-                print(f'[open_status_overlay] Current screen: {self.root.current if self.root else "None"}')
-                return
-            
-            # Закрываем другие оверлеи
-            drinks_overlay, _ = self._drinks_menu_refs()
-            if drinks_overlay and drinks_overlay.opacity > 0 and not drinks_overlay.disabled:
-                self.close_drinks_menu_overlay()
-            referral_overlay, _ = self._referral_refs()
-            if referral_overlay and referral_overlay.opacity > 0 and not referral_overlay.disabled:
-                self.close_referral_overlay()
-            loyalty_program_overlay, _ = self._loyalty_program_refs()
-            if loyalty_program_overlay and loyalty_program_overlay.opacity > 0 and not loyalty_program_overlay.disabled:
-                self.close_loyalty_program_overlay()
-            loyalty_overlay, _, _ = self._loyalty_refs()
-            if loyalty_overlay and loyalty_overlay.opacity > 0 and not loyalty_overlay.disabled:
-                self.close_loyalty_overlay()
-            mail_overlay, _, _ = self._mail_refs()
-            if mail_overlay and mail_overlay.opacity > 0 and not mail_overlay.disabled:
-                self.close_mail_overlay()
-            menu_overlay, _ = self._overlay_refs()
-            if menu_overlay and menu_overlay.opacity > 0 and not menu_overlay.disabled:
-                self.close_overlay()
-            
-            # Показываем overlay
-            overlay.size_hint = (1, 1)
-            overlay.size = overlay.parent.size if overlay.parent else overlay.size
-            overlay.opacity = 1
-            overlay.disabled = False
-            
-            # Подготовка панели: старт снизу и анимация вверх
-            try:
-                if panel and overlay:
-                    panel.height = overlay.height * 0.8
-                    panel.y = -panel.height
-                    from kivy.animation import Animation
-                    Animation(y=0, d=0.22, t='out_cubic').start(panel)
-            except Exception as e:
-                print(f'[open_status_overlay] Error animating panel: {e}')
-        
-        # Пробуем сразу, если не получится - с задержкой
-        overlay, panel = self._status_refs()
-        if not overlay or not panel:
-            Clock.schedule_once(_try_open, 0.01)
-        else:
-            _try_open()
-    
+        self.overlays.open('status')
+
     def close_status_overlay(self):
         """Закрыть оверлей информации о статусах"""
-        overlay, panel = self._status_refs()
-        if not overlay:
-            return
-        
-        try:
-            if panel:
-                from kivy.animation import Animation
-                def _hide(*_):
-                    overlay.opacity = 0
-                    overlay.disabled = True
-                    overlay.size_hint = (None, None)
-                    overlay.size = (0, 0)
-                Animation(y=-panel.height, d=0.18, t='in_cubic').bind(on_complete=lambda *_: _hide()).start(panel)
-                return
-        except Exception:
-            pass
-        overlay.opacity = 0
-        overlay.disabled = True
-        overlay.size_hint = (None, None)
-        overlay.size = (0, 0)
+        self.overlays.close('status')
 
     # ---- Global keyboard handler ----
     def _on_key_down(self, _window, key, scancode, codepoint, modifiers):
         # Esc on desktop, Back on mobile (27 or 1001 depending on platform)
         if key in (27, 1001):
-            # Try to close status overlay first
-            overlay, _ = self._status_refs()
-            if overlay and overlay.opacity > 0 and not overlay.disabled:
-                self.close_status_overlay()
-                return True
-            # Try to close gift overlay
-            overlay, _ = self._gift_refs()
-            if overlay and overlay.opacity > 0 and not overlay.disabled:
-                self.close_gift_overlay()
-                return True
-            # Try to close drinks menu overlay first
-            overlay, _ = self._drinks_menu_refs()
-            if overlay and overlay.opacity > 0 and not overlay.disabled:
-                self.close_drinks_menu_overlay()
-                return True
-            # Try to close referral overlay
-            overlay, _ = self._referral_refs()
-            if overlay and overlay.opacity > 0 and not overlay.disabled:
-                self.close_referral_overlay()
-                return True
-            # Try to close loyalty program overlay
-            overlay, _ = self._loyalty_program_refs()
-            if overlay and overlay.opacity > 0 and not overlay.disabled:
-                self.close_loyalty_program_overlay()
-                return True
-            # Try to close loyalty overlay (code overlay)
-            overlay, _, _ = self._loyalty_refs()
-            if overlay and overlay.opacity > 0 and not overlay.disabled:
-                self.close_loyalty_overlay()
-                return True
-            # Try to close mail overlay
-            overlay, _, _ = self._mail_refs()
-            if overlay and overlay.opacity > 0 and not overlay.disabled:
-                self.close_mail_overlay()
-                return True
-            # Close left overlay if open
-            overlay_root, _ = self._overlay_refs()
-            if overlay_root and overlay_root.opacity > 0 and not overlay_root.disabled:
-                self.close_overlay()
+            # Закрываем верхний открытый оверлей текущего экрана — одна проверка стека
+            if self.overlays.close_top():
                 return True
         return False
 
@@ -0,0 +1,213 @@
+from kivy.animation import Animation
+from kivy.core.text import Label as CoreLabel
+from kivy.core.window import Window
+from kivy.metrics import dp, sp
+from kivy.properties import BooleanProperty, ListProperty, NumericProperty, StringProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.image import Image
+from kivy.uix.label import Label
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.screenmanager import Screen
+from kivy.uix.stencilview import StencilView
+from kivy.uix.widget import Widget
+
+from src.services.image_cache import textures
+from src.services.image_loader import PRIORITY_OFFSCREEN, PRIORITY_VISIBLE, loader as image_loader
+from src.services.mail import inbox_rows, patch_rows
+from src.services.menu_catalog import catalog, grid_rows
+from src.services.variants import pick as pick_variant
+from src.services.overlays import registry
+
+
+class OverlayScreen(Screen):
+    """Экран с оверлеями: регистрирует их в реестре один раз после применения KV"""
+
+    def on_kv_post(self, base_widget):
+        super().on_kv_post(base_widget)
+        registry.register_screen(self)
+
+
+class CachedImage(Image):
+    """Image, чья текстура берётся из общего кэша: одинаковые картинки декодируются один раз.
+
+    Из готовых вариантов 1x/2x/3x берётся наименьший, покрывающий размер виджета в пикселях.
+    """
+
+    def __init__(self, **kwargs):
+        self._resolved = None
+        super().__init__(**kwargs)
+
+    def set_texture_from_resource(self, resource):
+        if not resource:
+            self._resolved = None
+            self._clear_core_image()
+            return
+        self._resolved = pick_variant(resource, self.width, self.height)
+        texture = textures.get(self._resolved)
+        self._clear_core_image()
+        self.texture = texture
+
+    def on_size(self, *_):
+        # После раскладки размер известен точно — возможно, подходит другой вариант
+        if self.source and pick_variant(self.source, self.width, self.height) != self._resolved:
+            self.texture_update()
+
+
+class AsyncCachedImage(CachedImage):
+    """CachedImage, который декодирует файл в фоне: до загрузки рисуется заглушка, затем картинка проявляется.
+
+    Картинки, видимые в своём ScrollView/Carousel, декодируются раньше остальных;
+    ожидающая картинка, прокрученная в зону видимости, поднимается в очереди.
+    """
+    loaded = BooleanProperty(False)
+    FADE_DURATION = 0.2
+
+    def set_texture_from_resource(self, resource):
+        if not resource:
+            super().set_texture_from_resource(resource)
+            return
+        self._resolved = pick_variant(resource, self.width, self.height)
+        self._clear_core_image()
+        Animation.cancel_all(self, 'color')
+        texture = textures.peek(self._resolved)
+        if texture is not None:
+            self.texture = texture
+            self.color = self.color[:3] + [1]
+            self.loaded = True
+            return
+        self.loaded = False
+        self.color = self.color[:3] + [0]
+        priority = PRIORITY_VISIBLE if self.is_visible() else PRIORITY_OFFSCREEN
+        image_loader.load(self._resolved, self._on_texture_ready, priority)
+
+    def _on_texture_ready(self, source, texture):
+        if source != self._resolved:
+            return  # source успел смениться
+        self.texture = texture
+        self.loaded = True
+        Animation(color=self.color[:3] + [1], d=self.FADE_DURATION).start(self)
+
+    def on_pos(self, *_):
+        if not self.loaded and self._resolved and self.is_visible():
+            image_loader.prioritize(self._resolved)
+
+    def is_visible(self):
+        """Пересекается ли виджет с окном и с областью просмотра всех StencilView-предков"""
+        if not self.get_root_window():
+            return False
+        left, bottom = self.to_window(*self.pos)
+        if not _overlaps(left, bottom, self.width, self.height, 0, 0, Window.width, Window.height):
+            return False
+        parent = self.parent
+        while parent is not None and parent.parent is not parent:
+            if parent.opacity == 0:
+                return False  # скрытый оверлей
+            if isinstance(parent, StencilView):
+                px, py = parent.to_window(*parent.pos)
+                if not _overlaps(left, bottom, self.width, self.height, px, py, parent.width, parent.height):
+                    return False
+            parent = parent.parent
+        return True
+
+
+def _overlaps(x, y, w, h, ox, oy, ow, oh):
+    return x < ox + ow and ox < x + w and y < oy + oh and oy < y + h
+
+
+# ----------------------- Почта -----------------------
+# Геометрия карточки письма; те же значения использует правило <MailMessageRow> в base_screen.kv
+MAIL_FONT = "assets/fonts/minecraft.ttf"
+MAIL_FONT_SIZE = 15  # sp
+MAIL_PADDING_X = 12  # dp
+MAIL_PADDING_Y = 10  # dp
+MAIL_SPACING = 4  # dp
+MAIL_TIME_HEIGHT = 18  # dp
+MAIL_HEADER_HEIGHT = 28  # dp
+
+# (текст, ширина) -> высота карточки; общий для списков почты всех экранов
+_mail_heights = {}
+
+
+class MailDateRow(Label):
+    """Заголовок с датой над письмом"""
+
+
+class MailMessageRow(BoxLayout):
+    """Карточка письма; экземпляры переиспользуются RecycleView"""
+    text = StringProperty("")
+    time_text = StringProperty("")
+    unread = BooleanProperty(False)
+
+
+class MailList(RecycleView):
+    """Список входящих: высоты строк считаются заранее, при обновлении меняются только отличающиеся строки"""
+    messages = ListProperty()
+
+    def on_messages(self, *_):
+        self._update_rows()
+
+    def on_width(self, *_):
+        self._update_rows()
+
+    def _update_rows(self):
+        if self.width <= 1:
+            # Ещё не разложен — строки построятся после первого layout
+            return
+        width = int(self.width)
+        heights = {message.id: mail_card_height(message.text, width) for message in self.messages}
+        patch_rows(self.data, inbox_rows(self.messages, heights, dp(MAIL_HEADER_HEIGHT)))
+
+
+def mail_card_height(text, width):
+    """Высота карточки письма шириной width без создания виджета"""
+    key = (text, width)
+    height = _mail_heights.get(key)
+    if height is None:
+        # Только раскладка текста (render без real=True) — текстура не создаётся
+        label = CoreLabel(
+            text=text,
+            font_name=MAIL_FONT,
+            font_size=sp(MAIL_FONT_SIZE),
+            text_size=(width - 2 * dp(MAIL_PADDING_X), None),
+        )
+        height = label.render()[1] + dp(MAIL_SPACING) + dp(MAIL_TIME_HEIGHT) + 2 * dp(MAIL_PADDING_Y)
+        _mail_heights[key] = height
+    return height
+
+
+# ----------------------- Меню -----------------------
+# Размеры ячеек сетки меню; те же значения использует правило <DrinkGrid> в base_screen.kv
+DRINK_CARD_WIDTH = 160  # dp
+DRINK_CARD_HEIGHT = 200  # dp
+MENU_HEADER_HEIGHT = 32  # dp
+
+
+class DrinkCard(BoxLayout):
+    """Карточка напитка; экземпляры переиспользуются RecycleView"""
+    title = StringProperty("")
+    image = StringProperty("")
+    kcal_text = StringProperty("")
+    macros_text = StringProperty("")
+    price_text = StringProperty("")
+    volume_text = StringProperty("")
+
+
+class MenuSectionHeader(Widget):
+    """Заголовок раздела меню: занимает первую ячейку строки, текст выходит на всю ширину сетки"""
+    text = StringProperty("")
+
+
+class DrinkGrid(RecycleView):
+    """Сетка напитков из каталога; sections — id разделов в порядке показа"""
+    sections = ListProperty()
+    cols = NumericProperty(2)
+
+    def on_sections(self, *_):
+        self._update_rows()
+
+    def on_cols(self, *_):
+        self._update_rows()
+
+    def _update_rows(self):
+        header_size = (dp(DRINK_CARD_WIDTH), dp(MENU_HEADER_HEIGHT))
+        self.data = grid_rows(catalog.sections(self.sections), int(self.cols), header_size)
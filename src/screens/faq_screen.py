@@ -1,7 +1,7 @@
-from kivy.uix.screenmanager import Screen
+from src.screens.base_screen import OverlayScreen
 
 
-class FaqScreen(Screen):
+class FaqScreen(OverlayScreen):
     pass
 
 
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional
 
 from kivy.clock import Clock
+from kivy.core.image import Image as CoreImage
 from kivy.metrics import dp
-from kivy.properties import StringProperty
+from kivy.properties import BooleanProperty, ListProperty, NumericProperty, StringProperty
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
-from kivy.uix.screenmanager import Screen
 
-from kivy_garden.mapview import MapMarkerPopup
+from kivy_garden.mapview import MapMarker, MapMarkerPopup, MapSource
+from kivy_garden.mapview.downloader import Downloader
 from kivymd.uix.list import TwoLineListItem
 
+from src.screens.base_screen import OverlayScreen
+from src.services.atlas import atlas_source
+from src.services.geo_index import GeoIndex, format_distance
+from src.services.map_clusters import CLUSTER_MAX_ZOOM, Cluster, GridClusterer
+from src.services.map_layer import MarkerLayer
+from src.services.search_index import SearchIndex
+from src.services.search_pipeline import SEARCH_DELAY, SearchPipeline
+from src.services.tile_cache import get_cache, prefetch_around
+
 
 @dataclass(frozen=True)
 class CafeLocation:
@@ -28,7 +39,7 @@ class CafeMarker(MapMarkerPopup):
     def __init__(self, location: CafeLocation, **kwargs) -> None:
         super().__init__(lat=location.latitude, lon=location.longitude, **kwargs)
         self.location = location
-        self.source = "assets/icons/jam_coffee.png"
+        self.source = atlas_source("assets/icons/jam_coffee.png")
         self.anchor_x = 0.5
         self.anchor_y = 0
 
@@ -63,9 +74,69 @@ class CafeMarker(MapMarkerPopup):
         self.add_widget(popup)
 
 
-class OurAddressesScreen(Screen):
+class ClusterMarker(MapMarker):
+    """Значок кофейни с числом точек, слитых в одну при малом масштабе (бейдж — в our_addresses_screen.kv)"""
+    count = NumericProperty(0)
+
+    def __init__(self, cluster: Cluster, **kwargs) -> None:
+        super().__init__(lat=cluster.lat, lon=cluster.lon, **kwargs)
+        self.cluster = cluster
+        self.count = cluster.count
+        self.source = atlas_source("assets/icons/jam_coffee.png")
+        self.anchor_x = 0.5
+        self.anchor_y = 0
+
+
+class CachedMapSource(MapSource):
+    """Источник тайлов карты через общий кэш (src/services/tile_cache.py): сначала диск, потом сеть"""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(cache_key="cubecoffee", min_zoom=0, max_zoom=19, attribution="© OpenStreetMap", **kwargs)
+        # Кэш открывается при первой загрузке тайла в потоке загрузчика: открытие сканирует диск
+        self._cache = None
+
+    def fill_tile(self, tile) -> None:
+        if tile.state == "done":
+            return
+        Downloader.instance(self.cache_dir).submit(self._load_tile, tile)
+
+    def _load_tile(self, tile):
+        # Поток загрузчика mapview; tile_y у mapview отсчитывается снизу (TMS)
+        y = self.get_row_count(tile.zoom) - tile.tile_y - 1
+        if self._cache is None:
+            self._cache = get_cache()
+        data = self._cache.get(tile.zoom, tile.tile_x, y)
+        if data is None:
+            return
+        image = CoreImage(BytesIO(data), ext="png", filename=f"{tile.zoom}_{tile.tile_x}_{y}.png")
+        return self._load_tile_done, (tile, image)
+
+    def _load_tile_done(self, tile, image) -> None:
+        tile.texture = image.texture
+        tile.state = "need-animation"
+
+
+# Запас вокруг видимой области карты (dp): маркеры у края появляются до того, как въедут в кадр
+MARKER_VIEW_MARGIN = 48
+# Сколько ближайших кофеен показывает список в режиме «Рядом»
+NEAREST_LIST_SIZE = 50
+
+
+class SearchResult(NamedTuple):
+    """Найденные точки вместе с построенными по ним индексами (строятся вне UI-потока для больших наборов)"""
+    locations: List[CafeLocation]
+    geo_index: GeoIndex
+    clusterer: GridClusterer
+
+
+class OurAddressesScreen(OverlayScreen):
     view_mode = StringProperty("map")
     search_text = StringProperty("")
+    # Пауза в наборе (с), после которой запускается поиск
+    search_delay = NumericProperty(SEARCH_DELAY)
+    # Список «Рядом»: ближайшие к user_location (или к центру карты, пока местоположение неизвестно)
+    sort_by_distance = BooleanProperty(False)
+    user_location = ListProperty([])
 
     _INITIAL_LOCATIONS: List[CafeLocation] = [
         CafeLocation("Куб Кофе — Арбат", "ул. Арбат, 12", 55.7522, 37.5928),
@@ -83,19 +154,40 @@ class OurAddressesScreen(Screen):
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
         self._locations: List[CafeLocation] = list(self._INITIAL_LOCATIONS)
+        self._search_index = self._build_search_index(self._locations)
         self._visible_locations: List[CafeLocation] = list(self._locations)
-        self._map_markers: List[CafeMarker] = []
+        self._geo_index = GeoIndex([(loc.latitude, loc.longitude) for loc in self._visible_locations])
+        self._search = SearchPipeline(
+            self._match,
+            self._apply_search_results,
+            lambda: len(self._locations),
+            delay=self.search_delay,
+        )
+        self.bind(search_delay=lambda _instance, value: setattr(self._search, "delay", value))
+        # Маркеры создаются один раз на точку (или кластер) и переиспользуются между фильтрациями
+        self._marker_layer: Optional[MarkerLayer[object, MapMarker]] = None
+        self._clusterer: Optional[GridClusterer] = None
+        # Поколение набора точек входит в ключ кластера: после фильтрации состав кластеров другой
+        self._cluster_generation = 0
+        self._clusters: Dict[tuple, Cluster] = {}
+        self._update_markers_trigger = Clock.create_trigger(self._update_markers)
+        self._primary_location: Optional[CafeLocation] = None
         self._initialized = False
 
     # ------------------------------------------------------------------
     # Lifecycle management
     # ------------------------------------------------------------------
     def on_kv_post(self, base_widget) -> None:  # type: ignore[override]
+        super().on_kv_post(base_widget)
         Clock.schedule_once(self._ensure_initialized, 0)
 
     def on_pre_enter(self, *args) -> None:  # type: ignore[override]
         Clock.schedule_once(self._ensure_initialized, 0)
 
+    def on_leave(self, *args) -> None:  # type: ignore[override]
+        # Недоставленный результат поиска при уходе с экрана не нужен
+        self._search.cancel()
+
     def _ensure_initialized(self, *_args) -> None:
         if self._initialized:
             self.apply_filters()
@@ -106,6 +198,9 @@ class OurAddressesScreen(Screen):
             return
 
         self._initialized = True
+        # Тайлы вокруг кофеен (масштабы 11–15) докачиваются в фоне, если это включено в tile_cache.
+        # Здесь только запуск потока: кэш открывается и список тайлов строится уже в нём
+        prefetch_around([(loc.latitude, loc.longitude) for loc in self._locations])
         self.apply_filters()
         self.on_view_mode(self, self.view_mode)
 
@@ -135,23 +230,37 @@ class OurAddressesScreen(Screen):
     # Search handling
     # ------------------------------------------------------------------
     def on_search_text(self, _instance, _value) -> None:  # type: ignore[override]
-        self.apply_filters()
+        # Набор текста только перезапускает таймер; поиск идёт после паузы
+        self._search.submit(self.search_text)
 
     def update_search(self, text: str) -> None:
         if self.search_text == text:
             return
         self.search_text = text
 
+    @staticmethod
+    def _build_search_index(locations: List[CafeLocation]) -> SearchIndex:
+        # Индекс строится один раз на набор точек; нормализация текста — только здесь
+        return SearchIndex([f"{loc.name} {loc.address}" for loc in locations])
+
     def apply_filters(self) -> None:
-        query = self.search_text.strip().lower()
-        if not query:
-            self._visible_locations = list(self._locations)
-        else:
-            self._visible_locations = [
-                loc
-                for loc in self._locations
-                if query in loc.name.lower() or query in loc.address.lower()
-            ]
+        """Применить текущий запрос сразу, без паузы"""
+        self._search.submit(self.search_text, immediate=True)
+
+    def _match(self, query: str) -> SearchResult:
+        # Пустой запрос — все точки по порядку, иначе лучшие совпадения первыми (с учётом опечаток).
+        # Для больших наборов выполняется в потоке поиска, поэтому здесь же строятся индексы карты
+        locations = [self._locations[i] for i in self._search_index.search(query)]
+        points = [(loc.latitude, loc.longitude) for loc in locations]
+        geo_index = GeoIndex(points)
+        return SearchResult(locations, geo_index, GridClusterer(points, index=geo_index))
+
+    def _apply_search_results(self, _query: str, result: SearchResult) -> None:
+        # Вызывается только для последнего запроса: устаревшие результаты отбрасывает SearchPipeline
+        self._visible_locations = result.locations
+        self._geo_index = result.geo_index
+        self._clusterer = result.clusterer
+        self._cluster_generation += 1
 
         self._populate_map()
         self._populate_list()
@@ -164,25 +273,69 @@ class OurAddressesScreen(Screen):
         if not map_view:
             return
 
-        for marker in self._map_markers:
-            map_view.remove_marker(marker)
-        self._map_markers.clear()
+        if self._marker_layer is None:
+            self._marker_layer = MarkerLayer(self._create_marker, map_view.add_marker, map_view.remove_marker)
+            # Кластеры пересчитываются после сдвига и смены масштаба, не чаще раза за кадр
+            map_view.bind(on_map_relocated=self._update_markers_trigger)
+        self._update_markers()
 
-        if not self._visible_locations:
+        primary = self._visible_locations[0] if self._visible_locations else None
+        if primary is not None and primary != self._primary_location:
+            map_view.center_on(primary.latitude, primary.longitude)
+        self._primary_location = primary
+
+    def _update_markers(self, *_args) -> None:
+        map_view = self.ids.get("map_view")
+        if not map_view or self._marker_layer is None or self._clusterer is None:
             return
 
-        for location in self._visible_locations:
-            marker = CafeMarker(location)
-            marker.bind(on_release=lambda _marker, loc=location: self._focus_location(loc))
-            map_view.add_marker(marker)
-            self._map_markers.append(marker)
+        # Только ячейки в пределах экрана (с запасом); на карту добавляются только
+        # появившиеся точки и кластеры, снимаются только исчезнувшие
+        bbox = map_view.get_bbox(dp(MARKER_VIEW_MARGIN))
+        self._clusters = {}
+        keys: List[object] = []
+        for cluster in self._clusterer.clusters(map_view.zoom, bbox):
+            if cluster.count == 1:
+                keys.append(self._visible_locations[cluster.members[0]])
+                continue
+            key = (self._cluster_generation,) + cluster.key
+            self._clusters[key] = cluster
+            keys.append(key)
+        self._marker_layer.update(keys)
+
+    def _create_marker(self, key: object) -> MapMarker:
+        if isinstance(key, CafeLocation):
+            marker = CafeMarker(key)
+            marker.bind(on_release=lambda _marker, loc=key: self._focus_location(loc))
+            return marker
+        marker = ClusterMarker(self._clusters[key])
+        marker.bind(on_release=self._zoom_into_cluster)
+        return marker
+
+    def _zoom_into_cluster(self, marker: ClusterMarker) -> None:
+        map_view = self.ids.get("map_view")
+        if not map_view:
+            return
 
-        primary = self._visible_locations[0]
-        map_view.center_on(primary.latitude, primary.longitude)
+        map_view.center_on(marker.cluster.lat, marker.cluster.lon)
+        map_view.zoom = min(map_view.zoom + 2, CLUSTER_MAX_ZOOM)
 
     # ------------------------------------------------------------------
     # List management
     # ------------------------------------------------------------------
+    def on_sort_by_distance(self, _instance, _value) -> None:
+        self._populate_list()
+
+    def on_user_location(self, _instance, _value) -> None:
+        if self.sort_by_distance:
+            self._populate_list()
+
+    def _reference_point(self) -> Optional[tuple]:
+        if len(self.user_location) == 2:
+            return tuple(self.user_location)
+        map_view = self.ids.get("map_view")
+        return (map_view.lat, map_view.lon) if map_view else None
+
     def _populate_list(self) -> None:
         list_container = self.ids.get("address_list")
         if not list_container:
@@ -199,8 +352,18 @@ class OurAddressesScreen(Screen):
             )
             return
 
-        for location in self._visible_locations:
-            item = TwoLineListItem(text=location.name, secondary_text=location.address)
+        reference = self._reference_point() if self.sort_by_distance else None
+        if reference is None:
+            rows = [(location, location.address) for location in self._visible_locations]
+        else:
+            # Ближайшие из найденных по KD-дереву, без расчёта расстояния до каждой точки
+            rows = [
+                (self._visible_locations[index], f"{format_distance(meters)} · {self._visible_locations[index].address}")
+                for index, meters in self._geo_index.nearest(reference[0], reference[1], NEAREST_LIST_SIZE)
+            ]
+
+        for location, secondary_text in rows:
+            item = TwoLineListItem(text=location.name, secondary_text=secondary_text)
             item.bind(on_release=lambda _item, loc=location: self._focus_location(loc))
             list_container.add_widget(item)
 
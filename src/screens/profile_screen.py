@@ -1,28 +1,38 @@
-from kivy.uix.screenmanager import Screen
 from kivy.properties import StringProperty
+from kivy.clock import mainthread
 
+from src.screens.base_screen import OverlayScreen
 from src.services import db as db_layer
+from src.services.log import get_logger, lazy
 
+nav_log = get_logger("navigation")
 
-class ProfileScreen(Screen):
-    user_name = StringProperty("")
-    user_phone = StringProperty("")
 
-    def on_pre_enter(self, *args):
-        self._load_user()
-        return super().on_pre_enter(*args)
+class ProfileScreen(OverlayScreen):
+    user_name = StringProperty("Имя")
+    user_phone = StringProperty("+7(000)000-00-00")
 
-    def _load_user(self):
-        user = db_layer.get_user()
-        self.user_name = user.get("name", "") or "Имя"
-        self.user_phone = user.get("phone", "") or "+7(000)000-00-00"
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Профиль кэширован в памяти: подписываемся один раз вместо чтения БД при каждом входе
+        profile = db_layer.get_profile()
+        self._apply_profile(profile)
+        profile.bind(self._on_profile_changed)
+
+    @mainthread
+    def _on_profile_changed(self, profile):
+        self._apply_profile(profile)
+
+    def _apply_profile(self, profile):
+        self.user_name = profile.name or "Имя"
+        self.user_phone = profile.phone or "+7(000)000-00-00"
     
     def go_back(self):
         """Возврат на предыдущий экран"""
-        print('[ProfileScreen.go_back] Called!')
+        nav_log.debug('ProfileScreen.go_back called')
         
         if not self.manager:
-            print('[ProfileScreen.go_back] ERROR: No manager!')
+            nav_log.error('ProfileScreen.go_back: no manager')
             return
         
         # Получаем app
@@ -30,7 +40,7 @@ class ProfileScreen(Screen):
         app = MDApp.get_running_app()
         
         if not app:
-            print('[ProfileScreen.go_back] ERROR: No app found!')
+            nav_log.error('ProfileScreen.go_back: no running app')
             # Фолбэк на main
             if self.manager.has_screen('main'):
                 self.manager.current = 'main'
@@ -38,12 +48,12 @@ class ProfileScreen(Screen):
         
         # Получаем предыдущий экран из app
         previous_screen = getattr(app, '_previous_screen', None)
-        print(f'[ProfileScreen.go_back] Previous screen: {previous_screen}')
-        print(f'[ProfileScreen.go_back] Current screen: {self.manager.current}')
-        print(f'[ProfileScreen.go_back] Available screens: {list(self.manager.screen_names)}')
+        nav_log.debug(
+            'ProfileScreen.go_back: previous=%s, current=%s, available=%s',
+            previous_screen, self.manager.current, lazy(list, self.manager.screen_names),
+        )
         
-        # Переключаемся на предыдущий экран или main
-        target_screen = previous_screen if previous_screen and self.manager.has_screen(previous_screen) else 'main'
-        print(f'[ProfileScreen.go_back] Switching to: {target_screen}')
+        # Переключаемся на предыдущий экран (выгруженный строится заново) или main
+        target_screen = previous_screen if previous_screen and app.ensure_screen(previous_screen) else 'main'
+        nav_log.debug('ProfileScreen.go_back: switching to %s', target_screen)
         self.manager.current = target_screen
-        print(f'[ProfileScreen.go_back] Switched! New current: {self.manager.current}')
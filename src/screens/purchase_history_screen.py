@@ -1,17 +1,52 @@
-from kivy.uix.screenmanager import Screen
+import sqlite3
+from datetime import datetime
+
+import asynckivy as ak
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.behaviors import ButtonBehavior
-from kivy.properties import StringProperty, ListProperty
+from kivy.properties import BooleanProperty, StringProperty, ListProperty
 from kivy.clock import Clock
 
+from src.screens.base_screen import OverlayScreen
+from src.services import db as db_layer
+from src.services.log import get_logger
+
+
+log = get_logger("db")
+
+
+MONTHS = [
+    'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+    'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря'
+]
+
 
 class OrderTabButton(ButtonBehavior, BoxLayout):
     tab_text = StringProperty("")
     bg_color = ListProperty([0.2, 0.8, 0.4, 1])
 
 
-class PurchaseHistoryScreen(Screen):
+class OrderRow(BoxLayout):
+    """Строка заказа; экземпляры переиспользуются RecycleView"""
+    date_text = StringProperty("")
+    total_text = StringProperty("")
+    items_text = StringProperty("")
+
+
+class PurchaseHistoryScreen(OverlayScreen):
     order_type = StringProperty("all")  # "all" or "mobile"
+    has_orders = BooleanProperty(False)
+
+    PAGE_SIZE = 30
+    # Догружаем следующую страницу, когда до конца списка осталось меньше 20% высоты
+    LOAD_MORE_THRESHOLD = 0.2
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._cursor = None  # (created_at, id) последней загруженной строки
+        self._exhausted = False
+        self._loading = False
+        self._generation = 0  # растёт при сбросе списка, устаревшие ответы отбрасываются
     
     def _update_tab_colors(self):
         """Обновление цветов вкладок"""
@@ -29,6 +64,12 @@ class PurchaseHistoryScreen(Screen):
     def on_order_type(self, instance, value):
         """Автоматически обновляем цвета вкладок при изменении order_type"""
         Clock.schedule_once(lambda dt: self._update_tab_colors(), 0.1)
+        # Меняются только данные RecycleView, дерево виджетов остаётся прежним
+        self.reload_orders()
+    
+    def on_pre_enter(self, *args):
+        self.reload_orders()
+        return super().on_pre_enter(*args)
     
     def on_kv_post(self, base_widget):
         """Вызывается после загрузки KV файла"""
@@ -39,4 +80,58 @@ class PurchaseHistoryScreen(Screen):
         """Переключение типа заказов"""
         self.order_type = order_type
 
+    # ----------------------- Список заказов -----------------------
+    def reload_orders(self):
+        """Сбросить список и загрузить первую страницу для текущей вкладки"""
+        history_list = self.ids.get('history_list')
+        if history_list is None:
+            return
+        self._generation += 1
+        self._cursor = None
+        self._exhausted = False
+        self._loading = False
+        history_list.data = []
+        self.has_orders = False
+        history_list.scroll_y = 1
+        ak.start(self._load_next_page())
+
+    def on_history_scroll(self, history_list):
+        if history_list.scroll_y <= self.LOAD_MORE_THRESHOLD:
+            ak.start(self._load_next_page())
+
+    async def _load_next_page(self):
+        if self._loading or self._exhausted:
+            return
+        history_list = self.ids.get('history_list')
+        if history_list is None:
+            return
+        self._loading = True
+        generation = self._generation
+        channel = None if self.order_type == "all" else "mobile"
+        try:
+            rows = await db_layer.run_async(db_layer.get_orders_page, channel, self._cursor, self.PAGE_SIZE)
+        except sqlite3.Error as e:
+            # Страница не загрузилась — следующая прокрутка попробует снова
+            log.warning("Failed to load purchase history page: %s", e)
+            return
+        finally:
+            if generation == self._generation:
+                self._loading = False
+        if generation != self._generation:
+            return
+        if len(rows) < self.PAGE_SIZE:
+            self._exhausted = True
+        if rows:
+            last = rows[-1]
+            self._cursor = (last["created_at"], last["id"])
+            history_list.data.extend(self._row_data(row) for row in rows)
+        self.has_orders = bool(history_list.data)
 
+    @staticmethod
+    def _row_data(row):
+        dt = datetime.fromtimestamp(row["created_at"])
+        return {
+            "date_text": f"{dt.day} {MONTHS[dt.month - 1]} {dt.year} г., {dt.strftime('%H:%M')}",
+            "total_text": f"{row['total_rub']} ₽",
+            "items_text": row.get("items") or "",
+        }
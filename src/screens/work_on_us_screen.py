@@ -1,7 +1,7 @@
-from kivy.uix.screenmanager import Screen
+from src.screens.base_screen import OverlayScreen
 
 
-class WorkOnUsScreen(Screen):
+class WorkOnUsScreen(OverlayScreen):
     pass
 
 
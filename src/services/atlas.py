@@ -0,0 +1,121 @@
+"""Texture atlases for the small, frequently drawn images.
+
+Build step (needs Pillow and Kivy, run after changing anything under the
+grouped asset folders)::
+
+    python -m src.services.atlas
+
+Each group in ATLAS_GROUPS is downscaled to its maximum edge and packed
+into ``assets/atlas/<group>.atlas``. At runtime KV files wrap image paths
+in ``atlas_source()``, which returns the matching ``atlas://`` URL when
+the atlas is built and still newer than the image, and the plain path
+otherwise, so an unbuilt or stale atlas never breaks a screen.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.services.log import get_logger
+
+log = get_logger("assets")
+
+ATLAS_DIR = os.path.join("assets", "atlas")
+ATLAS_PAGE_SIZE = 2048
+ATLAS_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# Group name -> (source folder, longest edge in px). Edges cover the
+# largest on-screen size on a 3x display; bigger sources only cost decode time.
+# Photo tiles are not atlased: as PNG atlas pages they would be several times
+# larger than their JPEG/WebP variants (see src.services.variants).
+ATLAS_GROUPS: Dict[str, Tuple[str, int]] = {
+    "icons": (os.path.join("assets", "icons"), 256),
+    "drinks": (os.path.join("assets", "drinks"), 240),
+}
+
+_index: Optional[Dict[str, str]] = None
+_index_lock = threading.Lock()
+
+
+def _normalize(path: str) -> str:
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def _build_index() -> Dict[str, str]:
+    """Map source image paths to atlas URLs for every built, up-to-date atlas."""
+    index: Dict[str, str] = {}
+    for group, (folder, _) in ATLAS_GROUPS.items():
+        atlas_path = os.path.join(ATLAS_DIR, f"{group}.atlas")
+        try:
+            atlas_mtime = os.path.getmtime(atlas_path)
+            with open(atlas_path, encoding="utf-8") as f:
+                pages = json.load(f)
+        except (OSError, ValueError):
+            continue
+        ids = {image_id for page in pages.values() for image_id in page}
+        url_base = "atlas://" + _normalize(os.path.join(ATLAS_DIR, group))
+        for name in os.listdir(folder):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in ATLAS_EXTENSIONS or stem not in ids:
+                continue
+            source = os.path.join(folder, name)
+            if os.path.getmtime(source) > atlas_mtime:
+                log.info("Atlas %s is older than %s, using the file", group, source)
+                continue
+            index[_normalize(source)] = f"{url_base}/{stem}"
+    return index
+
+
+def atlas_source(path: str) -> str:
+    """The atlas:// URL for an image path, or the path itself when it is not atlased."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = _build_index()
+    return _index.get(_normalize(path), path)
+
+
+def reset() -> None:
+    """Forget the resolved atlases, e.g. after a rebuild."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def _group_sources(folder: str) -> List[str]:
+    return sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if os.path.splitext(name)[1].lower() in ATLAS_EXTENSIONS
+    )
+
+
+def build(groups: Optional[List[str]] = None) -> None:
+    """Downscale and pack the asset groups into Kivy atlases."""
+    from PIL import Image as PILImage
+    from kivy.atlas import Atlas
+
+    os.makedirs(ATLAS_DIR, exist_ok=True)
+    for group in groups or list(ATLAS_GROUPS):
+        folder, max_edge = ATLAS_GROUPS[group]
+        sources = _group_sources(folder)
+        with tempfile.TemporaryDirectory() as tmp:
+            scaled = []
+            for source in sources:
+                # Atlas ids are file stems, so the scaled copy keeps the name
+                target = os.path.join(tmp, os.path.splitext(os.path.basename(source))[0] + ".png")
+                with PILImage.open(source) as image:
+                    image = image.convert("RGBA")
+                    image.thumbnail((max_edge, max_edge), PILImage.LANCZOS)
+                    image.save(target, optimize=True)
+                scaled.append(target)
+            Atlas.create(os.path.join(ATLAS_DIR, group), scaled, ATLAS_PAGE_SIZE)
+        print(f"Built atlas {group} from {len(sources)} images")
+    reset()
+
+
+if __name__ == "__main__":
+    build(sys.argv[1:] or None)
@@ -1,52 +1,466 @@
+import atexit
 import os
 import sqlite3
-from typing import Dict, Optional
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
 
+from src.services.log import get_logger
+
+
+log = get_logger("db")
 
 DB_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "user.db")
 
+# Pragmas applied once per connection. WAL lets readers and the writer work
+# concurrently and turns each commit into an append instead of a journal
+# rewrite; synchronous=NORMAL is durable across app crashes in WAL mode and
+# only fsyncs on checkpoints.
+_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -2000",
+    "PRAGMA foreign_keys = ON",
+)
 
-def _connect() -> sqlite3.Connection:
-    os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Loyalty accruals are buffered in memory and written in one transaction
+# after FLUSH_INTERVAL seconds or once FLUSH_THRESHOLD increments pile up.
+FLUSH_INTERVAL = 2.0
+FLUSH_THRESHOLD = 32
 
 
-def init_db() -> None:
-    conn = _connect()
+class _ConnectionManager:
+    """Long-lived SQLite connections, one per thread, opened lazily.
+
+    Connections are keyed by the owning thread; those left behind by
+    threads that have exited are closed the next time a connection is
+    opened, so short-lived threads do not pile up file handles.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._generation = 0
+        self._dir_ready = False
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.generation == self._generation:
+            return conn
+        with self._lock:
+            if not self._dir_ready:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._dir_ready = True
+            self._prune()
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            for pragma in _PRAGMAS:
+                conn.execute(pragma)
+            self._connections[threading.current_thread()] = conn
+            self._local.generation = self._generation
+        self._local.conn = conn
+        return conn
+
+    def _prune(self) -> None:
+        for thread in [thread for thread in self._connections if not thread.is_alive()]:
+            _close_quietly(self._connections.pop(thread))
+
+    def open_count(self) -> int:
+        with self._lock:
+            self._prune()
+            return len(self._connections)
+
+    def release(self) -> None:
+        """Close the calling thread's connection, if it has one."""
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        with self._lock:
+            if self._connections.get(threading.current_thread()) is conn:
+                del self._connections[threading.current_thread()]
+        if conn is not None:
+            _close_quietly(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = list(self._connections.values()), {}
+            # Other threads still hold the closed connection in their
+            # thread-local slot; the new generation makes them reconnect.
+            self._generation += 1
+        for conn in connections:
+            _close_quietly(conn)
+
+
+def _close_quietly(conn: sqlite3.Connection) -> None:
     try:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS user_profile (
-                id INTEGER PRIMARY KEY CHECK (id = 1),
-                name TEXT NOT NULL DEFAULT '',
-                phone TEXT NOT NULL DEFAULT '',
-                spent_rub INTEGER NOT NULL DEFAULT 0,
-                bonus INTEGER NOT NULL DEFAULT 0
-            )
-            """
-        )
-        # Ensure single row exists
-        cur = conn.execute("SELECT COUNT(*) AS c FROM user_profile")
-        if cur.fetchone()[0] == 0:
-            conn.execute(
-                "INSERT INTO user_profile (id, name, phone, spent_rub, bonus) VALUES (1, '', '', 0, 0)"
-            )
-        conn.commit()
-    finally:
         conn.close()
+    except sqlite3.Error:
+        pass
 
 
-def get_user() -> Dict[str, object]:
-    conn = _connect()
+class _AccrualQueue:
+    """Write-behind buffer that coalesces spent/bonus increments."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self._spent = 0
+        self._bonus = 0
+        self._count = 0
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, spent: int = 0, bonus: int = 0) -> None:
+        with self._lock:
+            self._spent += spent
+            self._bonus += bonus
+            self._count += 1
+            flush_now = self._count >= FLUSH_THRESHOLD
+            if not flush_now:
+                self._arm()
+        if flush_now:
+            # Hand the write to the db worker like the timer does: add() is
+            # called from the UI thread and must not wait for a commit
+            self._on_timer()
+
+    def _arm(self) -> None:
+        # Caller holds self._lock
+        if self._timer is None:
+            self._timer = threading.Timer(FLUSH_INTERVAL, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self) -> None:
+        # The timer thread only hands the write to the db worker, so it never
+        # opens a connection of its own
+        try:
+            submit(self._flush_scheduled)
+        except RuntimeError:
+            # Interpreter shutdown: the worker no longer accepts jobs
+            self._flush_scheduled()
+
+    def _flush_scheduled(self) -> None:
+        try:
+            self.flush()
+        except sqlite3.Error:
+            # Already logged by flush(); try again after another interval
+            with self._lock:
+                self._arm()
+
+    def pending(self) -> Tuple[int, int]:
+        with self._lock:
+            return self._spent, self._bonus
+
+    def flush(self) -> None:
+        with self.flush_lock:
+            with self._lock:
+                spent, bonus, count = self._spent, self._bonus, self._count
+                self._spent = self._bonus = self._count = 0
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not count:
+                return
+            try:
+                conn = _connect()
+                with conn:
+                    conn.execute(
+                        "UPDATE user_profile SET spent_rub = spent_rub + ?, bonus = bonus + ? WHERE id = 1",
+                        (spent, bonus),
+                    )
+            except sqlite3.Error as e:
+                log.warning("Accrual flush failed, keeping %d increments for retry: %s", count, e)
+                # Keep the increments so the next flush retries them
+                with self._lock:
+                    self._spent += spent
+                    self._bonus += bonus
+                    self._count += count
+                raise
+
+
+class UserProfile:
+    """Process-wide in-memory copy of the user_profile row.
+
+    Writes go through to SQLite; observers registered with bind() are called
+    with the profile after every change, on the thread that made the change.
+    Bound methods are held weakly so a destroyed screen does not linger.
+    """
+
+    FIELDS = ("name", "phone", "spent_rub", "bonus")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._observers: List[Callable[[], Optional[Callable[["UserProfile"], None]]]] = []
+        self.loaded = False
+        self.name = ""
+        self.phone = ""
+        self.spent_rub = 0
+        self.bonus = 0
+
+    def as_dict(self) -> Dict[str, object]:
+        with self._lock:
+            return {field: getattr(self, field) for field in self.FIELDS}
+
+    def bind(self, callback: Callable[["UserProfile"], None]) -> None:
+        if hasattr(callback, "__self__"):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda cb=callback: cb
+        with self._lock:
+            self._observers.append(ref)
+
+    def unbind(self, callback: Callable[["UserProfile"], None]) -> None:
+        with self._lock:
+            self._observers = [ref for ref in self._observers if ref() not in (None, callback)]
+
+    def _set(self, **values) -> None:
+        with self._lock:
+            changed = False
+            for field, value in values.items():
+                if getattr(self, field) != value:
+                    setattr(self, field, value)
+                    changed = True
+        if changed:
+            self._notify()
+
+    def _increment(self, **deltas: int) -> None:
+        if not any(deltas.values()):
+            return
+        with self._lock:
+            for field, delta in deltas.items():
+                setattr(self, field, getattr(self, field) + delta)
+        self._notify()
+
+    def _notify(self) -> None:
+        with self._lock:
+            callbacks = [ref() for ref in self._observers]
+            self._observers = [ref for ref, cb in zip(self._observers, callbacks) if cb is not None]
+        for callback in callbacks:
+            if callback is not None:
+                callback(self)
+
+
+_manager = _ConnectionManager(DB_FILE)
+_accruals = _AccrualQueue()
+_profile = UserProfile()
+_profile_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    return _manager.get()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # A single worker keeps queries ordered and reuses one connection
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        return _executor
+
+
+def submit(fn: Callable[..., Any], *args, **kwargs) -> Future:
+    """Run a db call on the dedicated worker thread and return its Future."""
+    return _get_executor().submit(fn, *args, **kwargs)
+
+
+async def run_async(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await a db call from an asynckivy task; the result arrives on the Kivy main thread."""
+    import asynckivy as ak
+
+    return await ak.run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+
+
+def flush() -> None:
+    """Write buffered loyalty accruals to disk in a single transaction."""
+    _accruals.flush()
+
+
+def close() -> None:
+    """Flush pending accruals and close every pooled connection. Safe to call more than once."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
     try:
-        row = conn.execute("SELECT name, phone, spent_rub, bonus FROM user_profile WHERE id = 1").fetchone()
-        if not row:
-            return {"name": "", "phone": "", "spent_rub": 0, "bonus": 0}
-        return dict(row)
+        flush()
     finally:
-        conn.close()
+        _manager.close()
+
+
+# Last line of defence for accruals buffered when the interpreter exits
+atexit.register(flush)
+
+
+# ----------------------------------------------------------------------
+# Schema migrations
+# ----------------------------------------------------------------------
+def _migration_1_user_profile(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_profile (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            name TEXT NOT NULL DEFAULT '',
+            phone TEXT NOT NULL DEFAULT '',
+            spent_rub INTEGER NOT NULL DEFAULT 0,
+            bonus INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    # Ensure single row exists
+    conn.execute(
+        "INSERT OR IGNORE INTO user_profile (id, name, phone, spent_rub, bonus) VALUES (1, '', '', 0, 0)"
+    )
+
+
+def _migration_2_orders(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL CHECK (channel IN ('cafe', 'mobile')),
+            created_at INTEGER NOT NULL,
+            total_rub INTEGER NOT NULL DEFAULT 0,
+            bonus_earned INTEGER NOT NULL DEFAULT 0,
+            bonus_spent INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE order_items (
+            id INTEGER PRIMARY KEY,
+            order_id INTEGER NOT NULL REFERENCES orders (id) ON DELETE CASCADE,
+            title TEXT NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 1,
+            price_rub INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    # History tabs: "mobile" ranges over (channel, created_at), "all" over created_at.
+    # id is the tie-breaker so equal timestamps still have a stable order.
+    conn.execute("CREATE INDEX idx_orders_channel_created ON orders (channel, created_at, id)")
+    conn.execute("CREATE INDEX idx_orders_created ON orders (created_at, id)")
+    conn.execute("CREATE INDEX idx_order_items_order ON order_items (order_id)")
+
+
+def _migration_3_screen_visits(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE screen_visits (
+            screen TEXT PRIMARY KEY,
+            visits INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+
+
+def _migration_4_messages(conn: sqlite3.Connection) -> None:
+    # id is the source's message id, so re-syncing a message never duplicates it
+    conn.execute(
+        """
+        CREATE TABLE messages (
+            id TEXT PRIMARY KEY,
+            created_at INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            read INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    conn.execute("CREATE INDEX idx_messages_created ON messages (created_at, id)")
+    # High-water mark per source: the (created_at, id) of the newest message pulled
+    conn.execute(
+        """
+        CREATE TABLE message_sync (
+            source TEXT PRIMARY KEY,
+            created_at INTEGER NOT NULL,
+            message_id TEXT NOT NULL
+        )
+        """
+    )
+
+
+# Ordered, append-only: never edit a step that has shipped, add a new one.
+_MIGRATIONS: List[Tuple[int, Callable[[sqlite3.Connection], None]]] = [
+    (1, _migration_1_user_profile),
+    (2, _migration_2_orders),
+    (3, _migration_3_screen_visits),
+    (4, _migration_4_messages),
+]
+
+
+def schema_version(conn: Optional[sqlite3.Connection] = None) -> int:
+    conn = conn or _connect()
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at INTEGER NOT NULL DEFAULT (strftime('%s', 'now'))
+        )
+        """
+    )
+    conn.commit()
+    current = schema_version(conn)
+    for version, step in _MIGRATIONS:
+        if version <= current:
+            continue
+        # Each step and its version bump are one transaction, DDL included
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            step(conn)
+            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            log.exception("Migration %d failed", version)
+            raise
+        log.info("Applied schema migration %d (%s)", version, step.__name__)
+
+
+def init_db() -> None:
+    _migrate(_connect())
+    _load_profile()
+
+
+def _load_profile() -> None:
+    with _profile_lock:
+        # The cache includes accruals still waiting in the write-behind queue;
+        # holding the flush lock keeps a concurrent flush from counting them twice
+        with _accruals.flush_lock:
+            row = _connect().execute("SELECT name, phone, spent_rub, bonus FROM user_profile WHERE id = 1").fetchone()
+            spent, bonus = _accruals.pending()
+        user = dict(row) if row else {"name": "", "phone": "", "spent_rub": 0, "bonus": 0}
+        user["spent_rub"] += spent
+        user["bonus"] += bonus
+        _profile._set(**user)
+        _profile.loaded = True
+
+
+def get_profile() -> UserProfile:
+    """Return the cached profile, reading it from disk on first use only."""
+    if not _profile.loaded:
+        _load_profile()
+    return _profile
+
+
+def get_user() -> Dict[str, object]:
+    return get_profile().as_dict()
+
+
+async def get_user_async() -> Dict[str, object]:
+    return await run_async(get_user)
 
 
 def update_user(name: Optional[str] = None, phone: Optional[str] = None) -> None:
@@ -61,29 +475,237 @@ def update_user(name: Optional[str] = None, phone: Optional[str] = None) -> None
         sets.append("phone = ?")
         params.append(phone)
     params.append(1)
+    profile = get_profile()
     conn = _connect()
-    try:
-        conn.execute(f"UPDATE user_profile SET {', '.join(sets)} WHERE id = ?", params)
-        conn.commit()
-    finally:
-        conn.close()
+    conn.execute(f"UPDATE user_profile SET {', '.join(sets)} WHERE id = ?", params)
+    conn.commit()
+    values = {"name": name, "phone": phone}
+    profile._set(**{field: value for field, value in values.items() if value is not None})
+
+
+async def update_user_async(name: Optional[str] = None, phone: Optional[str] = None) -> None:
+    await run_async(update_user, name=name, phone=phone)
 
 
 def add_spent(amount: int) -> None:
-    conn = _connect()
-    try:
-        conn.execute("UPDATE user_profile SET spent_rub = spent_rub + ? WHERE id = 1", (int(amount),))
-        conn.commit()
-    finally:
-        conn.close()
+    profile = get_profile()
+    _accruals.add(spent=int(amount))
+    profile._increment(spent_rub=int(amount))
 
 
 def add_bonus(points: int) -> None:
+    profile = get_profile()
+    _accruals.add(bonus=int(points))
+    profile._increment(bonus=int(points))
+
+
+# ----------------------------------------------------------------------
+# Orders
+# ----------------------------------------------------------------------
+ORDER_CHANNELS = ("cafe", "mobile")
+
+
+def add_order(
+    channel: str,
+    items: List[Dict[str, object]],
+    created_at: Optional[int] = None,
+    bonus_earned: int = 0,
+    bonus_spent: int = 0,
+) -> int:
+    """Store an order with its items; items are dicts with title, quantity and price_rub."""
+    if channel not in ORDER_CHANNELS:
+        raise ValueError(f"Unknown order channel: {channel!r}")
+    if created_at is None:
+        created_at = int(time.time())
+    rows = [
+        (str(item["title"]), int(item.get("quantity", 1)), int(item.get("price_rub", 0)))
+        for item in items
+    ]
+    total = sum(quantity * price for _, quantity, price in rows)
     conn = _connect()
-    try:
-        conn.execute("UPDATE user_profile SET bonus = bonus + ? WHERE id = 1", (int(points),))
-        conn.commit()
-    finally:
-        conn.close()
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO orders (channel, created_at, total_rub, bonus_earned, bonus_spent) VALUES (?, ?, ?, ?, ?)",
+            (channel, int(created_at), total, int(bonus_earned), int(bonus_spent)),
+        )
+        order_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO order_items (order_id, title, quantity, price_rub) VALUES (?, ?, ?, ?)",
+            [(order_id,) + row for row in rows],
+        )
+    return order_id
+
+
+def get_orders(
+    channel: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    limit: int = 50,
+) -> List[Dict[str, object]]:
+    """Newest-first orders in [since, until); channel=None means every channel."""
+    where = []
+    params: List[object] = []
+    if channel is not None:
+        where.append("channel = ?")
+        params.append(channel)
+    if since is not None:
+        where.append("created_at >= ?")
+        params.append(int(since))
+    if until is not None:
+        where.append("created_at < ?")
+        params.append(int(until))
+    sql = "SELECT id, channel, created_at, total_rub, bonus_earned, bonus_spent FROM orders"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(int(limit))
+    return [dict(row) for row in _connect().execute(sql, params)]
+
+
+def get_orders_page(
+    channel: Optional[str] = None,
+    after: Optional[Tuple[int, int]] = None,
+    limit: int = 30,
+) -> List[Dict[str, object]]:
+    """One newest-first page of orders with a comma-separated item summary.
+
+    Keyset pagination: pass the (created_at, id) of the last row of the
+    previous page as ``after``. Unlike OFFSET this stays a single index seek
+    however deep the user scrolls.
+    """
+    where = []
+    params: List[object] = []
+    if channel is not None:
+        where.append("channel = ?")
+        params.append(channel)
+    if after is not None:
+        where.append("(created_at, id) < (?, ?)")
+        params.extend((int(after[0]), int(after[1])))
+    sql = (
+        "SELECT id, channel, created_at, total_rub, bonus_earned, bonus_spent,"
+        " (SELECT group_concat(quantity || ' × ' || title, ', ') FROM order_items"
+        "  WHERE order_items.order_id = orders.id) AS items"
+        " FROM orders"
+    )
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(int(limit))
+    return [dict(row) for row in _connect().execute(sql, params)]
+
+
+def get_order_items(order_id: int) -> List[Dict[str, object]]:
+    rows = _connect().execute(
+        "SELECT title, quantity, price_rub FROM order_items WHERE order_id = ? ORDER BY id",
+        (int(order_id),),
+    )
+    return [dict(row) for row in rows]
+
+
+# ----------------------------------------------------------------------
+# Navigation statistics
+# ----------------------------------------------------------------------
+def record_screen_visit(screen: str) -> None:
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "INSERT INTO screen_visits (screen, visits) VALUES (?, 1)"
+            " ON CONFLICT (screen) DO UPDATE SET visits = visits + 1",
+            (screen,),
+        )
+
+
+def get_screen_visits() -> Dict[str, int]:
+    rows = _connect().execute("SELECT screen, visits FROM screen_visits")
+    return {row["screen"]: row["visits"] for row in rows}
+
+
+# ----------------------------------------------------------------------
+# Messages
+# ----------------------------------------------------------------------
+MESSAGE_SYNC_BATCH = 100
+
+
+class MessageSource(Protocol):
+    """Where mail comes from: a bundled JSON file, a server, or a fake in tests."""
+
+    name: str
+
+    def fetch_since(self, after: Optional[Tuple[int, str]], limit: int) -> List[Dict[str, object]]:
+        """Up to ``limit`` messages with (created_at, id) greater than ``after``, oldest first.
+
+        Each message is a dict with id, created_at (unix seconds) and text.
+        """
+        ...
+
+
+def get_sync_mark(source_name: str) -> Optional[Tuple[int, str]]:
+    row = _connect().execute(
+        "SELECT created_at, message_id FROM message_sync WHERE source = ?", (source_name,)
+    ).fetchone()
+    return (row["created_at"], row["message_id"]) if row else None
+
+
+def sync_messages(source: MessageSource, batch_size: int = MESSAGE_SYNC_BATCH) -> int:
+    """Pull messages newer than the source's high-water mark; returns how many arrived.
+
+    Each batch and the advanced mark are committed together, so an
+    interrupted sync resumes where it stopped instead of starting over.
+    """
+    mark = get_sync_mark(source.name)
+    total = 0
+    conn = _connect()
+    while True:
+        batch = source.fetch_since(mark, batch_size)
+        if not batch:
+            break
+        rows = [(str(m["id"]), int(m["created_at"]), str(m["text"])) for m in batch]
+        newest = max((created_at, message_id) for message_id, created_at, _ in rows)
+        if mark is not None and newest <= tuple(mark):
+            # A source that ignores the mark would otherwise loop forever
+            log.warning("Message source %s returned nothing past its high-water mark", source.name)
+            break
+        with conn:
+            conn.executemany(
+                "INSERT INTO messages (id, created_at, text) VALUES (?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET created_at = excluded.created_at, text = excluded.text",
+                rows,
+            )
+            conn.execute(
+                "INSERT INTO message_sync (source, created_at, message_id) VALUES (?, ?, ?)"
+                " ON CONFLICT (source) DO UPDATE SET created_at = excluded.created_at,"
+                " message_id = excluded.message_id",
+                (source.name, newest[0], newest[1]),
+            )
+        total += len(rows)
+        mark = newest
+        if len(batch) < batch_size:
+            break
+    if total:
+        log.debug("Synced %d messages from %s", total, source.name)
+    return total
+
+
+def get_messages(after: Optional[Tuple[int, str]] = None, limit: int = 50) -> List[Dict[str, object]]:
+    """Newest-first messages; pass the (created_at, id) of the last row for the next page."""
+    sql = "SELECT id, created_at, text, read FROM messages"
+    params: List[object] = []
+    if after is not None:
+        sql += " WHERE (created_at, id) < (?, ?)"
+        params.extend((int(after[0]), str(after[1])))
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(int(limit))
+    return [dict(row) for row in _connect().execute(sql, params)]
+
+
+def mark_messages_read(message_ids: List[str]) -> None:
+    conn = _connect()
+    with conn:
+        conn.executemany(
+            "UPDATE messages SET read = 1 WHERE id = ? AND read = 0",
+            [(str(message_id),) for message_id in message_ids],
+        )
 
 
+def unread_count() -> int:
+    return _connect().execute("SELECT COUNT(*) FROM messages WHERE read = 0").fetchone()[0]
@@ -0,0 +1,125 @@
+"""Spatial index over cafe coordinates.
+
+``GeoIndex`` is a 2-d tree over ``(lat, lon)`` points. Longitudes are
+scaled by the cosine of the dataset's mean latitude, which makes
+distances in tree space proportional to ground distance within a city or
+region (the network this app serves). ``nearest`` descends to the query
+point and only visits branches that can still beat the k-th best hit;
+``within`` only visits branches that overlap the box. Both are
+logarithmic in the number of points for the small ``k`` and map-sized
+boxes the screens ask for. Reported distances are great-circle metres.
+
+Build a new index when the point set changes.
+"""
+import heapq
+import math
+from typing import List, Sequence, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+
+# (lat_min, lon_min, lat_max, lon_max), the order of MapView.get_bbox()
+BBox = Tuple[float, float, float, float]
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def format_distance(meters: float) -> str:
+    if meters < 1000:
+        return f"{int(round(meters / 10.0)) * 10} м"
+    return f"{meters / 1000:.1f} км".replace(".", ",")
+
+
+class GeoIndex:
+    """Points are ``(lat, lon)``; results are indices into ``points``."""
+
+    def __init__(self, points: Sequence[Tuple[float, float]]) -> None:
+        self.points = list(points)
+        mean_lat = sum(lat for lat, _ in self.points) / len(self.points) if self.points else 0.0
+        self._kx = math.cos(math.radians(mean_lat))
+        self._xy = [(lon * self._kx, lat) for lat, lon in self.points]
+        self._coords = ([x for x, _ in self._xy], [y for _, y in self._xy])
+        # Flat node arrays: node i holds point _point[i], split on _axis[i]
+        self._point: List[int] = []
+        self._axis: List[int] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self._root = self._build(list(range(len(self.points))), 0)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _build(self, ids: List[int], depth: int) -> int:
+        if not ids:
+            return -1
+        axis = depth % 2
+        ids.sort(key=self._coords[axis].__getitem__)
+        middle = len(ids) // 2
+        node = len(self._point)
+        self._point.append(ids[middle])
+        self._axis.append(axis)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._left[node] = self._build(ids[:middle], depth + 1)
+        self._right[node] = self._build(ids[middle + 1:], depth + 1)
+        return node
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[int, float]]:
+        """Up to ``k`` closest points as ``(index, metres)``, closest first."""
+        if k <= 0 or self._root < 0:
+            return []
+        qx, qy = lon * self._kx, lat
+        best: List[Tuple[float, int]] = []  # max-heap of (-squared distance, index)
+        stack = [self._root]
+        pending: List[Tuple[int, float]] = []  # far branches with their split distance
+        while stack or pending:
+            if not stack:
+                node, split_d2 = pending.pop()
+                if len(best) == k and split_d2 >= -best[0][0]:
+                    continue
+                stack.append(node)
+                continue
+            node = stack.pop()
+            index = self._point[node]
+            px, py = self._xy[index]
+            d2 = (px - qx) ** 2 + (py - qy) ** 2
+            if len(best) < k:
+                heapq.heappush(best, (-d2, index))
+            elif d2 < -best[0][0]:
+                heapq.heapreplace(best, (-d2, index))
+            diff = (qx - px) if self._axis[node] == 0 else (qy - py)
+            near, far = (self._left[node], self._right[node]) if diff < 0 else (self._right[node], self._left[node])
+            if far >= 0:
+                pending.append((far, diff * diff))
+            if near >= 0:
+                stack.append(near)
+        hits = [(index, haversine_m(lat, lon, *self.points[index])) for _, index in best]
+        hits.sort(key=lambda hit: (hit[1], hit[0]))
+        return hits
+
+    def within(self, bbox: BBox) -> List[int]:
+        """Indices of the points inside ``bbox``, in index order."""
+        lat_min, lon_min, lat_max, lon_max = bbox
+        lo = (lon_min * self._kx, lat_min)
+        hi = (lon_max * self._kx, lat_max)
+        found: List[int] = []
+        stack = [self._root] if self._root >= 0 else []
+        while stack:
+            node = stack.pop()
+            index = self._point[node]
+            point = self._xy[index]
+            if lo[0] <= point[0] <= hi[0] and lo[1] <= point[1] <= hi[1]:
+                found.append(index)
+            axis = self._axis[node]
+            if self._left[node] >= 0 and lo[axis] <= point[axis]:
+                stack.append(self._left[node])
+            if self._right[node] >= 0 and point[axis] <= hi[axis]:
+                stack.append(self._right[node])
+        found.sort()
+        return found
+
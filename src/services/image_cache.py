@@ -0,0 +1,111 @@
+"""Process-wide cache of decoded image textures.
+
+Widgets that show the same picture (the drink images in the carousel and
+the menu overlay, the logo and footer of every screen) share one texture
+instead of decoding the file again. Entries are evicted least recently
+used first once their estimated size exceeds the byte budget; a widget
+that still shows an evicted texture keeps it alive, the cache just stops
+handing it out.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.services.log import get_logger
+
+log = get_logger("assets")
+
+# Decoded RGBA bytes the cache may hold; the drink, tile and icon sets fit comfortably
+IMAGE_CACHE_BUDGET = 48 * 1024 * 1024
+
+
+def texture_bytes(texture: Any) -> int:
+    width, height = texture.size
+    return int(width) * int(height) * 4
+
+
+class TextureCache:
+    def __init__(self, budget: int, loader: Callable[[str], Optional[Any]]) -> None:
+        self.budget = budget
+        self.loader = loader
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, source: str) -> Optional[Any]:
+        entry = self._entries.get(source)
+        if entry is not None:
+            self._entries.move_to_end(source)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        texture = self.loader(source)
+        if texture is None:
+            return None
+        size = texture_bytes(texture)
+        self._entries[source] = (texture, size)
+        self.bytes += size
+        self._evict()
+        return texture
+
+    def peek(self, source: str) -> Optional[Any]:
+        """The cached texture or None, without loading; used by the async loader."""
+        entry = self._entries.get(source)
+        if entry is None:
+            return None
+        self._entries.move_to_end(source)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, source: str, texture: Any) -> None:
+        """Store a texture decoded elsewhere; counts as the miss that caused the load."""
+        self.misses += 1
+        if source in self._entries:
+            self.discard(source)
+        size = texture_bytes(texture)
+        self._entries[source] = (texture, size)
+        self.bytes += size
+        self._evict()
+
+    def _evict(self) -> None:
+        # The newest entry always stays, even when it alone is over budget
+        while self.bytes > self.budget and len(self._entries) > 1:
+            source, (_, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            log.debug("Evicted texture %s (%d bytes)", source, size)
+
+    def discard(self, source: str) -> None:
+        entry = self._entries.pop(source, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "budget": self.budget,
+        }
+
+
+def _load_texture(source: str) -> Optional[Any]:
+    from kivy.core.image import Image as CoreImage
+    from kivy.resources import resource_find
+
+    filename = resource_find(source)
+    if not filename:
+        log.warning("Image not found: %s", source)
+        return None
+    # nocache: this cache owns the texture, Kivy's kv.image/kv.texture need not hold a second reference
+    return CoreImage(filename, nocache=True).texture
+
+
+textures = TextureCache(IMAGE_CACHE_BUDGET, _load_texture)
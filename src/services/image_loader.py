@@ -0,0 +1,136 @@
+"""Background image decoding for cards that should not stall the first frame.
+
+Files are decoded to pixel data on a small pool of worker threads; the GL
+texture is created on the main thread when the result is delivered and
+goes into the shared texture cache. Requests carry a priority (lower runs
+first) so images in the visible part of a scroll view are decoded before
+offscreen ones, and a pending request can be promoted when it scrolls
+into view.
+"""
+import heapq
+import itertools
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.services.image_cache import textures
+from src.services.log import get_logger
+
+log = get_logger("assets")
+
+PRIORITY_VISIBLE = 0
+PRIORITY_OFFSCREEN = 1
+DECODE_WORKERS = 2
+
+
+class PriorityDecoder:
+    """Runs ``decode(source)`` on worker threads, best priority first, and hands
+    each result to ``deliver(source, result)`` from the worker thread."""
+
+    def __init__(
+        self,
+        decode: Callable[[str], Any],
+        deliver: Callable[[str, Any], None],
+        workers: int = DECODE_WORKERS,
+    ) -> None:
+        self.decode = decode
+        self.deliver = deliver
+        self.workers = workers
+        self._cv = threading.Condition()
+        self._heap: List[Tuple[int, int, str]] = []
+        # Best queued priority per source; heap entries that disagree are stale
+        self._queued: Dict[str, int] = {}
+        self._inflight: Set[str] = set()
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+
+    def request(self, source: str, priority: int = PRIORITY_OFFSCREEN) -> None:
+        with self._cv:
+            if source in self._inflight:
+                return
+            queued = self._queued.get(source)
+            if queued is not None and queued <= priority:
+                return
+            self._queued[source] = priority
+            heapq.heappush(self._heap, (priority, next(self._seq), source))
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"image-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cv.notify()
+
+    def pending(self) -> int:
+        with self._cv:
+            return len(self._queued)
+
+    def _next(self) -> str:
+        with self._cv:
+            while True:
+                while not self._heap:
+                    self._cv.wait()
+                priority, _, source = heapq.heappop(self._heap)
+                if self._queued.get(source) == priority:
+                    del self._queued[source]
+                    self._inflight.add(source)
+                    return source
+
+    def _run(self) -> None:
+        while True:
+            source = self._next()
+            try:
+                result = self.decode(source)
+            except Exception as e:
+                log.warning("Failed to decode %s: %s", source, e)
+                result = None
+            with self._cv:
+                self._inflight.discard(source)
+            self.deliver(source, result)
+
+
+class AsyncTextureLoader:
+    """Main-thread facade: cached textures come back at once, the rest after decoding."""
+
+    def __init__(self, workers: int = DECODE_WORKERS) -> None:
+        self._callbacks: Dict[str, List[Callable[[str, Optional[Any]], None]]] = {}
+        self._decoder = PriorityDecoder(self._decode, self._deliver, workers)
+
+    def load(self, source: str, callback: Callable[[str, Optional[Any]], None], priority: int) -> None:
+        texture = textures.peek(source)
+        if texture is None and source.startswith("atlas://"):
+            # Atlas regions share one page texture that is usually loaded already
+            texture = textures.get(source)
+        if texture is not None:
+            callback(source, texture)
+            return
+        self._callbacks.setdefault(source, []).append(callback)
+        self._decoder.request(source, priority)
+
+    def prioritize(self, source: str) -> None:
+        if source in self._callbacks:
+            self._decoder.request(source, PRIORITY_VISIBLE)
+
+    @staticmethod
+    def _decode(source: str) -> Optional[Any]:
+        from kivy.core.image import ImageLoader
+        from kivy.resources import resource_find
+
+        filename = resource_find(source)
+        if not filename:
+            log.warning("Image not found: %s", source)
+            return None
+        # Pixel data only; the texture itself must be created on the GL thread
+        return ImageLoader.load(filename, keep_data=False, nocache=True)
+
+    def _deliver(self, source: str, image: Optional[Any]) -> None:
+        from kivy.clock import Clock
+
+        Clock.schedule_once(lambda _dt: self._finish(source, image), 0)
+
+    def _finish(self, source: str, image: Optional[Any]) -> None:
+        texture = image.texture if image is not None else None
+        if texture is not None:
+            textures.put(source, texture)
+        for callback in self._callbacks.pop(source, []):
+            callback(source, texture)
+
+
+loader = AsyncTextureLoader()
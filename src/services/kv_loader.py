@@ -0,0 +1,40 @@
+import os
+import threading
+from typing import Optional, Set
+
+from kivy.lang import Builder
+
+
+# Absolute paths of KV files this process has already parsed
+_loaded: Set[str] = set()
+_lock = threading.Lock()
+
+
+def is_loaded(path: str) -> bool:
+    key = os.path.abspath(path)
+    if key in _loaded:
+        return True
+    # Files pulled in through "#:include" bypass load_kv but end up in Builder.files
+    return any(os.path.abspath(name) == key for name in Builder.files)
+
+
+def load_kv(path: str) -> Optional[object]:
+    """Parse a KV file at most once per process.
+
+    Returns what Builder.load_file returns (the root widget, if the file
+    declares one) on the first call and None once the file is loaded, so
+    rules are never registered twice.
+    """
+    key = os.path.abspath(path)
+    with _lock:
+        if is_loaded(key):
+            _loaded.add(key)
+            return None
+        _loaded.add(key)
+    try:
+        return Builder.load_file(path)
+    except Exception:
+        with _lock:
+            _loaded.discard(key)
+        raise
+
@@ -0,0 +1,116 @@
+"""Per-subsystem loggers for the app.
+
+Loggers live under the ``cubecoffee`` namespace (``get_logger("navigation")``
+-> ``cubecoffee.navigation``). The level is read once at startup from
+CUBECOFFEE_LOG_LEVEL (default WARNING), so debug calls on hot paths cost a
+level check and nothing else: messages use %-style arguments that are only
+formatted when a record is emitted, and expensive arguments go through
+``lazy()``.
+
+With CUBECOFFEE_LOG_RING=<n> records are kept in an in-memory ring of the
+last n entries instead of being streamed to stdout/logcat, and the ring is
+dumped to stderr when the app crashes.
+"""
+import logging
+import os
+import sys
+from collections import deque
+from typing import Any, Callable, Optional
+
+LOG_LEVEL_ENV = "CUBECOFFEE_LOG_LEVEL"
+LOG_RING_ENV = "CUBECOFFEE_LOG_RING"
+
+_ROOT = "cubecoffee"
+_FORMAT = "[%(name)s] %(levelname)s: %(message)s"
+
+_ring: Optional["RingBufferHandler"] = None
+_configured = False
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last ``capacity`` records unformatted until dump() is called."""
+
+    def __init__(self, capacity: int) -> None:
+        super().__init__()
+        self.records: deque = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+    def dump(self, stream=None) -> None:
+        stream = stream or sys.stderr
+        for record in list(self.records):
+            try:
+                stream.write(self.format(record) + "\n")
+            except Exception:
+                pass
+        stream.flush()
+
+
+class lazy:
+    """Defers computing a log argument until the record is actually formatted."""
+
+    __slots__ = ("fn", "args")
+
+    def __init__(self, fn: Callable[..., Any], *args: Any) -> None:
+        self.fn = fn
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args))
+
+    __repr__ = __str__
+
+
+def _level_from_env() -> int:
+    name = os.environ.get(LOG_LEVEL_ENV, "WARNING").upper()
+    level = logging.getLevelName(name)
+    return level if isinstance(level, int) else logging.WARNING
+
+
+def configure(level: Optional[int] = None, ring_size: Optional[int] = None) -> None:
+    """Set the level and output of every app logger; the first get_logger() call runs it with env settings."""
+    global _ring, _configured
+    logger = logging.getLogger(_ROOT)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.setLevel(_level_from_env() if level is None else level)
+    # Kivy installs its own handlers on the root logger; keep ours separate
+    logger.propagate = False
+
+    if ring_size is None:
+        ring_size = int(os.environ.get(LOG_RING_ENV, "0") or 0)
+    if ring_size > 0:
+        _ring = RingBufferHandler(ring_size)
+        handler: logging.Handler = _ring
+        _install_crash_dump()
+    else:
+        _ring = None
+        handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(_FORMAT))
+    logger.addHandler(handler)
+    _configured = True
+
+
+def dump_ring(stream=None) -> None:
+    if _ring is not None:
+        _ring.dump(stream)
+
+
+def _install_crash_dump() -> None:
+    previous = sys.excepthook
+    if getattr(previous, "_dumps_log_ring", False):
+        return
+
+    def _excepthook(exc_type, exc, tb):
+        dump_ring()
+        previous(exc_type, exc, tb)
+
+    _excepthook._dumps_log_ring = True  # type: ignore[attr-defined]
+    sys.excepthook = _excepthook
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    if not _configured:
+        configure()
+    return logging.getLogger(f"{_ROOT}.{subsystem}")
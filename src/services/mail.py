@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+MONTHS = (
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря",
+)
+
+
+class MailMessage(NamedTuple):
+    id: str
+    created_at: datetime
+    text: str
+    read: bool = False
+
+    @classmethod
+    def from_row(cls, row: Dict[str, object]) -> "MailMessage":
+        return cls(str(row["id"]), datetime.fromtimestamp(int(row["created_at"])), str(row["text"]), bool(row["read"]))
+
+
+class JsonFileSource:
+    """Message source backed by a JSON list of {id, created_at, text} objects.
+
+    The file is re-read only when its mtime changes.
+    """
+
+    def __init__(self, path: str, name: Optional[str] = None) -> None:
+        self.path = path
+        self.name = name or f"json:{os.path.basename(path)}"
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._messages: List[Dict[str, object]] = []
+
+    def _load(self) -> List[Dict[str, object]]:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return []
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, encoding="utf-8") as f:
+                    messages = json.load(f)
+                self._messages = sorted(messages, key=lambda m: (int(m["created_at"]), str(m["id"])))
+                self._mtime = mtime
+            return self._messages
+
+    def fetch_since(self, after: Optional[Tuple[int, str]], limit: int) -> List[Dict[str, object]]:
+        messages = self._load()
+        if after is not None:
+            mark = (int(after[0]), str(after[1]))
+            messages = [m for m in messages if (int(m["created_at"]), str(m["id"])) > mark]
+        return messages[:limit]
+
+
+def date_header(dt: datetime) -> str:
+    return f"{dt.day} {MONTHS[dt.month - 1]} {dt.year} г."
+
+
+def inbox_rows(messages: List[MailMessage], heights: Dict[str, float], header_height: float) -> List[dict]:
+    """RecycleView data for the inbox: a date header followed by each message card.
+
+    ``heights`` maps message id to the precomputed card height; rows carry
+    it in ``size`` so the layout never has to measure a view.
+    """
+    rows = []
+    for message in messages:
+        rows.append({
+            "viewclass": "MailDateRow",
+            "text": date_header(message.created_at),
+            "size": (None, header_height),
+        })
+        rows.append({
+            "viewclass": "MailMessageRow",
+            "text": message.text,
+            "time_text": message.created_at.strftime("%H:%M"),
+            "unread": not message.read,
+            "size": (None, heights[message.id]),
+        })
+    return rows
+
+
+def patch_rows(data: list, rows: List[dict]) -> bool:
+    """Bring ``data`` in line with ``rows`` by replacing only the span that differs.
+
+    ``data`` is a RecycleView's ObservableList; a single slice assignment
+    tells the view which indices changed so untouched rows keep their
+    views. Returns False when nothing changed.
+    """
+    start = 0
+    limit = min(len(data), len(rows))
+    while start < limit and data[start] == rows[start]:
+        start += 1
+    if start == len(data) == len(rows):
+        return False
+    end_old, end_new = len(data), len(rows)
+    while end_old > start and end_new > start and data[end_old - 1] == rows[end_new - 1]:
+        end_old -= 1
+        end_new -= 1
+    data[start:end_old] = rows[start:end_new]
+    return True
@@ -0,0 +1,128 @@
+"""Grid clustering of map points for low zoom levels.
+
+Points are projected to Web Mercator pixels at the map's zoom and
+bucketed into square cells of ``cell_px`` screen pixels; a cell holding
+several points is drawn as one cluster badge at their centroid. Because
+cells have a fixed on-screen size, zooming in splits clusters and zooming
+out merges them. From ``max_zoom`` up every point stands alone.
+
+Cells are bucketed once per zoom level and cached, so a pan only walks
+the cells inside the viewport and a zoom back to a visited level is a
+lookup. At ``max_zoom`` and above the viewport's points come from a
+``GeoIndex`` box query. Build a new clusterer when the point set changes.
+"""
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.services.geo_index import GeoIndex
+
+TILE_SIZE = 256
+CLUSTER_CELL_PX = 64
+CLUSTER_MAX_ZOOM = 16
+MAX_LATITUDE = 85.05112878
+
+Cell = Tuple[int, int]
+# (lat_min, lon_min, lat_max, lon_max), the order of MapView.get_bbox()
+BBox = Tuple[float, float, float, float]
+
+
+def unit_xy(lat: float, lon: float) -> Tuple[float, float]:
+    """Web Mercator position in [0, 1) (y grows southwards); times the world size gives pixels."""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    sin_lat = math.sin(math.radians(lat))
+    return (lon + 180.0) / 360.0, 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+
+
+def world_pixel(lat: float, lon: float, zoom: int) -> Tuple[float, float]:
+    """Web Mercator pixel coordinates of a point at ``zoom``."""
+    x, y = unit_xy(lat, lon)
+    size = TILE_SIZE * (1 << zoom)
+    return x * size, y * size
+
+
+class Cluster(NamedTuple):
+    # (zoom, cx, cy) for clusters, ("point", index) for single points
+    key: tuple
+    lat: float
+    lon: float
+    members: Tuple[int, ...]
+
+    @property
+    def count(self) -> int:
+        return len(self.members)
+
+
+class GridClusterer:
+    """Clusters over a fixed list of ``(lat, lon)`` points; members are indices into it."""
+
+    def __init__(
+        self,
+        points: Sequence[Tuple[float, float]],
+        cell_px: int = CLUSTER_CELL_PX,
+        max_zoom: int = CLUSTER_MAX_ZOOM,
+        index: Optional[GeoIndex] = None,
+    ) -> None:
+        self.points = list(points)
+        self._index = index
+        self.cell_px = cell_px
+        self.max_zoom = max_zoom
+        # Projected once; a zoom level is then only a scale
+        self._unit = [unit_xy(lat, lon) for lat, lon in self.points]
+        self._buckets: Dict[int, Dict[Cell, List[int]]] = {}
+        self._clusters: Dict[int, Dict[Cell, Cluster]] = {}
+
+    def _cell(self, lat: float, lon: float, zoom: int) -> Cell:
+        x, y = world_pixel(lat, lon, zoom)
+        return int(x // self.cell_px), int(y // self.cell_px)
+
+    def _buckets_at(self, zoom: int) -> Dict[Cell, List[int]]:
+        buckets = self._buckets.get(zoom)
+        if buckets is None:
+            scale = TILE_SIZE * (1 << zoom) / self.cell_px
+            buckets = {}
+            for index, (x, y) in enumerate(self._unit):
+                buckets.setdefault((int(x * scale), int(y * scale)), []).append(index)
+            self._buckets[zoom] = buckets
+            self._clusters[zoom] = {}
+        return buckets
+
+    def _cluster(self, zoom: int, cell: Cell) -> Cluster:
+        # Only cells that were on screen get a Cluster (and a centroid)
+        cached = self._clusters[zoom].get(cell)
+        if cached is not None:
+            return cached
+        members = self._buckets[zoom][cell]
+        if len(members) == 1:
+            lat, lon = self.points[members[0]]
+            cluster = Cluster(("point", members[0]), lat, lon, (members[0],))
+        else:
+            lat = sum(self.points[i][0] for i in members) / len(members)
+            lon = sum(self.points[i][1] for i in members) / len(members)
+            cluster = Cluster((zoom,) + cell, lat, lon, tuple(members))
+        self._clusters[zoom][cell] = cluster
+        return cluster
+
+    def _cells_in(self, buckets: Dict[Cell, List[int]], zoom: int, bbox: Optional[BBox]) -> List[Cell]:
+        if bbox is None:
+            return list(buckets)
+        lat_min, lon_min, lat_max, lon_max = bbox
+        x0, y0 = self._cell(lat_max, lon_min, zoom)
+        x1, y1 = self._cell(lat_min, lon_max, zoom)
+        area = (x1 - x0 + 1) * (y1 - y0 + 1)
+        if area <= len(buckets):
+            return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1) if (cx, cy) in buckets]
+        return [(cx, cy) for cx, cy in buckets if x0 <= cx <= x1 and y0 <= cy <= y1]
+
+    def clusters(self, zoom: int, bbox: Optional[BBox] = None) -> List[Cluster]:
+        """Clusters and lone points at ``zoom`` whose cell touches ``bbox`` (everything when None)."""
+        zoom = max(0, int(zoom))
+        if zoom >= self.max_zoom:
+            if bbox is None:
+                indices = range(len(self.points))
+            else:
+                if self._index is None:
+                    self._index = GeoIndex(self.points)
+                indices = self._index.within(bbox)
+            return [Cluster(("point", i), self.points[i][0], self.points[i][1], (i,)) for i in indices]
+        buckets = self._buckets_at(zoom)
+        return [self._cluster(zoom, cell) for cell in self._cells_in(buckets, zoom, bbox)]
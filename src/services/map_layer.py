@@ -0,0 +1,75 @@
+"""Pooled map markers that are updated by difference.
+
+``MarkerLayer`` owns one marker per key, created on first use and kept
+while hidden, and on ``update`` only adds the markers that appeared and
+removes the ones that went away. Markers already on the map are left
+alone, so refiltering costs nothing for the unchanged part of the set.
+
+Hidden markers are kept up to ``pool_size``; past that the ones hidden
+longest ago are dropped, so keys that come and go (cluster badges per
+zoom level) do not pile up.
+
+The layer is toolkit-agnostic: the screen passes the factory and the
+add/remove callables of its MapView.
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Iterable, Tuple, TypeVar
+
+MARKER_POOL_SIZE = 256
+
+K = TypeVar("K", bound=Hashable)
+M = TypeVar("M")
+
+
+class MarkerLayer(Generic[K, M]):
+    def __init__(
+        self,
+        create: Callable[[K], M],
+        add: Callable[[M], None],
+        remove: Callable[[M], None],
+        pool_size: int = MARKER_POOL_SIZE,
+    ) -> None:
+        self._create = create
+        self._add = add
+        self._remove = remove
+        self.pool_size = pool_size
+        self._pool: Dict[K, M] = {}
+        self._shown: Dict[K, M] = {}
+        # Hidden pooled keys, longest hidden first
+        self._hidden: "OrderedDict[K, None]" = OrderedDict()
+
+    def marker(self, key: K) -> M:
+        """The pooled marker for ``key``, created on first request."""
+        marker = self._pool.get(key)
+        if marker is None:
+            marker = self._pool[key] = self._create(key)
+        return marker
+
+    def shown(self) -> Tuple[K, ...]:
+        return tuple(self._shown)
+
+    def is_shown(self, key: K) -> bool:
+        return key in self._shown
+
+    def update(self, keys: Iterable[K]) -> Tuple[int, int]:
+        """Show exactly ``keys``; returns how many markers were added and removed."""
+        wanted = dict.fromkeys(keys)
+        removed = [key for key in self._shown if key not in wanted]
+        for key in removed:
+            self._remove(self._shown.pop(key))
+            self._hidden[key] = None
+        added = 0
+        for key in wanted:
+            if key not in self._shown:
+                marker = self.marker(key)
+                self._add(marker)
+                self._shown[key] = marker
+                self._hidden.pop(key, None)
+                added += 1
+        while len(self._hidden) > self.pool_size:
+            key, _ = self._hidden.popitem(last=False)
+            del self._pool[key]
+        return added, len(removed)
+
+    def pooled(self) -> int:
+        return len(self._pool)
@@ -0,0 +1,112 @@
+"""Drink catalog behind the menu screens.
+
+Drinks are data in ``assets/menu/catalog.json``, grouped into sections::
+
+    {"sections": [{"id": "alucard", "title": "BY ALUCARD",
+                   "items": [{"id", "name", "image", "kcal", "protein",
+                              "fat", "carbs", "price", "volume_ml"}, ...]}]}
+
+Screens never build a widget per drink: ``grid_rows`` flattens the sections
+into RecycleView data for a single ``DrinkCard`` template, so adding items
+costs neither KV parse time nor resident widgets.
+"""
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+CATALOG_FILE = os.path.join("assets", "menu", "catalog.json")
+
+
+class Drink(NamedTuple):
+    id: str
+    name: str
+    image: str
+    kcal: int
+    protein: int
+    fat: int
+    carbs: int
+    price: int
+    volume_ml: int
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, object]) -> "Drink":
+        return cls(
+            str(item["id"]), str(item["name"]), str(item["image"]),
+            int(item["kcal"]), int(item["protein"]), int(item["fat"]), int(item["carbs"]),
+            int(item["price"]), int(item["volume_ml"]),
+        )
+
+
+class MenuSection(NamedTuple):
+    id: str
+    title: str
+    drinks: Tuple[Drink, ...]
+
+
+class Catalog:
+    """Sections of a catalog file; the file is re-read only when its mtime changes."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._sections: List[MenuSection] = []
+
+    def _load(self) -> List[MenuSection]:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return []
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, encoding="utf-8") as f:
+                    raw = json.load(f)
+                self._sections = [
+                    MenuSection(str(s["id"]), str(s["title"]), tuple(Drink.from_dict(i) for i in s["items"]))
+                    for s in raw["sections"]
+                ]
+                self._mtime = mtime
+            return self._sections
+
+    def sections(self, ids: Optional[Iterable[str]] = None) -> List[MenuSection]:
+        """All sections in file order, or the ones named in ``ids`` in that order."""
+        sections = self._load()
+        if ids is None:
+            return list(sections)
+        by_id = {section.id: section for section in sections}
+        return [by_id[section_id] for section_id in ids if section_id in by_id]
+
+
+catalog = Catalog(CATALOG_FILE)
+
+
+def card_row(drink: Drink) -> dict:
+    """RecycleView data for one ``DrinkCard``; all text is formatted up front."""
+    return {
+        "viewclass": "DrinkCard",
+        "title": drink.name,
+        "image": drink.image,
+        "kcal_text": f"Ккал: {drink.kcal}",
+        "macros_text": f"Б: {drink.protein} Ж: {drink.fat} У: {drink.carbs}",
+        "price_text": str(drink.price),
+        "volume_text": f"{drink.volume_ml} мл",
+    }
+
+
+def grid_rows(sections: Sequence[MenuSection], cols: int, header_size: Tuple[float, float]) -> List[dict]:
+    """RecycleGridLayout data: each section is a header row followed by its cards.
+
+    A grid cell cannot span columns, so the header takes the first cell of
+    its row and blank ``Widget`` cells of the same size fill the rest; the
+    last row of a section is padded the same way so the next header starts
+    a new row. Cards carry no ``size`` and use the layout's default size.
+    """
+    rows: List[dict] = []
+    for index, section in enumerate(sections):
+        rows.append({"viewclass": "MenuSectionHeader", "text": section.title, "size": header_size})
+        rows.extend({"viewclass": "Widget", "size": header_size} for _ in range(cols - 1))
+        rows.extend(card_row(drink) for drink in section.drinks)
+        if index < len(sections) - 1:
+            rows.extend({"viewclass": "Widget"} for _ in range(-len(section.drinks) % cols))
+    return rows
@@ -0,0 +1,94 @@
+"""Which overlay widgets each screen has and which of them are open.
+
+Kept free of Kivy imports; the animated side lives in overlays.py.
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class OverlayRefs(NamedTuple):
+    overlay: object
+    panel: object
+    content: object = None
+
+
+# Overlay kind -> (overlay root id, panel id, content id) as declared in the KV files
+OVERLAY_IDS: Dict[str, Tuple[str, str, Optional[str]]] = {
+    "menu": ("overlay_root", "overlay_panel", None),
+    "mail": ("mail_overlay_root", "mail_panel", "mail_list"),
+    "loyalty": ("loyalty_overlay_root", "loyalty_panel", None),
+    "loyalty_program": ("loyalty_program_overlay_root", "loyalty_program_panel", None),
+    "referral": ("referral_overlay_root", "referral_panel", None),
+    "drinks_menu": ("drinks_menu_overlay_root", "drinks_menu_panel", None),
+    "gift": ("gift_overlay_root", "gift_panel", None),
+    "status": ("status_overlay_root", "status_panel", None),
+}
+
+
+def _screen_ids(screen) -> List[dict]:
+    """ids of the screen rule and of its root widget (MainRoot keeps its own)."""
+    scopes = [getattr(screen, "ids", None) or {}]
+    children = getattr(screen, "children", None) or []
+    if children:
+        scopes.append(getattr(children[0], "ids", None) or {})
+    return scopes
+
+
+class OverlayRegistry:
+    """Overlay widgets per screen, collected once when the screen is built.
+
+    Lookups are dict hits keyed by (screen name, overlay kind). Open
+    overlays are tracked on one stack so Back closes the topmost one
+    without probing every kind.
+    """
+
+    def __init__(self) -> None:
+        self._refs: Dict[Tuple[str, str], OverlayRefs] = {}
+        self._open: List[Tuple[str, str]] = []
+
+    def register_screen(self, screen) -> None:
+        name = screen.name
+        self.unregister_screen(name)
+        scopes = _screen_ids(screen)
+        for kind, (overlay_id, panel_id, content_id) in OVERLAY_IDS.items():
+            overlay = next((ids[overlay_id] for ids in scopes if overlay_id in ids), None)
+            if overlay is None:
+                continue
+            # Dynamic classes like LoyaltyOverlay keep the panel in their own ids
+            lookup = scopes + [getattr(overlay, "ids", None) or {}]
+            panel = next((ids[panel_id] for ids in lookup if panel_id in ids), None)
+            content = None
+            if content_id:
+                content = next((ids[content_id] for ids in lookup if content_id in ids), None)
+            self._refs[(name, kind)] = OverlayRefs(overlay, panel, content)
+
+    def unregister_screen(self, name: str) -> None:
+        for key in [key for key in self._refs if key[0] == name]:
+            del self._refs[key]
+        self._open = [entry for entry in self._open if entry[0] != name]
+
+    def get(self, screen_name: str, kind: str) -> Optional[OverlayRefs]:
+        return self._refs.get((screen_name, kind))
+
+    # ---- open overlay stack ----
+    def push(self, screen_name: str, kind: str) -> None:
+        self.remove(screen_name, kind)
+        self._open.append((screen_name, kind))
+
+    def remove(self, screen_name: str, kind: str) -> None:
+        try:
+            self._open.remove((screen_name, kind))
+        except ValueError:
+            pass
+
+    def is_open(self, screen_name: str, kind: str) -> bool:
+        return (screen_name, kind) in self._open
+
+    def open_kinds(self, screen_name: str) -> List[str]:
+        return [kind for name, kind in self._open if name == screen_name]
+
+    def top(self, screen_name: str) -> Optional[str]:
+        """Most recently opened overlay kind that is still open on the screen."""
+        for name, kind in reversed(self._open):
+            if name == screen_name:
+                return kind
+        return None
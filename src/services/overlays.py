@@ -0,0 +1,199 @@
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from kivy.animation import Animation
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.properties import NumericProperty
+
+from src.services.log import get_logger
+from src.services.overlay_registry import OVERLAY_IDS, OverlayRefs, OverlayRegistry
+
+log = get_logger("overlays")
+
+
+class OverlaySpec(NamedTuple):
+    # Edge the panel slides in from: "left", "right" or "bottom"
+    edge: str
+    # Bottom panels are resized to this share of the overlay height on open
+    height_ratio: Optional[float] = None
+    # Enable touches on the next frame so the tap that opened it cannot close it
+    enable_next_frame: bool = False
+
+
+OVERLAY_SPECS: Dict[str, OverlaySpec] = {
+    "menu": OverlaySpec("left", enable_next_frame=True),
+    "mail": OverlaySpec("right"),
+    "loyalty": OverlaySpec("bottom", 0.8),
+    "loyalty_program": OverlaySpec("bottom", 0.8),
+    "referral": OverlaySpec("bottom", 0.8),
+    "drinks_menu": OverlaySpec("bottom", 0.8),
+    "gift": OverlaySpec("bottom", 0.8),
+    "status": OverlaySpec("bottom", 0.8),
+}
+
+
+class _OverlayState(EventDispatcher):
+    """Animated 0..1 progress of one overlay panel; the panel position follows it."""
+
+    progress = NumericProperty(0)
+
+    def __init__(self, refs: OverlayRefs, spec: OverlaySpec, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.refs = refs
+        self.spec = spec
+        # Deferred start of the open animation (enable_next_frame kinds)
+        self.pending_open = None
+
+    def on_progress(self, _instance, value: float) -> None:
+        overlay, panel = self.refs.overlay, self.refs.panel
+        if panel is None:
+            return
+        edge = self.spec.edge
+        if edge == "left":
+            panel.x = overlay.x - panel.width * (1 - value)
+        elif edge == "right":
+            parent = overlay.parent
+            width = parent.width if parent is not None else overlay.width
+            panel.x = width - panel.width * value
+        else:
+            panel.y = -panel.height * (1 - value)
+
+
+class OverlayController:
+    """Opens and closes overlays of the current screen from the OVERLAY_SPECS table.
+
+    Two Animation instances animate every overlay's progress, one for
+    opening and one for closing. Starting either first cancels whatever
+    is still running on that overlay, so quick taps never leave two
+    animations fighting over a panel. Opening closes the overlays on the
+    registry's open stack, which costs nothing when nothing else is open.
+    """
+
+    def __init__(self, registry: OverlayRegistry, current_screen: Callable[[], Optional[str]]) -> None:
+        self.registry = registry
+        self.current_screen = current_screen
+        self._states: Dict[Tuple[str, str], _OverlayState] = {}
+        self._open_anim = Animation(progress=1, d=0.22, t="out_cubic")
+        self._close_anim = Animation(progress=0, d=0.18, t="in_cubic")
+        self._close_anim.bind(on_complete=self._on_close_complete)
+
+    def _state(self, screen_name: str, kind: str) -> Optional[_OverlayState]:
+        key = (screen_name, kind)
+        refs = self.registry.get(screen_name, kind)
+        if refs is None:
+            self._states.pop(key, None)
+            return None
+        state = self._states.get(key)
+        if state is None or state.refs is not refs:
+            state = self._states[key] = _OverlayState(refs, OVERLAY_SPECS[kind])
+        return state
+
+    def refs(self, kind: str) -> Optional[OverlayRefs]:
+        screen_name = self.current_screen()
+        return self.registry.get(screen_name, kind) if screen_name else None
+
+    def is_open(self, kind: str) -> bool:
+        screen_name = self.current_screen()
+        return bool(screen_name) and self.registry.is_open(screen_name, kind)
+
+    def open(self, kind: str, on_open: Optional[Callable[[OverlayRefs], None]] = None, retry: bool = True) -> bool:
+        """Show the overlay; on_open gets its refs once it is visible.
+
+        Right after a screen is built its ids may not be registered yet,
+        so a miss is retried once on the next frame.
+        """
+        screen_name = self.current_screen()
+        state = self._state(screen_name, kind) if screen_name else None
+        if state is None:
+            if retry:
+                Clock.schedule_once(lambda *_: self.open(kind, on_open, retry=False), 0)
+            else:
+                log.warning("Overlay %s not found on screen %s", kind, screen_name)
+            return False
+        for other in self.registry.open_kinds(screen_name):
+            if other != kind:
+                self.close(other)
+
+        overlay, panel = state.refs.overlay, state.refs.panel
+        self._cancel(state)
+        overlay.size_hint = (1, 1)
+        overlay.size = overlay.parent.size if overlay.parent else overlay.size
+        overlay.opacity = 1
+        self.registry.push(screen_name, kind)
+        if panel is not None and state.spec.height_ratio is not None:
+            panel.height = overlay.height * state.spec.height_ratio
+        # Re-apply the start position even when progress is already 0
+        state.progress = 0
+        state.on_progress(state, 0)
+
+        def _start(*_):
+            state.pending_open = None
+            overlay.disabled = False
+            if panel is not None:
+                self._open_anim.start(state)
+
+        if state.spec.enable_next_frame:
+            state.pending_open = Clock.schedule_once(_start, 0)
+        else:
+            _start()
+        if on_open is not None:
+            on_open(state.refs)
+        return True
+
+    def close(self, kind: str, animate: bool = True) -> None:
+        screen_name = self.current_screen()
+        state = self._state(screen_name, kind) if screen_name else None
+        if state is None:
+            return
+        self.registry.remove(screen_name, kind)
+        self._cancel(state)
+        if not animate or state.refs.panel is None or state.progress == 0:
+            self._hide(state)
+            return
+        self._close_anim.start(state)
+
+    def close_top(self) -> bool:
+        """Close the most recently opened overlay of the current screen (Esc/Back)."""
+        screen_name = self.current_screen()
+        kind = self.registry.top(screen_name) if screen_name else None
+        if kind is None:
+            return False
+        self.close(kind)
+        return True
+
+    def close_all(self) -> None:
+        screen_name = self.current_screen()
+        for kind in self.registry.open_kinds(screen_name) if screen_name else ():
+            self.close(kind)
+
+    def forget_screen(self, screen_name: str) -> None:
+        for key in [key for key in self._states if key[0] == screen_name]:
+            self._cancel(self._states.pop(key))
+        self.registry.unregister_screen(screen_name)
+
+    def _cancel(self, state: _OverlayState) -> None:
+        """Stop everything still in flight for this overlay."""
+        if state.pending_open is not None:
+            state.pending_open.cancel()
+            state.pending_open = None
+        self._open_anim.cancel(state)
+        self._close_anim.cancel(state)
+
+    def _on_close_complete(self, _animation, state: _OverlayState) -> None:
+        self._hide(state)
+
+    @staticmethod
+    def _hide(state: _OverlayState) -> None:
+        if state.pending_open is not None:
+            state.pending_open.cancel()
+            state.pending_open = None
+        overlay = state.refs.overlay
+        overlay.opacity = 0
+        overlay.disabled = True
+        overlay.size_hint = (None, None)
+        overlay.size = (0, 0)
+        state.progress = 0
+        state.on_progress(state, 0)
+
+
+registry = OverlayRegistry()
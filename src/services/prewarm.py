@@ -0,0 +1,83 @@
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+
+class ScreenPrewarmer:
+    """Builds the likely next screens during idle frames after startup.
+
+    Screens are built through ``app.screen_build_steps(name)``, a generator
+    that yields between the import, KV load and widget construction steps.
+    Every frame runs steps until ``frame_budget`` seconds are spent and then
+    hands the rest of the frame back to the UI.
+
+    The budget is only checked between steps. Widget construction applies
+    the screen's whole KV rule and cannot be split, so on the heavier
+    screens (profile, menu) that one step alone still takes longer than a
+    frame. Prewarming moves that cost to an idle moment after startup; it
+    does not spread it out.
+    """
+
+    def __init__(
+        self,
+        app,
+        priorities: Sequence[str],
+        visits: Optional[Dict[str, int]] = None,
+        frame_budget: float = 0.008,
+        start_delay: float = 1.0,
+    ) -> None:
+        self.app = app
+        self.frame_budget = frame_budget
+        self.start_delay = start_delay
+        self.queue = self.rank(priorities, visits or {})
+        self._steps: Optional[Iterator[None]] = None
+        self._event = None
+
+    @staticmethod
+    def _schedule(callback: Callable[[float], None], delay: float) -> Any:
+        # Imported on use so the ranking can be used (and tested) without a Kivy window
+        from kivy.clock import Clock
+
+        return Clock.schedule_once(callback, delay)
+
+    @staticmethod
+    def rank(priorities: Sequence[str], visits: Dict[str, int]) -> List[str]:
+        """Most visited screens first; the configured order breaks ties and covers new installs."""
+        names = list(priorities) + [name for name in visits if name not in priorities]
+        order = {name: index for index, name in enumerate(names)}
+        ranked = sorted(names, key=lambda name: (-visits.get(name, 0), order[name]))
+        return ranked[: max(len(priorities), 1)]
+
+    def start(self) -> None:
+        self.cancel()
+        self._event = self._schedule(self._run, self.start_delay)
+
+    def cancel(self) -> None:
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        self._steps = None
+
+    def _busy(self) -> bool:
+        # Do not compete with a running screen transition
+        transition = getattr(self.app.root, "transition", None)
+        return bool(transition and getattr(transition, "is_active", False))
+
+    def _run(self, _dt) -> None:
+        self._event = None
+        if self._busy():
+            self._event = self._schedule(self._run, 0.1)
+            return
+        deadline = time.perf_counter() + self.frame_budget
+        while time.perf_counter() < deadline:
+            if self._steps is None:
+                if not self.queue:
+                    return
+                self._steps = iter(self.app.screen_build_steps(self.queue.pop(0)))
+            try:
+                next(self._steps)
+            except StopIteration:
+                self._steps = None
+            except Exception:
+                # A broken screen must not stop the rest from prewarming
+                self._steps = None
+        self._event = self._schedule(self._run, 0)
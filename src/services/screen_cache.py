@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+
+def screen_texture_bytes(screen) -> int:
+    """Rough GPU footprint of a screen: RGBA bytes of every texture in its widget tree."""
+    total = 0
+    for widget in screen.walk(restrict=True):
+        texture = getattr(widget, "texture", None)
+        if texture is not None:
+            width, height = texture.size
+            total += int(width) * int(height) * 4
+    return total
+
+
+class ScreenLRU:
+    """Least-recently-used bookkeeping for the screens kept in the ScreenManager.
+
+    ``max_resident`` caps how many screens stay built; ``texture_budget``
+    (bytes, optional) additionally evicts while the resident screens hold
+    more texture memory than allowed. Pinned screens are never evicted.
+    """
+
+    def __init__(
+        self,
+        max_resident: int = 6,
+        texture_budget: Optional[int] = None,
+        pinned: Iterable[str] = ("main",),
+    ) -> None:
+        self.max_resident = max_resident
+        self.texture_budget = texture_budget
+        self.pinned = set(pinned)
+        self._order: "OrderedDict[str, None]" = OrderedDict()
+
+    def touch(self, name: str) -> None:
+        self._order[name] = None
+        self._order.move_to_end(name)
+
+    def discard(self, name: str) -> None:
+        self._order.pop(name, None)
+
+    def candidates(self, resident: Iterable[str], protected: Iterable[str] = ()) -> List[str]:
+        """Evictable resident screens, least recently used first."""
+        resident = set(resident)
+        keep = self.pinned | set(protected)
+        # Screens that were never touched are older than anything in the LRU order
+        untouched = [name for name in resident if name not in self._order]
+        ordered = untouched + [name for name in self._order if name in resident]
+        return [name for name in ordered if name not in keep]
+
+    def victims(self, screen_manager, protected: Iterable[str] = ()) -> List[str]:
+        resident = list(screen_manager.screen_names)
+        candidates = self.candidates(resident, protected)
+        victims = candidates[: max(len(resident) - self.max_resident, 0)]
+        if self.texture_budget is not None:
+            sizes = {name: screen_texture_bytes(screen_manager.get_screen(name)) for name in resident}
+            total = sum(size for name, size in sizes.items() if name not in victims)
+            for name in candidates[len(victims):]:
+                if total <= self.texture_budget:
+                    break
+                victims.append(name)
+                total -= sizes[name]
+        return victims
@@ -0,0 +1,165 @@
+"""Typo-tolerant prefix search over short documents (cafe names and addresses).
+
+Text is normalized once at build time: case-folded, ``ё`` folded to ``е``
+and split into word tokens. Lookups go through two structures:
+
+* a prefix trie whose nodes hold the ids of every document with a token
+  under that prefix, so an exact prefix lookup is a walk of ``len(term)``
+  nodes;
+* a trigram index over the token vocabulary that narrows fuzzy candidates
+  before a bounded edit-distance check, so a typo costs a handful of
+  comparisons instead of a scan over every token.
+
+A query matches a document when every query term matches one of its
+tokens. Documents are ranked by how well the terms matched (whole token,
+prefix, then typo by distance), ties keep document order.
+"""
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Query terms shorter than this match by prefix only: with two letters
+# almost anything is one typo away.
+FUZZY_MIN_LENGTH = 3
+FUZZY_CACHE_SIZE = 256
+
+SCORE_EXACT = 3.0
+SCORE_PREFIX = 2.0
+SCORE_TYPO = 1.0
+
+
+def normalize(text: str) -> str:
+    return text.casefold().replace("ё", "е")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def max_typos(term: str) -> int:
+    return 1 if len(term) < 6 else 2
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"^{token}"
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it is certainly exceeded."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: Optional[List[int]] = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class _Node:
+    __slots__ = ("children", "docs")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.docs: Set[int] = set()
+
+
+class SearchIndex:
+    """Index over ``documents``; ``search`` returns matching document positions."""
+
+    def __init__(self, documents: Sequence[str]) -> None:
+        self._size = len(documents)
+        self._root = _Node()
+        self._token_docs: Dict[str, Set[int]] = {}
+        self._trigram_tokens: Dict[str, Set[str]] = {}
+        self._fuzzy_cache: "OrderedDict[str, List[Tuple[str, int]]]" = OrderedDict()
+        for doc_id, text in enumerate(documents):
+            for token in tokenize(text):
+                self._add(token, doc_id)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _add(self, token: str, doc_id: int) -> None:
+        node = self._root
+        for char in token:
+            node = node.children.setdefault(char, _Node())
+            node.docs.add(doc_id)
+        if token not in self._token_docs:
+            self._token_docs[token] = set()
+            for gram in _trigrams(token):
+                self._trigram_tokens.setdefault(gram, set()).add(token)
+        self._token_docs[token].add(doc_id)
+
+    def _prefix_docs(self, term: str) -> Set[int]:
+        node = self._root
+        for char in term:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.docs
+
+    def _typo_tokens(self, term: str) -> List[Tuple[str, int]]:
+        """Vocabulary tokens whose prefix is within ``max_typos(term)`` edits of ``term``."""
+        cached = self._fuzzy_cache.get(term)
+        if cached is not None:
+            self._fuzzy_cache.move_to_end(term)
+            return cached
+        limit = max_typos(term)
+        candidates: Set[str] = set()
+        for gram in _trigrams(term):
+            candidates.update(self._trigram_tokens.get(gram, ()))
+        matches = []
+        for token in candidates:
+            # Compare with the whole token and with its head: the term may be unfinished
+            distance = min(
+                edit_distance(term, token, limit),
+                edit_distance(term, token[:len(term)], limit),
+            )
+            if 0 < distance <= limit:
+                matches.append((token, distance))
+        self._fuzzy_cache[term] = matches
+        if len(self._fuzzy_cache) > FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.popitem(last=False)
+        return matches
+
+    def _term_scores(self, term: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        if len(term) >= FUZZY_MIN_LENGTH:
+            for token, distance in self._typo_tokens(term):
+                score = SCORE_TYPO - (distance - 1) * 0.25
+                for doc_id in self._token_docs[token]:
+                    if scores.get(doc_id, 0.0) < score:
+                        scores[doc_id] = score
+        for doc_id in self._prefix_docs(term):
+            scores[doc_id] = SCORE_PREFIX
+        for doc_id in self._token_docs.get(term, ()):
+            scores[doc_id] = SCORE_EXACT
+        return scores
+
+    def search(self, query: str) -> List[int]:
+        """Positions of documents matching every term of ``query``, best first.
+
+        An empty query matches every document in order.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return list(range(self._size))
+        # Rarest terms first so the intersection shrinks early
+        per_term = sorted((self._term_scores(term) for term in dict.fromkeys(terms)), key=len)
+        totals = dict(per_term[0])
+        for scores in per_term[1:]:
+            totals = {doc_id: total + scores[doc_id] for doc_id, total in totals.items() if doc_id in scores}
+            if not totals:
+                return []
+        return sorted(totals, key=lambda doc_id: (-totals[doc_id], doc_id))
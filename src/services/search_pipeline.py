@@ -0,0 +1,124 @@
+"""Debounced, cancellable search for text fields.
+
+Every keystroke restarts a ``delay`` timer, so a burst of typing is
+matched once, after the pause. Each submitted query gets a generation
+number and a result is delivered only while its generation is still the
+latest: a match that finishes after the user typed on is dropped, and a
+queued match that has already been overtaken is not run at all.
+
+Small datasets are matched inline on the main thread, where the worker
+hop would cost more than the match. From ``offload_threshold`` items up
+the match runs on a dedicated worker thread and the result is handed
+back on the main thread.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from src.services.log import get_logger
+
+log = get_logger("search")
+
+R = TypeVar("R")
+
+SEARCH_DELAY = 0.25
+OFFLOAD_THRESHOLD = 500
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # One worker: queued stale queries are skipped instead of racing the latest one
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        return _executor
+
+
+def _clock_schedule(callback: Callable[[], None], delay: float) -> Any:
+    from kivy.clock import Clock
+
+    return Clock.schedule_once(lambda _dt: callback(), delay)
+
+
+def _clock_call_soon(callback: Callable[[], None]) -> None:
+    from kivy.clock import Clock
+
+    Clock.schedule_once(lambda _dt: callback(), 0)
+
+
+class SearchPipeline(Generic[R]):
+    """Runs ``match(query)`` for the latest query and hands the result to ``deliver(query, result)``.
+
+    ``size()`` is the current dataset size and decides whether matching is
+    moved off the main thread. ``schedule``/``call_soon`` default to the
+    Kivy clock; ``deliver`` is always called on the thread they run on.
+    """
+
+    def __init__(
+        self,
+        match: Callable[[str], R],
+        deliver: Callable[[str, R], None],
+        size: Callable[[], int],
+        delay: float = SEARCH_DELAY,
+        offload_threshold: int = OFFLOAD_THRESHOLD,
+        schedule: Callable[[Callable[[], None], float], Any] = _clock_schedule,
+        call_soon: Callable[[Callable[[], None]], None] = _clock_call_soon,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ) -> None:
+        self.match = match
+        self.deliver = deliver
+        self.size = size
+        self.delay = delay
+        self.offload_threshold = offload_threshold
+        self._schedule = schedule
+        self._call_soon = call_soon
+        self._executor = executor
+        self._generation = 0
+        self._timer: Any = None
+
+    def submit(self, query: str, immediate: bool = False) -> None:
+        """Queue ``query``, superseding anything not yet delivered."""
+        self._cancel_timer()
+        self._generation += 1
+        generation = self._generation
+        if immediate or self.delay <= 0:
+            self._start(generation, query)
+        else:
+            self._timer = self._schedule(lambda: self._start(generation, query), self.delay)
+
+    def cancel(self) -> None:
+        """Drop the pending query and any match still in flight."""
+        self._cancel_timer()
+        self._generation += 1
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _start(self, generation: int, query: str) -> None:
+        self._timer = None
+        if generation != self._generation:
+            return
+        if self.size() < self.offload_threshold:
+            self._finish(generation, query, self.match(query))
+            return
+        executor = self._executor or _get_executor()
+        executor.submit(self._match_off_thread, generation, query)
+
+    def _match_off_thread(self, generation: int, query: str) -> None:
+        if generation != self._generation:
+            return  # overtaken while queued
+        try:
+            result = self.match(query)
+        except Exception as e:
+            log.warning("Search for %r failed: %s", query, e)
+            return
+        self._call_soon(lambda: self._finish(generation, query, result))
+
+    def _finish(self, generation: int, query: str, result: R) -> None:
+        if generation == self._generation:
+            self.deliver(query, result)
@@ -0,0 +1,416 @@
+"""Managed map tile cache for the addresses map.
+
+Tiles are read store-first and downloaded only on a miss. Two stores are
+available, both bounded by a byte budget with least-recently-used
+eviction:
+
+* ``DiskTileStore``: one file per tile under ``tile_cache/z/x/y.png``;
+  recency is kept in memory and mirrored to file mtimes, so the order
+  survives restarts;
+* ``MBTilesStore``: a single SQLite file in the MBTiles layout (TMS row
+  numbering), with a ``last_used`` column for eviction. A pre-seeded
+  MBTiles file from other tools works as well; when its ``tiles`` table
+  is a view the store is read-only.
+
+``TilePrefetcher`` downloads a small ring of tiles around each cafe at
+zoom 11-15 on a background thread, one request at a time and capped at
+``PREFETCH_MAX_TILES``, so the map opens from disk. Prefetching is
+opt-in (``TILE_PREFETCH``) and never runs against the public OSM servers,
+whose usage policy forbids bulk downloads: point ``TILE_URL`` at a
+self-hosted or licensed tile server first.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from src.services.log import get_logger
+from src.services.map_clusters import unit_xy
+
+log = get_logger("tiles")
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+TILE_CACHE_DIR = os.path.join(_ROOT_DIR, "tile_cache")
+TILE_MBTILES_FILE = os.path.join(_ROOT_DIR, "tile_cache.mbtiles")
+# "disk" or "mbtiles"
+TILE_STORE = "disk"
+TILE_CACHE_BUDGET = 64 * 1024 * 1024
+TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+TILE_TIMEOUT = 10
+USER_AGENT = "CubeCoffee/1.0 (+tile cache)"
+
+# Off by default; enable only with a TILE_URL that allows bulk downloads
+TILE_PREFETCH = False
+# Hosts whose usage policy forbids prefetching; prefetch_around() refuses them
+NO_PREFETCH_HOSTS = ("tile.openstreetmap.org",)
+PREFETCH_ZOOMS = range(11, 16)
+PREFETCH_MARGIN_TILES = 1
+PREFETCH_MAX_TILES = 300
+
+Tile = Tuple[int, int, int]  # (z, x, y), XYZ numbering (y grows southwards)
+
+
+class TileStore(Protocol):
+    def get(self, z: int, x: int, y: int) -> Optional[bytes]:
+        ...
+
+    def put(self, z: int, x: int, y: int, data: bytes) -> None:
+        ...
+
+    def __contains__(self, tile: Tile) -> bool:
+        ...
+
+
+class DiskTileStore:
+    """Tiles as files ``root/z/x/y.png`` kept under ``budget`` bytes, least recently used evicted first."""
+
+    def __init__(self, root: str, budget: int = TILE_CACHE_BUDGET) -> None:
+        self.root = root
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._sizes: "OrderedDict[Tile, int]" = OrderedDict()
+        self._total = 0
+        self._scan()
+        with self._lock:
+            self._evict()
+
+    def _path(self, tile: Tile) -> str:
+        z, x, y = tile
+        return os.path.join(self.root, str(z), str(x), f"{y}.png")
+
+    def _scan(self) -> None:
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                stem, ext = os.path.splitext(name)
+                parts = os.path.relpath(dirpath, self.root).split(os.sep)
+                if ext != ".png" or len(parts) != 2:
+                    continue
+                try:
+                    tile = (int(parts[0]), int(parts[1]), int(stem))
+                    stat = os.stat(os.path.join(dirpath, name))
+                except (ValueError, OSError):
+                    continue
+                found.append((stat.st_mtime, tile, stat.st_size))
+        for _, tile, size in sorted(found):
+            self._sizes[tile] = size
+            self._total += size
+
+    def __contains__(self, tile: Tile) -> bool:
+        with self._lock:
+            return tile in self._sizes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sizes)
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._total
+
+    def get(self, z: int, x: int, y: int) -> Optional[bytes]:
+        tile = (z, x, y)
+        with self._lock:
+            if tile not in self._sizes:
+                return None
+            self._sizes.move_to_end(tile)
+        path = self._path(tile)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # recency survives a restart
+        except OSError:
+            with self._lock:
+                self._total -= self._sizes.pop(tile, 0)
+            return None
+        return data
+
+    def put(self, z: int, x: int, y: int, data: bytes) -> None:
+        tile = (z, x, y)
+        path = self._path(tile)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Readers never see a half-written tile
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data) - self._sizes.pop(tile, 0)
+            self._sizes[tile] = len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total > self.budget and self._sizes:
+            tile, size = self._sizes.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(tile))
+            except OSError:
+                pass
+
+
+class MBTilesStore:
+    """Tiles in an MBTiles (SQLite) file kept under ``budget`` bytes, least recently used evicted first."""
+
+    def __init__(self, path: str, budget: int = TILE_CACHE_BUDGET) -> None:
+        self.path = path
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        kind = self._db.execute("SELECT type FROM sqlite_master WHERE name = 'tiles'").fetchone()
+        self.read_only = kind is not None and kind[0] == "view"
+        if kind is None:
+            self._db.executescript(
+                """
+                CREATE TABLE metadata (name TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE tiles (
+                    zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,
+                    last_used INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (zoom_level, tile_column, tile_row)
+                );
+                INSERT INTO metadata VALUES ('name', 'cafes'), ('format', 'png');
+                """
+            )
+        elif not self.read_only:
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(tiles)")}
+            if "last_used" not in columns:
+                self._db.execute("ALTER TABLE tiles ADD COLUMN last_used INTEGER NOT NULL DEFAULT 0")
+        if not self.read_only:
+            self._db.execute("CREATE INDEX IF NOT EXISTS tiles_last_used ON tiles (last_used)")
+            self._clock, self._total = self._db.execute(
+                "SELECT COALESCE(MAX(last_used), 0), COALESCE(SUM(LENGTH(tile_data)), 0) FROM tiles"
+            ).fetchone()
+        else:
+            self._clock, self._total = 0, 0
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def _key(z: int, x: int, y: int) -> Tuple[int, int, int]:
+        return z, x, (1 << z) - 1 - y  # MBTiles rows count from the south (TMS)
+
+    def __contains__(self, tile: Tile) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", self._key(*tile)
+            ).fetchone()
+        return row is not None
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._total
+
+    def get(self, z: int, x: int, y: int) -> Optional[bytes]:
+        key = self._key(z, x, y)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            if not self.read_only:
+                self._clock += 1
+                self._db.execute(
+                    "UPDATE tiles SET last_used = ? WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                    (self._clock,) + key,
+                )
+        return bytes(row[0])
+
+    def put(self, z: int, x: int, y: int, data: bytes) -> None:
+        if self.read_only:
+            return
+        key = self._key(z, x, y)
+        with self._lock:
+            old = self._db.execute(
+                "SELECT LENGTH(tile_data) FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", key
+            ).fetchone()
+            self._clock += 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                key + (sqlite3.Binary(data), self._clock),
+            )
+            self._total += len(data) - (old[0] if old else 0)
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.read_only or self._total <= self.budget:
+            return
+        rows = self._db.execute(
+            "SELECT rowid, LENGTH(tile_data) FROM tiles ORDER BY last_used"
+        )
+        doomed = []
+        excess = self._total - self.budget
+        for rowid, size in rows:
+            if excess <= 0:
+                break
+            doomed.append((rowid,))
+            excess -= size
+            self._total -= size
+        self._db.execute("BEGIN")
+        self._db.executemany("DELETE FROM tiles WHERE rowid = ?", doomed)
+        self._db.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _download(url: str) -> bytes:
+    request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(request, timeout=TILE_TIMEOUT) as response:
+        return response.read()
+
+
+class TileCache:
+    """Store-first tile access; a miss is downloaded from ``url`` and stored."""
+
+    def __init__(self, store: TileStore, url: str = TILE_URL, fetch: Callable[[str], bytes] = _download) -> None:
+        self.store = store
+        self.url = url
+        self.fetch = fetch
+
+    def get(self, z: int, x: int, y: int) -> Optional[bytes]:
+        data = self.store.get(z, x, y)
+        if data is not None:
+            return data
+        return self.download(z, x, y)
+
+    def download(self, z: int, x: int, y: int) -> Optional[bytes]:
+        url = self.url.format(z=z, x=x, y=y)
+        try:
+            data = self.fetch(url)
+        except OSError as e:
+            log.info("Tile %s/%s/%s not downloaded: %s", z, x, y, e)
+            return None
+        if data:
+            self.store.put(z, x, y, data)
+        return data or None
+
+
+def tile_xy(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    """XYZ tile holding a point at ``zoom``."""
+    n = 1 << zoom
+    x, y = unit_xy(lat, lon)
+    return min(n - 1, int(x * n)), min(n - 1, int(y * n))
+
+
+def tiles_around(
+    points: Sequence[Tuple[float, float]],
+    zooms: Iterable[int] = PREFETCH_ZOOMS,
+    margin: int = PREFETCH_MARGIN_TILES,
+    limit: int = PREFETCH_MAX_TILES,
+) -> List[Tile]:
+    """Each point's tile plus a ring of ``margin`` tiles, coarse zooms first, at most ``limit`` tiles."""
+    tiles: Dict[Tile, None] = {}
+    for z in sorted(zooms):
+        n = 1 << z
+        for lat, lon in points:
+            px, py = tile_xy(lat, lon, z)
+            for x in range(max(0, px - margin), min(n - 1, px + margin) + 1):
+                for y in range(max(0, py - margin), min(n - 1, py + margin) + 1):
+                    tiles[(z, x, y)] = None
+                    if len(tiles) >= limit:
+                        return list(tiles)
+    return list(tiles)
+
+
+def prefetch_allowed(url: str) -> bool:
+    host = (urlsplit(url).hostname or "").lower()
+    return not any(host == blocked or host.endswith("." + blocked) for blocked in NO_PREFETCH_HOSTS)
+
+
+class TilePrefetcher:
+    """Downloads missing tiles on one background thread; ``cancel`` stops it between tiles.
+
+    Everything runs on that thread, including opening the app-wide cache
+    when no ``cache`` is given and building the tile list in
+    ``start_around``, so starting a prefetch costs the caller nothing.
+    """
+
+    def __init__(self, cache: Optional[TileCache] = None) -> None:
+        self.cache = cache
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.fetched = 0
+
+    def start(self, tiles: Sequence[Tile]) -> None:
+        tiles = list(tiles)
+        self._begin(lambda: tiles)
+
+    def start_around(self, points: Sequence[Tuple[float, float]]) -> None:
+        points = list(points)
+        self._begin(lambda: tiles_around(points))
+
+    def _begin(self, plan: Callable[[], List[Tile]]) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(plan,), name="tile-prefetch", daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, plan: Callable[[], List[Tile]]) -> None:
+        started = time.perf_counter()
+        if self.cache is None:
+            self.cache = get_cache()
+        tiles = plan()
+        missing = [tile for tile in tiles if tile not in self.cache.store]
+        for z, x, y in missing:
+            if self._stop.is_set():
+                break
+            if self.cache.download(z, x, y) is not None:
+                self.fetched += 1
+        log.info(
+            "Prefetched %d of %d missing tiles (%d requested) in %.1f s",
+            self.fetched, len(missing), len(tiles), time.perf_counter() - started,
+        )
+
+
+_cache: Optional[TileCache] = None
+_cache_lock = threading.Lock()
+_prefetcher: Optional[TilePrefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_cache() -> TileCache:
+    """The app-wide tile cache over the store selected by ``TILE_STORE``; opening it scans the store."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if TILE_STORE == "mbtiles":
+                store: TileStore = MBTilesStore(TILE_MBTILES_FILE)
+            else:
+                store = DiskTileStore(TILE_CACHE_DIR)
+            _cache = TileCache(store, url=TILE_URL)
+        return _cache
+
+
+def prefetch_around(points: Sequence[Tuple[float, float]]) -> Optional[TilePrefetcher]:
+    """Start the background prefetch around ``points`` once per run, when enabled and allowed for ``TILE_URL``.
+
+    Returns immediately; the cache is opened and the tile list built on the prefetch thread.
+    """
+    global _prefetcher
+    if not TILE_PREFETCH:
+        return None
+    if not prefetch_allowed(TILE_URL):
+        log.warning("Tile prefetch is disabled for %s: its usage policy forbids bulk downloads", TILE_URL)
+        return None
+    with _prefetcher_lock:
+        if _prefetcher is not None:
+            return _prefetcher
+        _prefetcher = TilePrefetcher()
+    _prefetcher.start_around(points)
+    return _prefetcher
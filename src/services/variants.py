@@ -0,0 +1,152 @@
+"""Density-bucketed image variants generated offline.
+
+Build step (needs Pillow)::
+
+    python -m src.services.variants
+
+For every image in VARIANT_GROUPS the pipeline writes 1x/2x/3x copies
+sized for the group's largest on-screen edge (in dp) under
+``assets/variants``, each in the source format and as WebP, plus a
+manifest with their pixel sizes. At runtime ``pick()`` returns the
+smallest variant that still covers the pixel size it is drawn at,
+preferring WebP when a Kivy image provider can decode it. Without a
+manifest, or for images newer than it, the original file is used.
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from src.services.log import get_logger
+
+log = get_logger("assets")
+
+VARIANT_DIR = os.path.join("assets", "variants")
+MANIFEST = os.path.join(VARIANT_DIR, "manifest.json")
+SCALES = (1, 2, 3)
+VARIANT_EXTENSIONS = (".png", ".jpg", ".jpeg")
+WEBP_QUALITY = 85
+JPEG_QUALITY = 88
+
+# Source folder -> longest on-screen edge in dp at 1x
+VARIANT_GROUPS: Dict[str, int] = {
+    os.path.join("assets", "tiles"): 360,
+    os.path.join("assets", "drinks"): 80,
+    os.path.join("assets", "backgrounds"): 480,
+}
+
+_manifest: Optional[Dict[str, List[dict]]] = None
+_webp: Optional[bool] = None
+_lock = threading.Lock()
+
+
+def _normalize(path: str) -> str:
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+def _load_manifest() -> Dict[str, List[dict]]:
+    try:
+        manifest_mtime = os.path.getmtime(MANIFEST)
+        with open(MANIFEST, encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    fresh = {}
+    for source, variants in entries.items():
+        try:
+            if os.path.getmtime(source) > manifest_mtime:
+                log.info("Variants of %s are stale, using the file", source)
+                continue
+        except OSError:
+            continue
+        fresh[_normalize(source)] = sorted(variants, key=lambda v: v["width"] * v["height"])
+    return fresh
+
+
+def webp_supported() -> bool:
+    global _webp
+    if _webp is None:
+        try:
+            from kivy.core.image import ImageLoader
+
+            _webp = any("webp" in loader.extensions() for loader in ImageLoader.loaders)
+        except Exception:
+            _webp = False
+    return _webp
+
+
+def pick(path: str, width: float = 0, height: float = 0) -> str:
+    """Smallest variant of ``path`` at least ``width`` x ``height`` pixels, or ``path`` itself."""
+    global _manifest
+    if path.startswith("atlas://"):
+        return path
+    if _manifest is None:
+        with _lock:
+            if _manifest is None:
+                _manifest = _load_manifest()
+    variants = _manifest.get(_normalize(path))
+    if not variants:
+        return path
+    formats = ("webp", "source") if webp_supported() else ("source",)
+    for fmt in formats:
+        for variant in variants:
+            if variant["format"] == fmt and variant["width"] >= width and variant["height"] >= height:
+                return variant["path"]
+    # Drawn larger than the biggest variant: only the original has more pixels
+    return path
+
+
+def reset() -> None:
+    global _manifest
+    with _lock:
+        _manifest = None
+
+
+def build() -> None:
+    """Write the 1x/2x/3x variants and the manifest for every group."""
+    from PIL import Image as PILImage
+
+    manifest: Dict[str, List[dict]] = {}
+    for folder, base_edge in VARIANT_GROUPS.items():
+        target_dir = os.path.join(VARIANT_DIR, os.path.basename(folder))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in sorted(os.listdir(folder)):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in VARIANT_EXTENSIONS:
+                continue
+            source = os.path.join(folder, name)
+            variants = []
+            with PILImage.open(source) as original:
+                original.load()
+                longest = max(original.size)
+                for scale in SCALES:
+                    edge = base_edge * scale
+                    if edge >= longest:
+                        # Never upscale: the original already covers this bucket
+                        break
+                    image = original.copy()
+                    image.thumbnail((edge, edge), PILImage.LANCZOS)
+                    out = os.path.join(target_dir, f"{stem}@{scale}x")
+                    if ext.lower() == ".png":
+                        image.save(out + ".png", optimize=True)
+                    else:
+                        image.convert("RGB").save(out + ext, quality=JPEG_QUALITY, optimize=True)
+                    image.save(out + ".webp", quality=WEBP_QUALITY, method=6)
+                    for fmt, path in (("source", out + (".png" if ext.lower() == ".png" else ext)), ("webp", out + ".webp")):
+                        variants.append({
+                            "path": _normalize(path),
+                            "format": fmt,
+                            "scale": scale,
+                            "width": image.width,
+                            "height": image.height,
+                        })
+            if variants:
+                manifest[_normalize(source)] = variants
+            print(f"{source}: {len(variants) // 2} variants")
+    with open(MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    reset()
+
+
+if __name__ == "__main__":
+    build()
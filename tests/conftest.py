@@ -0,0 +1,17 @@
+import pytest
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """The db service pointed at a throwaway database file."""
+    from src.services import db as db_layer
+
+    db_layer.close()
+    path = str(tmp_path / "user.db")
+    monkeypatch.setattr(db_layer, "DB_FILE", path)
+    monkeypatch.setattr(db_layer._manager, "path", path)
+    monkeypatch.setattr(db_layer, "_accruals", db_layer._AccrualQueue())
+    monkeypatch.setattr(db_layer, "_profile", db_layer.UserProfile())
+    db_layer.init_db()
+    yield db_layer
+    db_layer.close()
@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+
+from src.services import atlas
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    icons = tmp_path / "icons"
+    icons.mkdir()
+    (icons / "Logo.jpg").write_bytes(b"jpg")
+    (icons / "close.jpg").write_bytes(b"jpg")
+    (icons / "win.ico").write_bytes(b"ico")
+    atlas_dir = tmp_path / "atlas"
+    atlas_dir.mkdir()
+    monkeypatch.setattr(atlas, "ATLAS_DIR", str(atlas_dir))
+    monkeypatch.setattr(atlas, "ATLAS_GROUPS", {"icons": (str(icons), 256)})
+    atlas.reset()
+    yield tmp_path
+    atlas.reset()
+
+
+def _write_atlas(path, ids):
+    path.write_text(json.dumps({"icons-0.png": {image_id: [0, 0, 8, 8] for image_id in ids}}))
+
+
+def test_unbuilt_atlas_falls_back_to_the_file(assets):
+    path = str(assets / "icons" / "Logo.jpg")
+
+    assert atlas.atlas_source(path) == path
+
+
+def test_atlased_image_resolves_to_an_atlas_url(assets):
+    _write_atlas(assets / "atlas" / "icons.atlas", ["Logo"])
+    logo = str(assets / "icons" / "Logo.jpg")
+    close = str(assets / "icons" / "close.jpg")
+
+    url = atlas.atlas_source(logo)
+    assert url.startswith("atlas://") and url.endswith("/atlas/icons/Logo")
+    # Not packed into the atlas: served from the file as before
+    assert atlas.atlas_source(close) == close
+
+
+def test_image_newer_than_the_atlas_is_not_redirected(assets):
+    atlas_file = assets / "atlas" / "icons.atlas"
+    _write_atlas(atlas_file, ["Logo"])
+    os.utime(atlas_file, (1000, 1000))
+    logo = str(assets / "icons" / "Logo.jpg")
+
+    assert atlas.atlas_source(logo) == logo
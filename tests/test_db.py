@@ -0,0 +1,370 @@
+import gc
+import sqlite3
+import threading
+import time
+
+import pytest
+
+
+def _on_disk(db):
+    """spent_rub and bonus as stored, read through a separate connection."""
+    conn = sqlite3.connect(db.DB_FILE)
+    try:
+        return conn.execute("SELECT spent_rub, bonus FROM user_profile WHERE id = 1").fetchone()
+    finally:
+        conn.close()
+
+
+def test_accruals_are_coalesced_until_flush(db):
+    db.add_spent(100)
+    db.add_spent(50)
+    db.add_bonus(7)
+
+    assert _on_disk(db) == (0, 0)
+    user = db.get_user()
+    assert (user["spent_rub"], user["bonus"]) == (150, 7)
+
+    db.flush()
+    assert _on_disk(db) == (150, 7)
+    assert db._accruals.pending() == (0, 0)
+
+
+def test_threshold_flushes_on_the_worker_without_waiting(db, monkeypatch):
+    monkeypatch.setattr(db, "FLUSH_INTERVAL", 60)
+    flushed_on = []
+    real_flush = db._accruals.flush
+
+    def flush():
+        flushed_on.append(threading.current_thread())
+        real_flush()
+
+    monkeypatch.setattr(db._accruals, "flush", flush)
+    for _ in range(db.FLUSH_THRESHOLD):
+        db.add_bonus(1)
+    # The worker runs jobs in order: once this one is done, the flush is too
+    db.submit(lambda: None).result(timeout=5)
+
+    assert _on_disk(db) == (0, db.FLUSH_THRESHOLD)
+    assert flushed_on and threading.current_thread() not in flushed_on
+
+
+def test_timer_flush_runs_on_the_worker(db, monkeypatch):
+    monkeypatch.setattr(db, "FLUSH_INTERVAL", 0.02)
+    for _ in range(5):
+        db.add_spent(10)
+        time.sleep(0.06)
+
+    assert _on_disk(db) == (50, 0)
+    # The main thread and the db worker; timer threads never connect
+    assert db._manager.open_count() <= 2
+
+
+def test_failed_flush_keeps_increments_for_retry(db, monkeypatch):
+    monkeypatch.setattr(db, "FLUSH_INTERVAL", 60)
+    db.add_spent(30)
+    real_connect = db._connect
+
+    def broken():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(db, "_connect", broken)
+    with pytest.raises(sqlite3.OperationalError):
+        db.flush()
+    assert db._accruals.pending() == (30, 0)
+
+    monkeypatch.setattr(db, "_connect", real_connect)
+    db.flush()
+    assert _on_disk(db) == (30, 0)
+
+
+def test_failed_timer_flush_is_rearmed(db, monkeypatch):
+    monkeypatch.setattr(db, "FLUSH_INTERVAL", 0.02)
+    real_connect = db._connect
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return real_connect()
+
+    monkeypatch.setattr(db, "_connect", flaky)
+    db.add_bonus(3)
+    deadline = time.monotonic() + 2
+    while _on_disk(db) != (0, 3) and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert _on_disk(db) == (0, 3)
+    assert len(calls) >= 2
+
+
+def test_connections_of_finished_threads_are_released(db):
+    for _ in range(10):
+        thread = threading.Thread(target=db.get_orders)
+        thread.start()
+        thread.join()
+
+    assert db._manager.open_count() == 1
+
+
+class ProfileWatcher:
+    def __init__(self):
+        self.seen = []
+
+    def on_profile(self, profile):
+        self.seen.append(profile.as_dict())
+
+
+def test_update_user_writes_through_cache_and_row(db):
+    profile = db.get_profile()
+    db.update_user(name="Анна", phone="+7 900 000-00-00")
+
+    assert (profile.name, profile.phone) == ("Анна", "+7 900 000-00-00")
+    conn = sqlite3.connect(db.DB_FILE)
+    try:
+        row = conn.execute("SELECT name, phone FROM user_profile WHERE id = 1").fetchone()
+    finally:
+        conn.close()
+    assert row == ("Анна", "+7 900 000-00-00")
+
+
+def test_observers_are_notified_once_per_change(db):
+    watcher = ProfileWatcher()
+    db.get_profile().bind(watcher.on_profile)
+
+    db.update_user(name="Анна")
+    db.update_user(name="Анна")  # unchanged: no notification
+    db.add_bonus(5)
+    db.add_spent(0)  # nothing to add: no notification
+
+    assert [(seen["name"], seen["bonus"]) for seen in watcher.seen] == [("Анна", 0), ("Анна", 5)]
+
+    db.get_profile().unbind(watcher.on_profile)
+    db.update_user(name="Борис")
+    assert len(watcher.seen) == 2
+
+
+def test_collected_observer_is_dropped(db):
+    profile = db.get_profile()
+    survivor = ProfileWatcher()
+    profile.bind(ProfileWatcher().on_profile)
+    profile.bind(survivor.on_profile)
+    gc.collect()
+
+    db.update_user(name="Анна")
+
+    assert len(survivor.seen) == 1
+    assert len(profile._observers) == 1
+
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+@pytest.mark.parametrize("recorded", [True, False], ids=["v1", "pre-versioning"])
+def test_migrate_upgrades_v1_database_keeping_user_data(db, tmp_path, recorded):
+    conn = sqlite3.connect(str(tmp_path / "old.db"))
+    db._migration_1_user_profile(conn)
+    conn.execute("UPDATE user_profile SET name = 'Анна', spent_rub = 1200, bonus = 40 WHERE id = 1")
+    if recorded:
+        conn.execute("CREATE TABLE schema_version (version INTEGER PRIMARY KEY, applied_at INTEGER NOT NULL DEFAULT 0)")
+        conn.execute("INSERT INTO schema_version (version) VALUES (1)")
+    conn.commit()
+
+    db._migrate(conn)
+
+    assert db.schema_version(conn) == db._MIGRATIONS[-1][0]
+    assert {"orders", "order_items", "screen_visits", "messages", "message_sync"} <= _tables(conn)
+    assert conn.execute("SELECT name, spent_rub, bonus FROM user_profile").fetchall() == [("Анна", 1200, 40)]
+    conn.close()
+
+
+def test_migrate_again_is_a_no_op(db):
+    conn = db._connect()
+    db.add_order("cafe", [{"title": "Латте", "price_rub": 250}], created_at=100)
+    versions = conn.execute("SELECT version, applied_at FROM schema_version ORDER BY version").fetchall()
+
+    db._migrate(conn)
+
+    assert conn.execute("SELECT version, applied_at FROM schema_version ORDER BY version").fetchall() == versions
+    assert [order["created_at"] for order in db.get_orders()] == [100]
+
+
+def _walk_pages(db, limit, channel=None):
+    pages, after = [], None
+    while True:
+        page = db.get_orders_page(channel=channel, after=after, limit=limit)
+        pages.append(page)
+        if not page:
+            return pages
+        after = (page[-1]["created_at"], page[-1]["id"])
+
+
+def test_order_pages_break_created_at_ties_by_id(db):
+    # Five orders share one timestamp, so every page boundary falls inside a tie
+    ids = [db.add_order("cafe", [{"title": f"Заказ {n}"}], created_at=500) for n in range(5)]
+    ids.append(db.add_order("mobile", [{"title": "Старый"}], created_at=400))
+
+    pages = _walk_pages(db, limit=2)
+
+    seen = [order["id"] for page in pages for order in page]
+    assert seen == sorted(ids[:5], reverse=True) + [ids[5]]
+    assert [len(page) for page in pages] == [2, 2, 2, 0]
+
+
+def test_order_pages_filter_by_channel(db):
+    mobile = []
+    for n in range(6):
+        channel = "mobile" if n % 2 else "cafe"
+        order_id = db.add_order(channel, [{"title": "Капучино", "quantity": 2, "price_rub": 200}], created_at=1000 + n)
+        if channel == "mobile":
+            mobile.append(order_id)
+
+    pages = _walk_pages(db, limit=2, channel="mobile")
+
+    orders = [order for page in pages for order in page]
+    assert [order["id"] for order in orders] == mobile[::-1]
+    assert {order["channel"] for order in orders} == {"mobile"}
+    assert orders[0]["items"] == "2 × Капучино"
+    assert orders[0]["total_rub"] == 400
+
+
+def test_last_order_page_is_empty(db):
+    assert db.get_orders_page() == []
+    order_id = db.add_order("cafe", [], created_at=10)
+
+    assert db.get_orders_page(after=(10, order_id)) == []
+    assert db.get_orders_page(channel="mobile") == []
+
+
+def _plan_of(db, call):
+    """EXPLAIN QUERY PLAN of the last statement ``call`` runs on this thread's connection."""
+    conn = db._connect()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return " | ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + statements[-1]))
+
+
+@pytest.mark.parametrize(
+    "channel, after, index",
+    [
+        (None, None, "idx_orders_created"),
+        (None, (500, 3), "idx_orders_created"),
+        ("mobile", None, "idx_orders_channel_created"),
+        ("mobile", (500, 3), "idx_orders_channel_created"),
+    ],
+)
+def test_order_pages_use_the_history_indexes(db, channel, after, index):
+    plan = _plan_of(db, lambda: db.get_orders_page(channel=channel, after=after))
+
+    assert f"USING INDEX {index}" in plan
+    assert "USING INDEX idx_order_items_order" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_order_pages_return_every_order_exactly_once(db):
+    expected = []
+    for n in range(120):
+        channel = ("cafe", "mobile", "mobile")[n % 3]
+        created_at = 1000 + (n * 7) % 23  # heavy timestamp ties
+        order_id = db.add_order(channel, [{"title": "Эспрессо"}], created_at=created_at)
+        expected.append((created_at, order_id, channel))
+    expected.sort(reverse=True)
+
+    for channel in (None, "cafe", "mobile"):
+        seen = [order["id"] for page in _walk_pages(db, limit=7, channel=channel) for order in page]
+        assert seen == [order_id for _, order_id, ch in expected if channel in (None, ch)]
+
+
+class FakeMessageServer:
+    """In-memory message source that records what each sync asked for."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.messages = []
+        self.requests = []
+        self.served = 0
+
+    def post(self, message_id, created_at, text="..."):
+        self.messages.append({"id": message_id, "created_at": created_at, "text": text})
+
+    def fetch_since(self, after, limit):
+        self.requests.append(after)
+        newer = sorted(
+            (m for m in self.messages if after is None or (m["created_at"], m["id"]) > tuple(after)),
+            key=lambda m: (m["created_at"], m["id"]),
+        )[:limit]
+        self.served += len(newer)
+        return newer
+
+
+def test_sync_pulls_only_messages_past_the_high_water_mark(db):
+    server = FakeMessageServer()
+    for n in range(5):
+        server.post(f"m{n}", 1000 + n)
+
+    assert db.sync_messages(server) == 5
+    assert db.get_sync_mark("fake") == (1004, "m4")
+
+    server.post("m5", 1005)
+    server.post("m6", 1005)
+    server.served = 0
+    assert db.sync_messages(server) == 2
+    assert server.served == 2
+    assert [m["id"] for m in db.get_messages()] == ["m6", "m5", "m4", "m3", "m2", "m1", "m0"]
+
+    assert db.sync_messages(server) == 0
+
+
+def test_sync_walks_large_backlogs_in_batches(db):
+    server = FakeMessageServer()
+    for n in range(25):
+        server.post(f"m{n:02d}", 2000 + n)
+
+    assert db.sync_messages(server, batch_size=10) == 25
+    assert server.requests == [None, (2009, "m09"), (2019, "m19")]
+
+
+def test_messages_read_state_and_paging(db):
+    server = FakeMessageServer()
+    for n in range(4):
+        server.post(f"m{n}", 3000 + n)
+    db.sync_messages(server)
+
+    assert db.unread_count() == 4
+    db.mark_messages_read(["m3", "m2"])
+    assert db.unread_count() == 2
+
+    first = db.get_messages(limit=2)
+    assert [(m["id"], m["read"]) for m in first] == [("m3", 1), ("m2", 1)]
+    rest = db.get_messages(after=(first[-1]["created_at"], first[-1]["id"]), limit=2)
+    assert [(m["id"], m["read"]) for m in rest] == [("m1", 0), ("m0", 0)]
+
+
+def test_resync_keeps_read_state(db):
+    server = FakeMessageServer()
+    server.post("m0", 4000, "old text")
+    db.sync_messages(server)
+    db.mark_messages_read(["m0"])
+
+    server.messages = []
+    server.post("m0", 4001, "edited text")
+    db.sync_messages(server)
+
+    assert db.get_messages() == [{"id": "m0", "created_at": 4001, "text": "edited text", "read": 1}]
+
+
+def test_messages_are_ordered_through_the_created_at_index(db):
+    plan = " ".join(
+        row[-1] for row in db._connect().execute(
+            "EXPLAIN QUERY PLAN SELECT id, created_at, text, read FROM messages ORDER BY created_at DESC, id DESC LIMIT 50"
+        )
+    )
+
+    assert "idx_messages_created" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from src.services.geo_index import GeoIndex, format_distance, haversine_m
+
+CAFES = [
+    (55.7522, 37.5928),  # Арбат
+    (55.7647, 37.6055),  # Тверская
+    (55.7579, 37.6670),  # Курская
+    (55.8046, 37.5166),  # Сокол
+    (55.7435, 37.6306),  # Новокузнецкая
+]
+
+
+def test_haversine_matches_a_known_distance():
+    # Red Square to the Kremlin's Borovitskaya tower, about 1 km
+    assert haversine_m(55.7539, 37.6208, 55.7496, 37.6096) == pytest.approx(850, abs=30)
+
+
+def test_nearest_returns_k_closest_with_distances():
+    index = GeoIndex(CAFES)
+
+    hits = index.nearest(55.7558, 37.6176, k=2)  # Manezhnaya square
+
+    assert [i for i, _ in hits] == [1, 4]
+    assert hits[0][1] == pytest.approx(haversine_m(55.7558, 37.6176, *CAFES[1]))
+    assert hits[0][1] <= hits[1][1]
+    assert len(index.nearest(55.7558, 37.6176, k=10)) == len(CAFES)
+
+
+def test_nearest_agrees_with_a_full_scan():
+    rng = random.Random(7)
+    points = [(55.55 + rng.random() * 0.4, 37.35 + rng.random() * 0.5) for _ in range(2000)]
+    index = GeoIndex(points)
+
+    for _ in range(50):
+        lat, lon = 55.55 + rng.random() * 0.4, 37.35 + rng.random() * 0.5
+        expected = sorted(haversine_m(lat, lon, *p) for p in points)[:5]
+        assert [m for _, m in index.nearest(lat, lon, k=5)] == pytest.approx(expected, rel=1e-3)
+
+
+def test_within_returns_points_inside_the_box():
+    index = GeoIndex(CAFES)
+
+    assert index.within((55.74, 37.58, 55.77, 37.64)) == [0, 1, 4]
+    assert index.within((10.0, 10.0, 11.0, 11.0)) == []
+
+
+def test_empty_index():
+    index = GeoIndex([])
+
+    assert index.nearest(55.75, 37.61, k=3) == []
+    assert index.within((55.0, 37.0, 56.0, 38.0)) == []
+
+
+def test_format_distance():
+    assert format_distance(84) == "80 м"
+    assert format_distance(1250) == "1,2 км"
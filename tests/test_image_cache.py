@@ -0,0 +1,59 @@
+from src.services.image_cache import TextureCache
+
+
+class FakeTexture:
+    def __init__(self, width, height):
+        self.size = (width, height)
+
+
+def _cache(budget, sizes):
+    loads = []
+
+    def loader(source):
+        loads.append(source)
+        return FakeTexture(*sizes[source]) if source in sizes else None
+
+    return TextureCache(budget, loader), loads
+
+
+def test_repeated_sources_share_one_texture():
+    cache, loads = _cache(1000, {"a.png": (4, 4)})
+
+    first = cache.get("a.png")
+    assert cache.get("a.png") is first
+    assert loads == ["a.png"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["bytes"] == 64
+
+
+def test_least_recently_used_is_evicted_over_budget():
+    # Each texture is 64 bytes; the budget holds two
+    cache, loads = _cache(128, {name: (4, 4) for name in ("a", "b", "c")})
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 128
+    cache.get("a")
+    assert loads == ["a", "b", "c"]
+    cache.get("b")
+    assert loads == ["a", "b", "c", "b"]
+
+
+def test_oversized_texture_is_still_served():
+    cache, _ = _cache(10, {"big": (100, 100)})
+
+    assert cache.get("big") is not None
+    assert cache.stats()["entries"] == 1
+
+
+def test_missing_image_is_not_cached():
+    cache, loads = _cache(100, {})
+
+    assert cache.get("missing.png") is None
+    assert cache.get("missing.png") is None
+    assert loads == ["missing.png", "missing.png"]
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,71 @@
+import threading
+
+from src.services.image_loader import PRIORITY_OFFSCREEN, PRIORITY_VISIBLE, PriorityDecoder
+
+
+class Recorder:
+    def __init__(self, expected):
+        self.order = []
+        self.done = threading.Event()
+        self.expected = expected
+        self.gate = threading.Event()
+
+    def decode(self, source):
+        if source == "blocker":
+            self.gate.wait(2)
+        return source.upper()
+
+    def deliver(self, source, result):
+        self.order.append((source, result))
+        if len(self.order) == self.expected:
+            self.done.set()
+
+
+def _decoder(expected):
+    recorder = Recorder(expected)
+    return PriorityDecoder(recorder.decode, recorder.deliver, workers=1), recorder
+
+
+def test_visible_images_are_decoded_first():
+    decoder, recorder = _decoder(4)
+    # Occupy the only worker so the rest queue up
+    decoder.request("blocker", PRIORITY_VISIBLE)
+    decoder.request("offscreen-1", PRIORITY_OFFSCREEN)
+    decoder.request("offscreen-2", PRIORITY_OFFSCREEN)
+    decoder.request("visible", PRIORITY_VISIBLE)
+    recorder.gate.set()
+
+    assert recorder.done.wait(2)
+    assert [source for source, _ in recorder.order] == ["blocker", "visible", "offscreen-1", "offscreen-2"]
+    assert recorder.order[1] == ("visible", "VISIBLE")
+
+
+def test_pending_request_can_be_promoted_once():
+    decoder, recorder = _decoder(3)
+    decoder.request("blocker", PRIORITY_VISIBLE)
+    decoder.request("a", PRIORITY_OFFSCREEN)
+    decoder.request("b", PRIORITY_OFFSCREEN)
+    decoder.request("b", PRIORITY_VISIBLE)
+    decoder.request("b", PRIORITY_OFFSCREEN)
+    recorder.gate.set()
+
+    assert recorder.done.wait(2)
+    assert [source for source, _ in recorder.order] == ["blocker", "b", "a"]
+    assert decoder.pending() == 0
+
+
+def test_decode_errors_are_delivered_as_none():
+    done = threading.Event()
+    results = []
+
+    def decode(source):
+        raise OSError("broken file")
+
+    def deliver(source, result):
+        results.append((source, result))
+        done.set()
+
+    PriorityDecoder(decode, deliver, workers=1).request("broken.png")
+
+    assert done.wait(2)
+    assert results == [("broken.png", None)]
@@ -0,0 +1,56 @@
+import io
+import logging
+
+import pytest
+
+from src.services import log as log_service
+
+
+@pytest.fixture
+def app_log():
+    """App loggers reconfigured for one test, restored to the env settings afterwards."""
+    yield log_service
+    log_service.configure()
+
+
+def test_ring_keeps_only_the_last_records(app_log):
+    app_log.configure(level=logging.DEBUG, ring_size=3)
+    logger = app_log.get_logger("test")
+    for n in range(5):
+        logger.info("record %d", n)
+
+    out = io.StringIO()
+    app_log.dump_ring(out)
+
+    assert out.getvalue().splitlines() == [
+        "[cubecoffee.test] INFO: record 2",
+        "[cubecoffee.test] INFO: record 3",
+        "[cubecoffee.test] INFO: record 4",
+    ]
+
+
+def test_ring_keeps_records_unformatted_until_dump():
+    ring = log_service.RingBufferHandler(2)
+    calls = []
+    lazy = log_service.lazy(lambda: calls.append(1) or "value")
+    ring.emit(logging.LogRecord("cubecoffee.test", logging.INFO, __file__, 1, "x=%s", (lazy,), None))
+
+    assert calls == []
+    out = io.StringIO()
+    ring.dump(out)
+    assert out.getvalue() == "x=value\n"
+    assert calls == [1]
+
+
+def test_lazy_is_not_evaluated_when_the_level_is_off(app_log):
+    app_log.configure(level=logging.WARNING, ring_size=10)
+    logger = app_log.get_logger("test")
+    calls = []
+
+    logger.debug("expensive: %s", app_log.lazy(lambda: calls.append(1)))
+    logger.warning("cheap: %s", app_log.lazy(len, "abc"))
+
+    out = io.StringIO()
+    app_log.dump_ring(out)
+    assert calls == []
+    assert out.getvalue() == "[cubecoffee.test] WARNING: cheap: 3\n"
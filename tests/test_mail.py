@@ -0,0 +1,85 @@
+import json
+import os
+from datetime import datetime
+
+from src.services.mail import JsonFileSource, MailMessage, inbox_rows, patch_rows
+
+
+def _write(path, messages):
+    path.write_text(json.dumps(messages), encoding="utf-8")
+
+
+def test_json_source_returns_messages_past_the_mark(tmp_path):
+    path = tmp_path / "messages.json"
+    _write(path, [
+        {"id": "b", "created_at": 20, "text": "second"},
+        {"id": "a", "created_at": 10, "text": "first"},
+        {"id": "c", "created_at": 20, "text": "third"},
+    ])
+    source = JsonFileSource(str(path))
+
+    assert [m["id"] for m in source.fetch_since(None, 10)] == ["a", "b", "c"]
+    assert [m["id"] for m in source.fetch_since((20, "b"), 10)] == ["c"]
+    assert [m["id"] for m in source.fetch_since(None, 2)] == ["a", "b"]
+
+
+def test_json_source_rereads_a_changed_file(tmp_path):
+    path = tmp_path / "messages.json"
+    _write(path, [{"id": "a", "created_at": 10, "text": "first"}])
+    source = JsonFileSource(str(path))
+    source.fetch_since(None, 10)
+
+    _write(path, [{"id": "a", "created_at": 10, "text": "first"}, {"id": "b", "created_at": 11, "text": "new"}])
+    os.utime(path, (1, 1))
+
+    assert [m["id"] for m in source.fetch_since((10, "a"), 10)] == ["b"]
+
+
+def test_missing_json_source_is_empty(tmp_path):
+    assert JsonFileSource(str(tmp_path / "none.json")).fetch_since(None, 10) == []
+
+
+def test_inbox_rows_carry_precomputed_heights():
+    messages = [
+        MailMessage("b", datetime(2026, 10, 18, 9, 5), "Новое"),
+        MailMessage("a", datetime(2026, 10, 17, 20, 30), "Старое", read=True),
+    ]
+    rows = inbox_rows(messages, {"a": 41, "b": 40}, 28)
+
+    assert [row["viewclass"] for row in rows] == ["MailDateRow", "MailMessageRow"] * 2
+    assert [row["size"][1] for row in rows] == [28, 40, 28, 41]
+    assert rows[0]["text"] == "18 октября 2026 г."
+    assert (rows[1]["time_text"], rows[1]["unread"], rows[3]["unread"]) == ("09:05", True, False)
+
+
+class _RecordingList(list):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.writes = []
+
+    def __setitem__(self, key, value):
+        self.writes.append(key)
+        super().__setitem__(key, value)
+
+
+def test_patch_rows_replaces_only_the_changed_span():
+    data = _RecordingList(["a", "b", "c", "d"])
+
+    assert patch_rows(data, ["a", "x", "c", "d"])
+    assert data == ["a", "x", "c", "d"]
+    assert data.writes == [slice(1, 2)]
+
+
+def test_patch_rows_inserts_at_the_top():
+    data = _RecordingList(["b", "c"])
+
+    assert patch_rows(data, ["a", "b", "c"])
+    assert data == ["a", "b", "c"]
+    assert data.writes == [slice(0, 0)]
+
+
+def test_patch_rows_is_a_no_op_for_equal_rows():
+    data = _RecordingList(["a", "b"])
+
+    assert not patch_rows(data, ["a", "b"])
+    assert data.writes == []
@@ -0,0 +1,53 @@
+import pytest
+
+from src.services.map_clusters import GridClusterer, world_pixel
+
+ARBAT = (55.7522, 37.5928)
+MAYAKOVSKAYA = (55.7700, 37.5978)
+KURSKAYA = (55.7579, 37.6670)
+
+
+def test_world_pixel_matches_web_mercator():
+    assert world_pixel(0, 0, 0) == pytest.approx((128, 128))
+    assert world_pixel(0, 180, 1) == pytest.approx((512, 256))
+    x, y = world_pixel(55.7558, 37.6176, 10)
+    assert (int(x // 256), int(y // 256)) == (619, 320)  # the OSM tile holding central Moscow
+
+
+def test_nearby_points_merge_at_low_zoom_and_split_when_zooming_in():
+    clusterer = GridClusterer([ARBAT, MAYAKOVSKAYA, KURSKAYA], cell_px=64)
+
+    low = clusterer.clusters(7)
+    assert len(low) == 1 and low[0].count == 3
+    assert low[0].lat == pytest.approx(sum(p[0] for p in (ARBAT, MAYAKOVSKAYA, KURSKAYA)) / 3)
+
+    # Arbat and Mayakovskaya are 2 km apart, Kurskaya 4.5 km east of them
+    assert sorted(c.members for c in clusterer.clusters(10)) == [(0, 1), (2,)]
+
+    high = clusterer.clusters(14)
+    assert sorted(c.key for c in high) == [("point", 0), ("point", 1), ("point", 2)]
+
+
+def test_every_point_stands_alone_from_max_zoom():
+    clusterer = GridClusterer([ARBAT, ARBAT], max_zoom=16)
+
+    assert clusterer.clusters(15)[0].count == 2
+    assert [c.count for c in clusterer.clusters(16)] == [1, 1]
+
+
+def test_only_cells_in_the_viewport_are_returned():
+    clusterer = GridClusterer([ARBAT, KURSKAYA], cell_px=64)
+    west_only = (55.74, 37.58, 55.76, 37.60)
+
+    assert [c.members for c in clusterer.clusters(13, west_only)] == [(0,)]
+    assert [c.members for c in clusterer.clusters(16, west_only)] == [(0,)]
+    assert clusterer.clusters(13, (10.0, 10.0, 11.0, 11.0)) == []
+
+
+def test_levels_are_cached_between_pans():
+    clusterer = GridClusterer([ARBAT, MAYAKOVSKAYA, KURSKAYA])
+    first = clusterer.clusters(10, (55.7, 37.5, 55.8, 37.7))
+    second = clusterer.clusters(10, (55.71, 37.51, 55.81, 37.71))
+
+    assert [c.key for c in first] == [c.key for c in second]
+    assert all(a is b for a, b in zip(first, second))
@@ -0,0 +1,75 @@
+from src.services.map_layer import MarkerLayer
+
+
+class FakeMap:
+    def __init__(self):
+        self.markers = []
+        self.calls = 0
+
+    def add(self, marker):
+        self.markers.append(marker)
+        self.calls += 1
+
+    def remove(self, marker):
+        self.markers.remove(marker)
+        self.calls += 1
+
+
+def _layer(fake_map, created):
+    def create(key):
+        created.append(key)
+        return f"marker:{key}"
+
+    return MarkerLayer(create, fake_map.add, fake_map.remove)
+
+
+def test_update_touches_only_the_difference():
+    fake_map, created = FakeMap(), []
+    layer = _layer(fake_map, created)
+
+    assert layer.update(["a", "b", "c"]) == (3, 0)
+    fake_map.calls = 0
+    assert layer.update(["b", "c", "d"]) == (1, 1)
+
+    assert fake_map.calls == 2
+    assert sorted(fake_map.markers) == ["marker:b", "marker:c", "marker:d"]
+    assert layer.shown() == ("b", "c", "d")
+
+
+def test_markers_are_created_once_per_key():
+    fake_map, created = FakeMap(), []
+    layer = _layer(fake_map, created)
+
+    layer.update(["a", "b"])
+    layer.update([])
+    layer.update(["a", "b"])
+
+    assert created == ["a", "b"]
+    assert fake_map.markers == ["marker:a", "marker:b"]
+
+
+def test_same_set_is_a_no_op():
+    fake_map, created = FakeMap(), []
+    layer = _layer(fake_map, created)
+    layer.update(["a", "b"])
+    fake_map.calls = 0
+
+    assert layer.update(["b", "a", "a"]) == (0, 0)
+    assert fake_map.calls == 0
+    assert layer.is_shown("a") and not layer.is_shown("z")
+
+
+def test_hidden_markers_beyond_the_pool_size_are_dropped_oldest_first():
+    fake_map, created = FakeMap(), []
+    layer = MarkerLayer(lambda key: created.append(key) or key, fake_map.add, fake_map.remove, pool_size=2)
+
+    layer.update(["a"])
+    layer.update(["b"])
+    layer.update(["c"])
+    layer.update(["d"])
+
+    # a, b and c are hidden; only the two hidden last stay pooled
+    assert layer.pooled() == 3
+    layer.update(["b", "c"])
+    layer.update(["a"])
+    assert created == ["a", "b", "c", "d", "a"]
@@ -0,0 +1,87 @@
+import json
+import os
+import re
+
+from src.services.menu_catalog import CATALOG_FILE, Catalog, Drink, card_row, grid_rows
+
+
+def _item(item_id, **overrides):
+    item = {
+        "id": item_id, "name": item_id.upper(), "image": f"assets/drinks/{item_id}.png",
+        "kcal": 100, "protein": 1, "fat": 2, "carbs": 3, "price": 200, "volume_ml": 400,
+    }
+    item.update(overrides)
+    return item
+
+
+def _write(path, sections):
+    path.write_text(json.dumps({"sections": sections}), encoding="utf-8")
+
+
+def test_sections_are_returned_in_requested_order(tmp_path):
+    path = tmp_path / "catalog.json"
+    _write(path, [
+        {"id": "a", "title": "A", "items": [_item("x")]},
+        {"id": "b", "title": "B", "items": [_item("y"), _item("z")]},
+    ])
+    catalog = Catalog(str(path))
+
+    assert [s.id for s in catalog.sections()] == ["a", "b"]
+    assert [s.id for s in catalog.sections(["b", "missing", "a"])] == ["b", "a"]
+    assert [d.id for d in catalog.sections(["b"])[0].drinks] == ["y", "z"]
+
+
+def test_catalog_rereads_a_changed_file(tmp_path):
+    path = tmp_path / "catalog.json"
+    _write(path, [{"id": "a", "title": "A", "items": [_item("x")]}])
+    catalog = Catalog(str(path))
+    catalog.sections()
+
+    _write(path, [{"id": "a", "title": "A", "items": [_item("x"), _item("y")]}])
+    os.utime(path, (1, 1))
+
+    assert [d.id for d in catalog.sections()[0].drinks] == ["x", "y"]
+
+
+def test_missing_catalog_is_empty(tmp_path):
+    assert Catalog(str(tmp_path / "none.json")).sections() == []
+
+
+def test_card_row_formats_the_card_text():
+    drink = Drink.from_dict(_item("raf", name="РАФ", kcal=280, protein=12, fat=10, carbs=42, price=290))
+
+    assert card_row(drink) == {
+        "viewclass": "DrinkCard",
+        "title": "РАФ",
+        "image": "assets/drinks/raf.png",
+        "kcal_text": "Ккал: 280",
+        "macros_text": "Б: 12 Ж: 10 У: 42",
+        "price_text": "290",
+        "volume_text": "400 мл",
+    }
+
+
+def test_grid_rows_start_every_section_on_a_new_row(tmp_path):
+    path = tmp_path / "catalog.json"
+    _write(path, [
+        {"id": "a", "title": "A", "items": [_item("x"), _item("y"), _item("z")]},
+        {"id": "b", "title": "B", "items": [_item("w")]},
+    ])
+    rows = grid_rows(Catalog(str(path)).sections(), cols=2, header_size=(160, 32))
+
+    assert [r["viewclass"] for r in rows] == [
+        "MenuSectionHeader", "Widget", "DrinkCard", "DrinkCard", "DrinkCard", "Widget",
+        "MenuSectionHeader", "Widget", "DrinkCard",
+    ]
+    assert rows[1]["size"] == rows[0]["size"] == (160, 32)
+    assert "size" not in rows[5]  # blank card cells fall back to default_size
+
+
+def test_shipped_catalog_loads():
+    sections = Catalog(CATALOG_FILE).sections()
+
+    assert [s.id for s in sections] == ["alucard"]
+    for section in sections:
+        for drink in section.drinks:
+            assert os.path.exists(drink.image), drink.image
+            assert not re.search(r"Item \d+", drink.name), drink.name
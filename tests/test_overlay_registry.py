@@ -0,0 +1,83 @@
+from src.services.overlay_registry import OverlayRegistry
+
+
+class FakeWidget:
+    def __init__(self, ids=None, children=()):
+        self.ids = ids or {}
+        self.children = list(children)
+
+
+class FakeScreen(FakeWidget):
+    def __init__(self, name, ids=None, children=()):
+        super().__init__(ids, children)
+        self.name = name
+
+
+def _main_screen():
+    """Menu and mail on the screen rule; loyalty keeps its panel in its own ids."""
+    loyalty = FakeWidget({"loyalty_panel": "loyalty panel"})
+    root = FakeWidget({"loyalty_overlay_root": loyalty})
+    ids = {
+        "overlay_root": "menu root",
+        "overlay_panel": "menu panel",
+        "mail_overlay_root": "mail root",
+        "mail_panel": "mail panel",
+        "mail_list": "mail list",
+    }
+    return FakeScreen("main", ids, [root]), loyalty
+
+
+def test_register_collects_refs_from_every_id_scope():
+    registry = OverlayRegistry()
+    screen, loyalty = _main_screen()
+
+    registry.register_screen(screen)
+
+    assert registry.get("main", "menu") == ("menu root", "menu panel", None)
+    assert registry.get("main", "mail") == ("mail root", "mail panel", "mail list")
+    assert registry.get("main", "loyalty") == (loyalty, "loyalty panel", None)
+    assert registry.get("main", "gift") is None
+    assert registry.get("profile", "menu") is None
+
+
+def test_push_pop_keeps_a_stack_per_screen():
+    registry = OverlayRegistry()
+    registry.push("main", "menu")
+    registry.push("profile", "gift")
+    registry.push("main", "mail")
+
+    assert registry.top("main") == "mail"
+    assert registry.open_kinds("main") == ["menu", "mail"]
+
+    registry.remove("main", "mail")
+    assert registry.top("main") == "menu"
+    assert not registry.is_open("main", "mail")
+    assert registry.top("profile") == "gift"
+
+    registry.remove("main", "menu")
+    registry.remove("main", "menu")  # already closed: no error
+    assert registry.top("main") is None
+
+
+def test_reopening_moves_an_overlay_to_the_top():
+    registry = OverlayRegistry()
+    registry.push("main", "menu")
+    registry.push("main", "mail")
+    registry.push("main", "menu")
+
+    assert registry.open_kinds("main") == ["mail", "menu"]
+    assert registry.top("main") == "menu"
+
+
+def test_unregister_drops_refs_and_open_entries_of_that_screen():
+    registry = OverlayRegistry()
+    screen, _ = _main_screen()
+    registry.register_screen(screen)
+    registry.push("main", "menu")
+    registry.push("profile", "gift")
+
+    registry.unregister_screen("main")
+
+    assert registry.get("main", "menu") is None
+    assert registry.top("main") is None
+    assert registry.top("profile") == "gift"
@@ -0,0 +1,63 @@
+from src.services.prewarm import ScreenPrewarmer
+
+
+class FakeApp:
+    """Records build steps; a screen named "broken" fails on its first step."""
+
+    def __init__(self):
+        self.root = None
+        self.steps = []
+
+    def screen_build_steps(self, name):
+        if name == "broken":
+            raise RuntimeError("bad kv")
+        for step in ("import", "kv", "widget"):
+            self.steps.append((name, step))
+            yield
+
+
+def _prewarmer(app, priorities, visits=None, frame_budget=1.0):
+    prewarmer = ScreenPrewarmer(app, priorities, visits=visits, frame_budget=frame_budget)
+    prewarmer.scheduled = []
+    prewarmer._schedule = lambda callback, delay: prewarmer.scheduled.append(delay)
+    return prewarmer
+
+
+def test_rank_without_visits_keeps_configured_order():
+    assert ScreenPrewarmer.rank(["profile", "history", "addresses"], {}) == ["profile", "history", "addresses"]
+
+
+def test_rank_puts_most_visited_first_and_breaks_ties_by_order():
+    visits = {"addresses": 5, "history": 5, "profile": 1}
+
+    assert ScreenPrewarmer.rank(["profile", "history", "addresses"], visits) == ["history", "addresses", "profile"]
+
+
+def test_rank_can_promote_an_unlisted_screen_but_keeps_the_length():
+    visits = {"menu": 40, "history": 2}
+
+    assert ScreenPrewarmer.rank(["profile", "history"], visits) == ["menu", "history"]
+    assert ScreenPrewarmer.rank([], {"menu": 1}) == ["menu"]
+
+
+def test_run_builds_queue_and_skips_a_broken_screen():
+    app = FakeApp()
+    prewarmer = _prewarmer(app, ["broken", "profile"])
+
+    prewarmer.start()
+    assert prewarmer.scheduled == [prewarmer.start_delay]
+    prewarmer._run(0)
+
+    assert app.steps == [("profile", "import"), ("profile", "kv"), ("profile", "widget")]
+    assert prewarmer.queue == []
+
+
+def test_run_yields_to_an_active_transition():
+    app = FakeApp()
+    app.root = type("Root", (), {"transition": type("T", (), {"is_active": True})()})()
+    prewarmer = _prewarmer(app, ["profile"])
+
+    prewarmer._run(0)
+
+    assert app.steps == []
+    assert prewarmer.scheduled == [0.1]
@@ -0,0 +1,81 @@
+from src.services.screen_cache import ScreenLRU
+
+
+class FakeTexture:
+    def __init__(self, width, height):
+        self.size = (width, height)
+
+
+class FakeWidget:
+    def __init__(self, texture=None):
+        self.texture = texture
+
+
+class FakeScreen:
+    def __init__(self, *textures):
+        self.widgets = [FakeWidget(texture) for texture in textures]
+
+    def walk(self, restrict=False):
+        return iter(self.widgets)
+
+
+class FakeScreenManager:
+    def __init__(self, screens):
+        self.screens = screens
+
+    @property
+    def screen_names(self):
+        return list(self.screens)
+
+    def get_screen(self, name):
+        return self.screens[name]
+
+
+def _manager(*names, texture=None):
+    return FakeScreenManager({name: FakeScreen(texture) for name in names})
+
+
+def test_victims_are_least_recently_used_first():
+    lru = ScreenLRU(max_resident=3)
+    for name in ("main", "profile", "history", "menu", "addresses"):
+        lru.touch(name)
+    lru.touch("profile")
+    manager = _manager("main", "profile", "history", "menu", "addresses")
+
+    assert lru.victims(manager) == ["history", "menu"]
+
+
+def test_untouched_screens_go_before_touched_ones():
+    lru = ScreenLRU(max_resident=2)
+    lru.touch("history")
+    lru.touch("profile")
+
+    assert lru.victims(_manager("main", "history", "profile", "prewarmed")) == ["prewarmed", "history"]
+
+
+def test_current_and_pinned_screens_are_never_evicted():
+    lru = ScreenLRU(max_resident=1, pinned=("main",))
+    for name in ("main", "profile", "history"):
+        lru.touch(name)
+
+    victims = lru.victims(_manager("main", "profile", "history"), protected=["profile"])
+
+    assert victims == ["history"]
+
+
+def test_texture_budget_evicts_past_the_resident_cap():
+    lru = ScreenLRU(max_resident=10, texture_budget=2 * 100 * 100 * 4)
+    for name in ("main", "profile", "history", "menu"):
+        lru.touch(name)
+    manager = _manager("main", "profile", "history", "menu", texture=FakeTexture(100, 100))
+
+    assert lru.victims(manager, protected=["menu"]) == ["profile", "history"]
+
+
+def test_discarded_screen_counts_as_untouched_again():
+    lru = ScreenLRU(max_resident=1, pinned=())
+    lru.touch("profile")
+    lru.touch("history")
+    lru.discard("history")
+
+    assert lru.candidates(["profile", "history"]) == ["history", "profile"]
@@ -0,0 +1,59 @@
+from src.services.search_index import SearchIndex, edit_distance, tokenize
+
+CAFES = [
+    "Куб Кофе — Арбат ул. Арбат, 12",
+    "Куб Кофе — Тверская ул. Тверская, 18",
+    "Куб Кофе — Савёловская ул. Бутырская, 10",
+    "Куб Кофе — Маяковская 1-я Тверская-Ямская ул., 2",
+    "Куб Кофе — Павелецкая ул. Валовая, 11",
+]
+
+
+def test_tokens_are_case_and_yo_folded():
+    assert tokenize("Савёловская, ТВЕРСКАЯ-Ямская 24/7") == ["савеловская", "тверская", "ямская", "24", "7"]
+
+
+def test_empty_query_returns_everything_in_order():
+    assert SearchIndex(CAFES).search("  ") == [0, 1, 2, 3, 4]
+
+
+def test_prefix_matches_any_word():
+    index = SearchIndex(CAFES)
+
+    assert index.search("твер") == [1, 3]
+    assert index.search("САВЁЛОВ") == index.search("савелов") == [2]
+    # "савел" is also one typo away from "павел(ецкая)", which ranks below the prefix hit
+    assert index.search("савел") == [2, 4]
+    assert index.search("12") == [0]
+
+
+def test_every_term_has_to_match():
+    index = SearchIndex(CAFES)
+
+    assert index.search("тверская ямская") == [3]
+    assert index.search("арбат валовая") == []
+
+
+def test_typos_are_tolerated_but_rank_below_exact_hits():
+    index = SearchIndex(CAFES)
+
+    assert index.search("арбт") == [0]
+    assert index.search("тверкая") == [1, 3]
+    assert index.search("павлецкая") == [4]
+    assert index.search("zzz") == []
+
+
+def test_whole_word_hits_rank_above_prefix_hits():
+    index = SearchIndex(["Кофе Валовая", "Кофе Вал"])
+
+    assert index.search("вал") == [1, 0]
+
+
+def test_short_terms_are_not_fuzzy():
+    assert SearchIndex(["ab cd"]).search("ax") == []
+
+
+def test_edit_distance_counts_transpositions_and_stops_at_limit():
+    assert edit_distance("тверская", "тверксая", 2) == 1
+    assert edit_distance("арбат", "арбт", 1) == 1
+    assert edit_distance("арбат", "тверская", 2) == 3
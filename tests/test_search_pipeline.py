@@ -0,0 +1,136 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.search_pipeline import SearchPipeline
+
+
+class ManualClock:
+    """Stands in for the Kivy clock: timers fire only when advanced."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.timers = []
+        self.soon = []
+
+    def schedule(self, callback, delay):
+        timer = _Timer(callback, self.now + delay)
+        self.timers.append(timer)
+        return timer
+
+    def call_soon(self, callback):
+        self.soon.append(callback)
+
+    def advance(self, seconds):
+        self.now += seconds
+        for timer in list(self.timers):
+            if not timer.cancelled and timer.due <= self.now:
+                self.timers.remove(timer)
+                timer.callback()
+
+    def run_soon(self):
+        while self.soon:
+            self.soon.pop(0)()
+
+
+class _Timer:
+    def __init__(self, callback, due):
+        self.callback = callback
+        self.due = due
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def _pipeline(clock, match, size=10, **kwargs):
+    delivered = []
+    pipeline = SearchPipeline(
+        match,
+        lambda query, result: delivered.append((query, result)),
+        lambda: size,
+        delay=0.25,
+        schedule=clock.schedule,
+        call_soon=clock.call_soon,
+        **kwargs,
+    )
+    return pipeline, delivered
+
+
+def test_rapid_keystrokes_are_matched_once():
+    clock, calls = ManualClock(), []
+    pipeline, delivered = _pipeline(clock, lambda q: calls.append(q) or q.upper())
+
+    for query in ("к", "ку", "куб"):
+        pipeline.submit(query)
+        clock.advance(0.1)
+    assert calls == []
+
+    clock.advance(0.25)
+    assert calls == ["куб"]
+    assert delivered == [("куб", "КУБ")]
+
+
+def test_immediate_submit_skips_the_delay_and_the_pending_query():
+    clock = ManualClock()
+    pipeline, delivered = _pipeline(clock, str.upper)
+
+    pipeline.submit("a")
+    pipeline.submit("b", immediate=True)
+    clock.advance(1)
+
+    assert delivered == [("b", "B")]
+
+
+def test_cancel_drops_the_pending_query():
+    clock = ManualClock()
+    pipeline, delivered = _pipeline(clock, str.upper)
+
+    pipeline.submit("a")
+    pipeline.cancel()
+    clock.advance(1)
+
+    assert delivered == []
+
+
+def test_large_datasets_match_off_the_calling_thread():
+    clock, threads = ManualClock(), []
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    def match(query):
+        threads.append(threading.current_thread())
+        return query.upper()
+
+    pipeline, delivered = _pipeline(clock, match, size=1000, offload_threshold=500, executor=executor)
+    pipeline.submit("a", immediate=True)
+    executor.shutdown(wait=True)
+    clock.run_soon()
+
+    assert threads and threads[0] is not threading.current_thread()
+    assert delivered == [("a", "A")]
+
+
+def test_result_of_an_overtaken_query_is_dropped():
+    clock = ManualClock()
+    executor = ThreadPoolExecutor(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def match(query):
+        calls.append(query)
+        if query == "slow":
+            started.set()
+            release.wait(2)
+        return query.upper()
+
+    pipeline, delivered = _pipeline(clock, match, size=1000, offload_threshold=500, executor=executor)
+    pipeline.submit("slow", immediate=True)
+    assert started.wait(2)
+    pipeline.submit("queued", immediate=True)
+    pipeline.submit("latest", immediate=True)
+    release.set()
+    executor.shutdown(wait=True)
+    clock.run_soon()
+
+    # "queued" was overtaken before the worker reached it and never ran
+    assert calls == ["slow", "latest"]
+    assert delivered == [("latest", "LATEST")]
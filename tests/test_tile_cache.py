@@ -0,0 +1,210 @@
+import os
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.services import tile_cache
+from src.services.tile_cache import (
+    DiskTileStore,
+    MBTilesStore,
+    TileCache,
+    TilePrefetcher,
+    tile_xy,
+    tiles_around,
+)
+
+
+@pytest.fixture
+def tile_server():
+    """Local stand-in for a tile server: serves b"tile:z/x/y" and counts requests."""
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            body = f"tile:{self.path.strip('/').rsplit('.', 1)[0]}".encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/{{z}}/{{x}}/{{y}}.png", requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_disk_store_evicts_least_recently_used(tmp_path):
+    store = DiskTileStore(str(tmp_path), budget=30)
+    store.put(1, 0, 0, b"a" * 10)
+    store.put(1, 0, 1, b"b" * 10)
+    store.put(1, 1, 0, b"c" * 10)
+    assert store.get(1, 0, 0) == b"a" * 10  # now most recent
+
+    store.put(1, 1, 1, b"d" * 10)
+
+    assert (1, 0, 1) not in store
+    assert not os.path.exists(tmp_path / "1" / "0" / "1.png")
+    assert (1, 0, 0) in store and (1, 1, 1) in store
+    assert store.size_bytes() == 30
+
+
+def test_disk_store_reloads_index_and_budget(tmp_path):
+    store = DiskTileStore(str(tmp_path), budget=100)
+    for y in range(5):
+        store.put(3, 2, y, b"x" * 10)
+
+    reopened = DiskTileStore(str(tmp_path), budget=30)
+
+    assert len(reopened) == 3
+    assert reopened.size_bytes() == 30
+    assert reopened.get(3, 2, 4) == b"x" * 10
+
+
+def test_mbtiles_store_round_trip_and_eviction(tmp_path):
+    store = MBTilesStore(str(tmp_path / "tiles.mbtiles"), budget=25)
+    store.put(2, 1, 0, b"a" * 10)
+    store.put(2, 1, 1, b"b" * 10)
+    assert store.get(2, 1, 0) == b"a" * 10
+
+    store.put(2, 2, 2, b"c" * 10)
+
+    assert (2, 1, 1) not in store
+    assert store.get(2, 1, 0) == b"a" * 10
+    assert store.get(2, 2, 2) == b"c" * 10
+    assert store.size_bytes() == 20
+    store.close()
+
+
+def test_mbtiles_store_reads_preseeded_file_in_tms_rows(tmp_path):
+    path = str(tmp_path / "seeded.mbtiles")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+    # XYZ (3, 5, 1) is TMS row 2**3 - 1 - 1 = 6
+    db.execute("INSERT INTO tiles VALUES (3, 5, 6, ?)", (b"seeded",))
+    db.commit()
+    db.close()
+
+    store = MBTilesStore(path)
+
+    assert store.get(3, 5, 1) == b"seeded"
+    assert store.get(3, 5, 6) is None
+    store.close()
+
+
+def test_cache_downloads_once_then_serves_from_store(tmp_path, tile_server):
+    url, requests = tile_server
+    cache = TileCache(DiskTileStore(str(tmp_path)), url=url)
+
+    assert cache.get(11, 1238, 640) == b"tile:11/1238/640"
+    assert cache.get(11, 1238, 640) == b"tile:11/1238/640"
+
+    assert requests == ["/11/1238/640.png"]
+
+
+def test_cache_miss_without_network_is_none(tmp_path):
+    def offline(_url):
+        raise OSError("offline")
+
+    cache = TileCache(DiskTileStore(str(tmp_path)), fetch=offline)
+
+    assert cache.get(5, 1, 1) is None
+    assert len(cache.store) == 0
+
+
+def test_tiles_around_is_a_ring_around_each_point():
+    points = [(55.7522, 37.5928), (55.8046, 37.5166)]
+    tiles = tiles_around(points, zooms=[15, 14], margin=1)
+
+    zooms = [z for z, _, _ in tiles]
+    assert zooms == sorted(zooms)
+    expected = set()
+    for z in (14, 15):
+        for lat, lon in points:
+            x, y = tile_xy(lat, lon, z)
+            expected |= {(z, x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+    # Only the rings: the ground between the two cafes is not fetched
+    assert set(tiles) == expected
+    assert len(tiles) == len(expected) == 4 * 9
+    assert len(tiles_around(points, limit=5)) == 5
+
+
+def test_tile_xy_matches_known_tile():
+    # Moscow centre at zoom 10 is tile 619/320 on the OSM grid
+    assert tile_xy(55.7558, 37.6176, 10) == (619, 320)
+
+
+def test_prefetch_skips_cached_tiles(tmp_path, tile_server):
+    url, requests = tile_server
+    store = DiskTileStore(str(tmp_path))
+    store.put(11, 1, 1, b"cached")
+    prefetcher = TilePrefetcher(TileCache(store, url=url))
+
+    prefetcher.start([(11, 1, 1), (11, 1, 2), (12, 3, 3)])
+    prefetcher.join(5)
+
+    assert sorted(requests) == ["/11/1/2.png", "/12/3/3.png"]
+    assert prefetcher.fetched == 2
+    assert (12, 3, 3) in store
+
+
+@pytest.fixture
+def app_tiles(tmp_path, monkeypatch, tile_server):
+    """Module-level cache and prefetcher pointed at a temp dir and the local tile server."""
+    url, requests = tile_server
+    monkeypatch.setattr(tile_cache, "TILE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(tile_cache, "TILE_STORE", "disk")
+    monkeypatch.setattr(tile_cache, "TILE_URL", url)
+    monkeypatch.setattr(tile_cache, "TILE_PREFETCH", True)
+    monkeypatch.setattr(tile_cache, "_cache", None)
+    monkeypatch.setattr(tile_cache, "_prefetcher", None)
+    yield requests
+    if tile_cache._prefetcher is not None:
+        tile_cache._prefetcher.cancel()
+        tile_cache._prefetcher.join(5)
+
+
+def test_prefetch_around_runs_through_the_app_singletons(app_tiles, monkeypatch):
+    opened_on = []
+    real_get_cache = tile_cache.get_cache
+
+    def get_cache():
+        opened_on.append(threading.current_thread())
+        return real_get_cache()
+
+    monkeypatch.setattr(tile_cache, "get_cache", get_cache)
+    points = [(55.7522, 37.5928)]
+    started = []
+    # Called from a helper thread so a lock-up fails the test instead of hanging it
+    caller = threading.Thread(target=lambda: started.append(tile_cache.prefetch_around(points)), daemon=True)
+    caller.start()
+    caller.join(5)
+    assert started, "prefetch_around() did not return"
+
+    prefetcher = started[0]
+    assert tile_cache.prefetch_around(points) is prefetcher  # once per run
+    prefetcher.join(10)
+
+    assert not prefetcher._thread.is_alive()
+    assert opened_on and caller not in opened_on
+    assert prefetcher.fetched == len(app_tiles) == len(tiles_around(points))
+    assert all(tile in real_get_cache().store for tile in tiles_around(points))
+
+
+def test_prefetch_is_off_by_default_and_refuses_public_osm(app_tiles, monkeypatch):
+    monkeypatch.setattr(tile_cache, "TILE_PREFETCH", False)
+    assert tile_cache.prefetch_around([(55.75, 37.61)]) is None
+
+    monkeypatch.setattr(tile_cache, "TILE_PREFETCH", True)
+    monkeypatch.setattr(tile_cache, "TILE_URL", "https://tile.openstreetmap.org/{z}/{x}/{y}.png")
+    assert tile_cache.prefetch_around([(55.75, 37.61)]) is None
+    assert not tile_cache.prefetch_allowed("https://a.tile.openstreetmap.org/{z}/{x}/{y}.png")
+    assert tile_cache.prefetch_allowed("https://tiles.example.com/{z}/{x}/{y}.png")
+    assert app_tiles == []
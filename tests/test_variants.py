@@ -0,0 +1,51 @@
+import json
+import os
+
+import pytest
+
+from src.services import variants
+
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    source = tmp_path / "Latte.jpg"
+    source.write_bytes(b"jpg")
+    os.utime(source, (1000, 1000))
+    entries = {}
+    for scale, (width, height) in ((1, (360, 240)), (2, (720, 480)), (3, (1080, 720))):
+        for fmt, ext in (("source", ".jpg"), ("webp", ".webp")):
+            entries.setdefault(str(source), []).append({
+                "path": f"v/Latte@{scale}x{ext}", "format": fmt, "scale": scale, "width": width, "height": height,
+            })
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(entries))
+    monkeypatch.setattr(variants, "MANIFEST", str(path))
+    monkeypatch.setattr(variants, "_webp", False)
+    variants.reset()
+    yield str(source)
+    variants.reset()
+
+
+def test_smallest_covering_variant_is_picked(manifest):
+    assert variants.pick(manifest, 300, 200) == "v/Latte@1x.jpg"
+    assert variants.pick(manifest, 361, 100) == "v/Latte@2x.jpg"
+    assert variants.pick(manifest, 700, 700) == "v/Latte@3x.jpg"
+
+
+def test_larger_than_every_variant_uses_the_original(manifest):
+    assert variants.pick(manifest, 2000, 1000) == manifest
+
+
+def test_webp_is_preferred_when_decodable(manifest, monkeypatch):
+    monkeypatch.setattr(variants, "_webp", True)
+
+    assert variants.pick(manifest, 300, 200) == "v/Latte@1x.webp"
+    assert variants.pick(manifest, 700, 700) == "v/Latte@3x.webp"
+
+
+def test_stale_manifest_and_atlas_urls_pass_through(manifest):
+    os.utime(variants.MANIFEST, (500, 500))
+    variants.reset()
+
+    assert variants.pick(manifest, 10, 10) == manifest
+    assert variants.pick("atlas://assets/atlas/icons/Logo", 10, 10) == "atlas://assets/atlas/icons/Logo"